@@ -1,74 +1,49 @@
-from flask import Flask, render_template, Response, stream_with_context, jsonify, request
-import requests
-from bs4 import BeautifulSoup
-import re
 import time
+# 冷啟動量測的起點 (要在匯入 Flask 與爬蟲引擎之前)
+BOOT_STARTED = time.perf_counter()
+from flask import Flask, render_template, Response, stream_with_context, jsonify, request, send_file, g
 import json
-import os
+import threading
 from flask_cors import CORS 
+from webtoon_engine import metrics
+from webtoon_engine.catalogue import Catalogue
+from webtoon_engine.changes import OP_DELETE, ChangeLog
+from webtoon_engine.http_cache import MIN_COMPRESS_SIZE, compress, if_none_match, make_etag, negotiate
+from webtoon_engine.image_cache import ImageCache, UpstreamError, is_allowed_image_url
+from webtoon_engine.jobs import CrawlJobRunner, sse_stream
+from webtoon_engine.pipeline import CrawlEngine, params_from_args
+from webtoon_engine.query import DEFAULT_LIMIT, QUERY_PARAMS, SORT_KEYS, STATUSES
+from webtoon_engine.search import DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT
+from webtoon_engine.settings import (
+    CATALOGUE_SNAPSHOT, CHANGE_LOG_FILE, CHANGE_LOG_WINDOW, CRAWL_CHECKPOINT_FILE, CRAWL_LOCK_FILE,
+    CRAWL_PROFILE_DIR, CRAWL_SCHEDULE_EVERY, CRAWL_SCHEDULE_FILE, CRAWL_TARGETS_FILE, DATA_FILE, IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES, STORAGE_BACKEND, STORAGE_PATH, default_crawl_params)
+from webtoon_engine.storage import open_storage
+from webtoon_engine.targets import TargetScheduler, load_targets
 
 # 初始化 Flask
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Change-Seq'])
 
-# ==========================================
-# 🔴 核心修正：使用絕對路徑，確保一定找得到檔案
-# ==========================================
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, 'comics_data.json')
+# 所有設定 (資料檔路徑、儲存後端、圖片快取、爬蟲參數與排程) 都在 webtoon_engine/settings.py，
+# 命令列 (python -m webtoon_engine crawl) 也讀同一份設定
+
+change_log = ChangeLog(CHANGE_LOG_FILE, CHANGE_LOG_WINDOW)
+
+# 全程序共用的清單快取 (只在資料變動時重新載入)
+catalogue = Catalogue(open_storage(STORAGE_BACKEND, STORAGE_PATH, legacy_json=DATA_FILE), change_log,
+                      snapshot_path=CATALOGUE_SNAPSHOT or None)
+
+# --- 圖片代理快取 ---
+IMAGE_MAX_AGE = 30 * 24 * 3600
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
 
 # 啟動時印出路徑，方便除錯
 print("="*50)
 print(f"📂 系統啟動中...")
-print(f"📂 資料庫路徑已鎖定為: {DATA_FILE}")
+print(f"📂 資料庫路徑已鎖定為: {STORAGE_PATH} ({STORAGE_BACKEND})")
 print("="*50)
 
-# --- 工具函式 ---
-
-def get_title_no(hyperlink):
-    """從網址解析唯一的 title_no"""
-    match = re.search(r"title_no=(\d+)", hyperlink)
-    if match: return match.group(1)
-    match2 = re.search(r'/list\?title_no=(\d+)', hyperlink)
-    return match2.group(1) if match2 else None
-
-def get_episode_count_by_html(html_content):
-    """解析 HTML 獲取最新話次號碼 (數字)"""
-    try:
-        soup = BeautifulSoup(html_content, "html.parser")
-        episode_list = soup.find("ul", id="_listUl")
-        if not episode_list: return 0
-        latest_item = episode_list.find("li", class_="_episodeItem")
-        if latest_item and "data-episode-no" in latest_item.attrs:
-            return int(latest_item["data-episode-no"])
-        return 0
-    except Exception:
-        return 0
-
-def load_local_data():
-    """讀取本地 JSON 並轉為 {id: data} 的字典格式以便快速比對"""
-    if not os.path.exists(DATA_FILE):
-        return {}
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content: return {} # 防止空檔案報錯
-            data_list = json.loads(content)
-            # 將 List 轉為 Dictionary，Key 是 comic_id
-            return {item['id']: item for item in data_list}
-    except Exception as e:
-        print(f"讀取 JSON 失敗: {e}")
-        return {}
-
-def save_local_data(data_dict):
-    """將字典轉回 List 並存入 JSON"""
-    try:
-        data_list = list(data_dict.values())
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data_list, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"存檔失敗: {e}")
-
 # --- 路由設定 ---
 
 @app.route('/')
@@ -79,182 +54,293 @@ def home():
 def proxy_image():
     url = request.args.get('url')
     if not url: return "No URL", 400
+    if not is_allowed_image_url(url): return "URL not allowed", 403
+    width = request.args.get('w', type=int)
+    # 縮圖：瀏覽器支援 WebP 就給 WebP，否則給 JPEG
+    fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Referer": "https://www.webtoons.com/"
-        }
-        resp = requests.get(url, headers=headers, timeout=15)
-        excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
-        headers = [(name, value) for (name, value) in resp.raw.headers.items() if name.lower() not in excluded_headers]
-        return Response(resp.content, resp.status_code, headers)
+        for attempt in range(2):
+            try:
+                with metrics.stage('image_proxy'):
+                    if width:
+                        image, hit = image_cache.get_thumbnail(url, width, fmt)
+                    else:
+                        image, hit = image_cache.get_original(url)
+                resp = send_file(image.path, mimetype=image.content_type, etag=image.etag, conditional=True)
+                break
+            except FileNotFoundError:
+                # 查到之後、開檔之前剛好被 LRU 淘汰 (其他請求寫入新圖)：重新抓一次
+                if attempt:
+                    raise
+        metrics.IMAGE_CACHE_REQUESTS.inc(result='hit' if hit else 'miss')
+    except UpstreamError as e:
+        return str(e), e.status if e.status < 500 else 502
     except Exception as e:
         return str(e), 500
+    # 同一個網址的圖片內容不會變，讓瀏覽器長時間快取
+    resp.headers['Cache-Control'] = f'public, max-age={IMAGE_MAX_AGE}, immutable'
+    if width:
+        resp.headers['Vary'] = 'Accept'
+    return resp
+
+def catalogue_response(snapshot, cache_key, build_body):
+    """清單類 API 的共用回應：強 ETag + 304，並依 Accept-Encoding 回傳壓縮內容
+
+    build_body(encoding) 回傳 (實際使用的壓縮方式, 內容)；命中 304 時完全不會呼叫，
+    也就不需要重新序列化。原始 / gzip / br 的內容不同，協商出的壓縮方式也算進 ETag。
+    """
+    negotiated = negotiate(request.headers.get('Accept-Encoding'))
+    etag = make_etag(snapshot.digest, cache_key, negotiated or 'identity')
+    if if_none_match(request.headers.get('If-None-Match'), etag):
+        resp = Response(status=304)
+    else:
+        encoding, body = build_body(negotiated)
+        resp = Response(body, mimetype='application/json')
+        if encoding:
+            resp.headers['Content-Encoding'] = encoding
+    resp.headers['ETag'] = etag
+    resp.headers['Vary'] = 'Accept-Encoding'
+    # 瀏覽器可以快取，但每次使用前都要用 If-None-Match 重新驗證
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+def json_body(payload):
+    """把查詢結果序列化成精簡 JSON，並視需要即時壓縮"""
+    raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    def build(encoding):
+        if encoding is None or len(raw) < MIN_COMPRESS_SIZE:
+            return None, raw
+        return encoding, compress(raw, encoding)
+    return build
 
 @app.route('/api/comics')
 def get_comics_api():
-    # 加入路徑檢查，讓你在終端機看到它有沒有找到
-    if not os.path.exists(DATA_FILE):
-        print(f"❌ API 請求失敗：找不到檔案於 {DATA_FILE}")
-        return jsonify([])
-    
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content: return jsonify([])
-            return jsonify(json.loads(content))
-    except Exception as e:
-        print(f"❌ 讀取錯誤: {e}")
-        return jsonify([])
+    snapshot = catalogue.current()
+    index = snapshot.index
 
-@app.route('/start-crawl')
-def start_crawl():
-    def generate():
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
-            "Referer": "https://www.webtoons.com/"
-        }
-        
-        yield "data: 🚀 爬蟲啟動：比對本地 JSON 模式\n\n"
-        
-        # 1. 載入本地資料庫
-        local_db = load_local_data()
-        yield f"data: 📂 目前本地資料庫共有 {len(local_db)} 部漫畫\n\n"
-
-        # 2. 取得總頁數 (以完結區為例)
-        first_url = "https://www.webtoons.com/zh-hant/originals/complete?sortOrder=UPDATE&page=1"
+    # 沒帶任何查詢參數時維持舊行為：回傳完整清單 (直接用預先序列化、壓縮好的內容)
+    # 不認得的參數 (例如防快取的 ?_=123) 不算，回應格式不會因此改變
+    # X-Change-Seq：之後可以用 /api/comics/changes?since=<這個值> 只同步變動的部分
+    if not any(name in request.args for name in QUERY_PARAMS):
+        resp = catalogue_response(snapshot, 'all', snapshot.full_body.get)
+        resp.headers['X-Change-Seq'] = str(snapshot.change_seq)
+        return resp
+
+    status = request.args.get('status') or None
+    sort = request.args.get('sort') or None
+    order = request.args.get('order', 'asc')
+    if status and status not in STATUSES:
+        return jsonify({"error": f"status 必須是 {', '.join(STATUSES)} 其中之一"}), 400
+    if sort and sort not in SORT_KEYS:
+        return jsonify({"error": f"sort 必須是 {', '.join(SORT_KEYS)} 其中之一"}), 400
+
+    query = dict(
+        status=status,
+        q=request.args.get('q') or None,
+        genre=request.args.get('genre') or None,
+        sort=sort,
+        order=order,
+        page=request.args.get('page', 1, type=int),
+        limit=request.args.get('limit', DEFAULT_LIMIT, type=int),
+    )
+    cache_key = json.dumps(query, sort_keys=True, ensure_ascii=False)
+    return catalogue_response(snapshot, cache_key, lambda enc: json_body(index.query(**query))(enc))
+
+@app.route('/api/search')
+def search_api():
+    """全文搜尋：/api/search?q=<關鍵字>&limit=N，比對標題、作者與類型，結果依相關程度排序 (含 score)"""
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({"error": "請提供搜尋關鍵字 q"}), 400
+    limit = request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int)
+    snapshot = catalogue.current()
+
+    def build(encoding):
+        # 搜尋索引在第一次搜尋時才建立 (冷啟動不必等它)
+        search, latest = catalogue.search_index()
+        total, hits = search.search(q, limit)
+        items = []
+        for comic_id, score in hits:
+            comic = latest.index.get(comic_id)
+            if comic is not None:
+                items.append(dict(comic, score=score))
+        return json_body({"q": q, "total": total, "items": items})(encoding)
+
+    return catalogue_response(snapshot, f'search:{limit}:{q}', build)
+
+@app.route('/api/comics/<comic_id>')
+def get_comic_api(comic_id):
+    snapshot = catalogue.current()
+    comic = snapshot.index.get(comic_id)
+    if comic is None:
+        return jsonify({"error": "找不到這部漫畫"}), 404
+    return catalogue_response(snapshot, f'comic:{comic_id}', json_body(comic))
+
+@app.route('/api/comics/<comic_id>/history')
+def get_comic_history_api(comic_id):
+    """這部作品每次被新增 / 更新 / 刪除時的話數紀錄 (由舊到新)"""
+    history = change_log.history(comic_id)
+    if not history and catalogue.current().index.get(comic_id) is None:
+        return jsonify({"error": "找不到這部漫畫"}), 404
+    return jsonify({
+        "id": comic_id,
+        "history": [{key: value for key, value in entry.items() if key != 'id'} for entry in history],
+    })
+
+# long-poll 最多等幾秒
+CHANGES_MAX_WAIT = 60
+
+def changes_payload(since):
+    """since 之後的變動：變動過的完整紀錄 + 被刪除的 id (tombstone)
+
+    沒帶 since、或 since 已經比變更紀錄保留的範圍 (CHANGE_LOG_WINDOW 筆) 還舊時回傳完整清單並標記 reset，
+    前端應整份取代。
+    先讀變更紀錄再取快照：資料一定比回傳的 seq 新，最多重複送幾筆，不會漏掉。
+    """
+    latest, ops = change_log.since(since) if since is not None else (None, None)
+    if ops is None:
+        snapshot = catalogue.current()
+        items = list(snapshot.records.visible_records())
+        return snapshot, {"seq": snapshot.change_seq, "reset": True, "items": items, "deleted": []}
+    snapshot = catalogue.current()
+    items, deleted = [], []
+    for comic_id, op in ops.items():
+        comic = snapshot.index.get(comic_id)
+        if op == OP_DELETE or comic is None:
+            deleted.append(comic_id)
+        else:
+            items.append(comic)
+    return snapshot, {"seq": latest, "reset": False, "items": items, "deleted": deleted}
+
+@app.route('/api/comics/changes')
+def get_changes_api():
+    """增量同步：/api/comics/changes?since=<seq>；加上 &wait=N 時，沒有新變動會最多等 N 秒 (long-poll)"""
+    since = request.args.get('since', type=int)
+    wait = min(request.args.get('wait', 0, type=float), CHANGES_MAX_WAIT)
+    if since is not None and wait > 0 and change_log.covers(since):
+        change_log.wait(since, wait)
+    snapshot, payload = changes_payload(since)
+    return catalogue_response(snapshot, f"changes:{since}:{payload['seq']}", json_body(payload))
+
+@app.route('/api/comics/changes/stream')
+def stream_changes_api():
+    """即時變更 (SSE)：每有新的變動就送出一則 {seq, items, deleted}，事件 id 就是 seq
+
+    斷線重連時依 Last-Event-ID 接續；since 已經不在變更紀錄範圍內時先送 reset 事件，
+    前端應重新下載完整清單。
+    """
+    last_event = request.headers.get('Last-Event-ID', '')
+    since = int(last_event) if last_event.isdigit() else request.args.get('since', type=int)
+    reset = since is not None and not change_log.covers(since)
+    if since is None or reset:
+        since = change_log.latest()
+
+    def stream():
+        current = since
+        if reset:
+            yield f"event: reset\nid: {current}\ndata: {json.dumps({'seq': current})}\n\n"
+        while True:
+            if not change_log.wait(current, timeout=15):
+                yield ": keep-alive\n\n"
+                continue
+            _, payload = changes_payload(current)
+            current = payload['seq']
+            data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+            yield f"id: {current}\ndata: {data}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream')
+
+@app.route('/api/stats')
+def get_stats_api():
+    """全體統計 (總數 / 免費連載 / 免費完結 / 需追漫券)，載入資料時就已算好"""
+    snapshot = catalogue.current()
+    return catalogue_response(snapshot, 'stats', json_body(snapshot.stats))
+
+# 爬蟲流程 (discover → fetch → extract → diff → persist) 在 webtoon_engine/pipeline.py，本地版與命令列共用
+crawl_scheduler = TargetScheduler(load_targets(CRAWL_TARGETS_FILE), CRAWL_SCHEDULE_FILE)
+crawl_engine = CrawlEngine(catalogue, crawl_scheduler, image_cache, CRAWL_PROFILE_DIR)
+crawl_runner = CrawlJobRunner(crawl_engine.run, CRAWL_CHECKPOINT_FILE, CRAWL_LOCK_FILE)
+
+def schedule_loop():
+    """定時檢查到期的目標 (例如連載的更新日每小時一次)，有到期就在背景開始爬取"""
+    while True:
+        time.sleep(CRAWL_SCHEDULE_EVERY)
         try:
-            res = requests.get(first_url, headers=headers)
-            soup = BeautifulSoup(res.text, "html.parser")
-            max_page = 1
-            for a in soup.select('div.paginate > a'):
-                try:
-                    p = int(a.text.strip())
-                    if p > max_page: max_page = p
-                except: continue
-            yield f"data: 📦 線上清單共 {max_page} 頁，開始掃描...\n\n"
+            if crawl_scheduler.due() and not (crawl_runner.current and not crawl_runner.current.finished):
+                crawl_runner.start(dict(default_crawl_params(), targets='due'))
         except Exception as e:
-            yield f"data: ❌ 無法連接 Webtoon: {str(e)}\n\n"
-            return
-
-        total_updated = 0
-        total_new = 0
-        total_skipped = 0
-        
-        # 3. 開始分頁爬取
-        for page in range(1, max_page + 1): 
-            url = f"https://www.webtoons.com/zh-hant/originals/complete?sortOrder=UPDATE&page={page}"
-            yield f"data: 📄 正在掃描第 {page} / {max_page} 頁...\n\n"
-            
-            try:
-                res = requests.get(url, headers=headers)
-                soup = BeautifulSoup(res.text, "html.parser")
-                comics = soup.select('a.link._originals_title_a')
-            except Exception as e:
-                yield f"data: ❌ 讀取頁面失敗: {str(e)}\n\n"
-                continue
-            
-            page_dirty = False 
-
-            for comic_a in comics:
-                try:
-                    # --- 取得列表頁資訊 ---
-                    title = comic_a.select_one('.title').text.strip()
-                    hyperlink = comic_a['href']
-                    genre = comic_a.select_one('.genre').text.strip()
-                    title_no = get_title_no(hyperlink)
-                    
-                    if not title_no: continue
-                    comic_id = title_no
-
-                    # --- 關鍵：檢查是否需要更新 ---
-                    # 必須先抓取內頁才能知道話次有沒有變多，這是必要的 Request
-                    res_detail = requests.get(hyperlink, headers=headers)
-                    res_detail.encoding = "utf-8"
-                    
-                    # 取得目前線上最新話次 (整數)
-                    current_episode_count = get_episode_count_by_html(res_detail.text)
-                    current_episodes_str = f"共 {current_episode_count} 話"
-
-                    # 比對邏輯
-                    old_data = local_db.get(comic_id)
-                    is_new = False
-                    is_update = False
-
-                    if old_data is None:
-                        is_new = True
-                        yield f"data: ✅ 發現新漫畫：{title}\n\n"
-                    else:
-                        # 比對話次數量 (使用 .get 避免舊資料沒有該欄位報錯)
-                        old_count = old_data.get('episode_count', 0)
-                        
-                        if current_episode_count > old_count:
-                            is_update = True
-                            yield f"data: 🔄 發現更新：{title} ({old_count} -> {current_episode_count})\n\n"
-                        else:
-                            # 資料完全一樣，直接略過
-                            # yield f"data: ⏭️ 略過：{title} (無變更)\n\n" 
-                            total_skipped += 1
-                            time.sleep(0.05) # 稍微休息極短時間
-                            continue 
-
-                    # --- 如果是新資料或更新，才執行解析與儲存 ---
-                    soup2 = BeautifulSoup(res_detail.text, "html.parser")
-                    
-                    cover_tag = soup2.select_one(".detail_header .thmb img") or soup2.select_one("img")
-                    picture = cover_tag["src"] if cover_tag else ""
-                    
-                    author_tag = soup2.select_one(".author")
-                    author = author_tag.get_text(strip=True) if author_tag else "未知"
-                    
-                    access_note = "已完結，可免費看完整話數!"
-                    if soup2.find(string=lambda t: t and "在APP可以閱讀更多話次" in t):
-                        access_note = "已完結，需要追漫券"
-
-                    current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-
-                    # 建立資料物件
-                    doc = {
-                        "id": comic_id,
-                        "title": title,
-                        "genre": genre,
-                        "author": author,
-                        "episodes": current_episodes_str,
-                        "episode_count": current_episode_count, # 存入數字方便下次比對
-                        "access": access_note,
-                        "picture": picture,
-                        "hyperlink": hyperlink,
-                        "last_updated": current_time,
-                        "crawl_date": current_time
-                    }
-
-                    # 如果是更新，保留原本的 crawl_date (初次爬取時間)
-                    if is_update and old_data:
-                        doc['crawl_date'] = old_data.get('crawl_date', current_time)
-
-                    # 寫入記憶體中的字典
-                    local_db[comic_id] = doc
-                    page_dirty = True 
-
-                    if is_new: total_new += 1
-                    if is_update: total_updated += 1
-                    
-                    time.sleep(0.1) # 有爬取動作時，休息久一點避免被擋
-
-                except Exception as inner_e:
-                    yield f"data: ❌ 處理 {title} 時發生錯誤: {str(inner_e)}\n\n"
-            
-            # 該頁面全部跑完後，如果有變動才寫入硬碟
-            if page_dirty:
-                save_local_data(local_db)
-                yield f"data: 💾 第 {page} 頁資料已更新並存檔\n\n"
-            
-            yield f"data: 🏁 第 {page} 頁完成\n\n"
-
-        yield f"data: 🎉 任務結束！新增: {total_new}，更新: {total_updated}，略過: {total_skipped}。\n\n"
-        yield "data: DONE\n\n"
-
-    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+            print(f"排程檢查失敗: {e}")
+
+if CRAWL_SCHEDULE_EVERY > 0:
+    threading.Thread(target=schedule_loop, daemon=True, name="crawl-scheduler").start()
+
+@app.route('/start-crawl')
+def start_crawl():
+    """啟動 (或加入進行中的) 背景爬蟲，並以 SSE 串流進度；斷線不會中止爬蟲"""
+    # 查詢參數可以臨時覆寫預設值 (concurrency / incremental / processes / rate / pages / prefetch / targets / profile)
+    # /start-crawl?restart=1：忽略上次中斷留下的檢查點，從第 1 頁重新開始
+    # 瀏覽器自動重連時帶的 Last-Event-ID 只會接回原本的工作 (見 webtoon_engine.jobs.sse_stream)
+    stream = sse_stream(crawl_runner, params_from_args(request.args, default_crawl_params()),
+                        request.headers.get('Last-Event-ID', ''), restart=request.args.get('restart') == '1')
+    return Response(stream_with_context(stream), mimetype='text/event-stream')
+
+@app.route('/api/crawl/status')
+def crawl_status():
+    """目前 (或最近一次) 爬蟲工作的狀態，以及尚未完成的檢查點"""
+    job = crawl_runner.current
+    return jsonify({
+        "job": job.info() if job else None,
+        "checkpoint": crawl_runner.checkpoint.load(),
+    })
+
+@app.route('/api/crawl/targets')
+def crawl_targets():
+    """所有爬取目標與下次到期時間"""
+    return jsonify(crawl_scheduler.status())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 格式的爬蟲量測 (各階段耗時、請求數、下載量、重試、429、新增/更新/略過)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/crawl/cancel', methods=['POST'])
+def crawl_cancel():
+    """取消執行中的爬蟲；可帶 job_id 避免取消到別的工作"""
+    job = crawl_runner.cancel(request.args.get('job_id'))
+    if job is None:
+        return jsonify({"error": "目前沒有執行中的爬蟲工作"}), 404
+    return jsonify({"cancelled": job.id})
+
+# --- 冷啟動量測：匯入耗時與第一個請求的延遲 (印在 log，也會出現在 /metrics 的 webtoon_boot_seconds) ---
+# 爬蟲才需要的套件 (bs4、lxml、requests) 在第一次爬取時才匯入；清單在第一個請求時才載入 (有暖快照時直接 mmap)
+BOOT_IMPORT_SECONDS = time.perf_counter() - BOOT_STARTED
+metrics.BOOT_SECONDS.set(round(BOOT_IMPORT_SECONDS, 4), phase='import')
+print(f"⏱️ 匯入與初始化耗時 {BOOT_IMPORT_SECONDS * 1000:.0f} ms")
+
+_first_request_lock = threading.Lock()
+_first_request_pending = True
+
+@app.before_request
+def mark_first_request():
+    if _first_request_pending:
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def report_first_request(resp):
+    global _first_request_pending
+    started = g.pop('request_started', None)
+    if started is None:
+        return resp
+    with _first_request_lock:
+        if not _first_request_pending:
+            return resp
+        _first_request_pending = False
+    now = time.perf_counter()
+    metrics.BOOT_SECONDS.set(round(now - BOOT_STARTED, 4), phase='first_request')
+    metrics.BOOT_SECONDS.set(round(now - started, 4), phase='first_request_handler')
+    print(f"⏱️ 第一個請求 {request.path}：處理 {(now - started) * 1000:.0f} ms，"
+          f"啟動後 {(now - BOOT_STARTED) * 1000:.0f} ms 完成")
+    return resp
 
 #if __name__ == "__main__":
     # 在 Render 上，必須設定 host='0.0.0.0' 才能公開
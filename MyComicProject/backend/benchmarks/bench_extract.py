@@ -0,0 +1,77 @@
+"""內頁解析效能測試：比較舊的兩次 BeautifulSoup 解析與新的單次解析引擎
+
+用法 (在 backend 目錄下)：
+    python benchmarks/bench_extract.py [--repeat 200]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from webtoon_engine import extract  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def legacy_extract(html):
+    """原本 start_crawl 的做法：話數解析一次，封面/作者/權限再解析一次並走訪整棵樹"""
+    soup = BeautifulSoup(html, "html.parser")
+    episode_list = soup.find("ul", id="_listUl")
+    latest_item = episode_list.find("li", class_="_episodeItem") if episode_list else None
+    episode_count = int(latest_item["data-episode-no"]) if latest_item else 0
+
+    soup2 = BeautifulSoup(html, "html.parser")
+    cover_tag = soup2.select_one(".detail_header .thmb img") or soup2.select_one("img")
+    author_tag = soup2.select_one(".author")
+    access = extract.ACCESS_FREE
+    if soup2.find(string=lambda t: t and extract.PAYWALL_TEXT in t):
+        access = extract.ACCESS_PAID
+    return {
+        "episode_count": episode_count,
+        "picture": cover_tag["src"] if cover_tag else "",
+        "author": author_tag.get_text(strip=True) if author_tag else extract.DEFAULT_AUTHOR,
+        "access": access,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help="每個 fixture 重複解析的次數")
+    args = parser.parse_args()
+
+    cases = [
+        ("legacy: 2x BeautifulSoup", legacy_extract),
+        ("extract_detail (bs4)", extract._extract_with_bs4),
+        ("episode pre-scan (regex)", extract.extract_episode_count),
+    ]
+    if extract.lxml is not None:
+        cases.insert(2, ("extract_detail (lxml)", extract._extract_with_lxml))
+    else:
+        print("ℹ️ 未安裝 lxml，略過 lxml 測試")
+
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'detail_*.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        print(f"\n📄 {os.path.basename(path)} ({len(html.encode('utf-8')) / 1024:.1f} KB)")
+
+        # 先確認新舊解析結果一致
+        expected = legacy_extract(html)
+        for _, func in cases[1:-1]:
+            assert func(html) == expected, f"{func.__name__} 結果與舊版不同"
+        assert extract.extract_episode_count(html) == expected['episode_count']
+
+        baseline = None
+        for label, func in cases:
+            per_page = timeit.timeit(lambda: func(html), number=args.repeat) / args.repeat * 1000
+            baseline = baseline or per_page
+            print(f"  {label:<28} {per_page:8.3f} ms/page  ({baseline / per_page:5.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
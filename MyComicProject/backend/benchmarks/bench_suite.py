@@ -0,0 +1,411 @@
+"""離線效能測試：對本機假伺服器跑完整 / 增量爬取，並壓測 /api/comics 與 /api/proxy-image
+
+全部資料都放在暫存目錄，不會動到 comics_data.json，也不會連到 webtoons.com。
+結果寫成 JSON 報告 (鍵值固定)，可以用 --baseline 和上一版的報告比較。
+
+用法 (在 backend 目錄下)：
+    python benchmarks/bench_suite.py -o bench_report.json
+    python benchmarks/bench_suite.py --suites api --api-titles 100000 --baseline old_report.json
+    python benchmarks/bench_suite.py --suites crawl --crawl-titles 5000 --latency 30 --jitter 20 --rate-429 0.01
+    python benchmarks/bench_suite.py --suites coldstart --api-titles 100000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import requests  # noqa: E402
+
+import gen_catalogue  # noqa: E402
+import stub_server  # noqa: E402
+
+SUITES = ('crawl', 'api', 'image', 'coldstart')
+TARGET_NAME = 'bench'
+
+
+# --- 統計 ---
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def latency_summary(latencies, elapsed, errors=0):
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def load_test(urls, clients, headers=None, expect=(200, 304)):
+    """以 clients 個執行緒 (各自一條 keep-alive 連線) 依序打完 urls，回傳延遲統計"""
+    local = threading.local()
+
+    def hit(url):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        resp = session.get(url, headers=headers)
+        _ = resp.content
+        return time.perf_counter() - started, resp.status_code in expect
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(hit, urls))
+    elapsed = time.perf_counter() - started
+    return latency_summary([t for t, ok in results if ok], elapsed, sum(1 for _, ok in results if not ok))
+
+
+# --- 環境 ---
+
+def prepare_backend(workdir, site):
+    """把 app.py 的所有檔案路徑指到暫存目錄，並加上指向假伺服器的爬取目標，再匯入 app"""
+    targets_file = os.path.join(workdir, 'crawl_targets.json')
+    with open(targets_file, 'w', encoding='utf-8') as f:
+        json.dump([{"name": TARGET_NAME, "url": site.list_url(), "sorted_by_update": True}], f)
+    os.environ.update({
+        'STORAGE_BACKEND': os.environ.get('STORAGE_BACKEND', 'json'),
+        'STORAGE_PATH': os.path.join(workdir, 'comics_store'),
+        'CHANGE_LOG_FILE': os.path.join(workdir, 'comics_changes.jsonl'),
+        'CATALOGUE_SNAPSHOT': os.path.join(workdir, 'comics_snapshot.bin'),
+        'IMAGE_CACHE_DIR': os.path.join(workdir, 'image_cache'),
+        'IMAGE_EXTRA_HOSTS': '127.0.0.1',
+        'CRAWL_TARGETS_FILE': targets_file,
+        'CRAWL_SCHEDULE_FILE': os.path.join(workdir, 'crawl_schedule.json'),
+        'CRAWL_CHECKPOINT_FILE': os.path.join(workdir, 'crawl_checkpoint.json'),
+        'CRAWL_LOCK_FILE': os.path.join(workdir, '.crawl.lock'),
+        'CRAWL_SCHEDULE_EVERY': '0',
+    })
+    import app as backend
+    return backend
+
+
+def start_http(flask_app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # 不逐筆印出請求紀錄
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name='bench-http').start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- 爬蟲 ---
+
+def summarize_metrics(samples):
+    """把 metrics.REGISTRY.drain() 的結果整理成報告用的數字"""
+    def total(name, label_index=None, label=None):
+        return sum(v for key, v in samples.get(name, {}).items()
+                   if label_index is None or key[label_index] == label)
+
+    stages = {key[0]: {"count": n, "total_s": round(s, 4)}
+              for key, (_, s, n) in sorted(samples.get('webtoon_stage_seconds', {}).items())}
+    return {
+        "http_requests": total('webtoon_http_requests'),
+        "http_bytes": total('webtoon_http_bytes'),
+        "http_retries": total('webtoon_http_retries'),
+        "http_429": total('webtoon_http_429'),
+        "new": total('webtoon_crawl_comics', 0, 'new'),
+        "updated": total('webtoon_crawl_comics', 0, 'updated'),
+        "skipped": total('webtoon_crawl_comics', 0, 'skipped'),
+        "stages": stages,
+    }
+
+
+def run_crawl(backend, params):
+    from webtoon_engine import metrics
+    metrics.REGISTRY.drain()
+    started = time.perf_counter()
+    job, _ = backend.crawl_runner.start(params, restart=True)
+    if job is None:
+        raise RuntimeError("無法啟動爬蟲 (另一個程序持有爬蟲鎖)")
+    for _ in job.subscribe():
+        pass
+    elapsed = time.perf_counter() - started
+    result = {"status": job.status, "elapsed_s": round(elapsed, 3)}
+    result.update(summarize_metrics(metrics.REGISTRY.drain()))
+    fetched = result['new'] + result['updated'] + result['skipped']
+    result['titles_per_s'] = round(fetched / elapsed, 1) if elapsed else 0.0
+    return result
+
+
+def bench_crawl(backend, site, args):
+    params = dict(backend.default_crawl_params(), targets=TARGET_NAME, rate=0, prefetch=False,
+                  profile=False, concurrency=args.concurrency, processes=args.processes)
+    print(f"🕷️ 完整爬取 {args.crawl_titles} 部 ({site.max_page} 頁)...")
+    full = run_crawl(backend, dict(params, incremental=False))
+    print(f"   {full['elapsed_s']} 秒，{full['titles_per_s']} 部/秒")
+
+    site.bump(args.bump)
+    print(f"🕷️ 增量爬取 (其中 {args.bump} 部有更新)...")
+    incremental = run_crawl(backend, dict(params, incremental=True))
+    print(f"   {incremental['elapsed_s']} 秒，更新 {incremental['updated']} 部")
+    return {"full": full, "incremental": incremental}
+
+
+# --- API ---
+
+def bench_api(backend, args):
+    from webtoon_engine.catalogue import Catalogue
+    from webtoon_engine.storage import JsonFileStorage
+
+    records = gen_catalogue.generate(gen_catalogue.load_sample(), args.api_titles, args.seed)
+    path = os.path.join(args.workdir, f'api_catalogue_{args.api_titles}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+    # 換成合成的大型清單 (路由每次都從模組層級的 catalogue 取快照)
+    snapshot_path = os.path.join(args.workdir, f'api_snapshot_{args.api_titles}.bin')
+    if os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+    backend.catalogue = Catalogue(JsonFileStorage(path), snapshot_path=snapshot_path)
+    started = time.perf_counter()
+    backend.catalogue.current()
+    load_s = time.perf_counter() - started
+    # 資料沒變時的重新啟動：直接 mmap 剛寫好的快照檔
+    started = time.perf_counter()
+    Catalogue(JsonFileStorage(path), snapshot_path=snapshot_path).current()
+    snapshot_load_s = time.perf_counter() - started
+
+    server, base = start_http(backend.app)
+    try:
+        rnd = random.Random(args.seed)
+        terms = [r['title'][:2] for r in rnd.sample(records, min(50, len(records)))]
+        ids = [r['id'] for r in rnd.sample(records, min(200, len(records)))]
+        etag = requests.get(f"{base}/api/comics", headers={'Accept-Encoding': 'gzip'}).headers.get('ETag')
+        n = args.requests
+        cases = {
+            "full_list_gzip": ([f"{base}/api/comics"] * max(1, n // 10), {'Accept-Encoding': 'gzip, br'}),
+            "full_list_304": ([f"{base}/api/comics"] * n, {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+            "filter_status_page": ([f"{base}/api/comics?status=paid&page={i % 20 + 1}" for i in range(n)], None),
+            "search_title": ([f"{base}/api/comics?q={terms[i % len(terms)]}" for i in range(n)], None),
+            "search_fulltext": ([f"{base}/api/search?q={terms[i % len(terms)]}" for i in range(n)], None),
+            "sort_episode_count": ([f"{base}/api/comics?sort=episode_count&order=desc&page={i % 10 + 1}"
+                                    for i in range(n)], None),
+            "comic_detail": ([f"{base}/api/comics/{ids[i % len(ids)]}" for i in range(n)], None),
+            "stats": ([f"{base}/api/stats"] * n, None),
+        }
+        results = {"titles": args.api_titles, "load_s": round(load_s, 3),
+                   "snapshot_load_s": round(snapshot_load_s, 3), "clients": args.clients}
+        for name, (urls, headers) in cases.items():
+            results[name] = load_test(urls, args.clients, headers)
+            print(f"🔎 {name:<20} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms"
+                  f"  {results[name]['rps']:8.1f} req/s")
+        return results
+    finally:
+        server.shutdown()
+
+
+# --- 冷啟動 ---
+
+# 在全新的程序中匯入 app 並開始服務 (與 gunicorn 的 worker 一樣從零開始)
+SERVE_SNIPPET = ("import logging, sys; logging.getLogger('werkzeug').setLevel(logging.ERROR); import app; "
+                 "from werkzeug.serving import make_server; "
+                 "make_server('127.0.0.1', int(sys.argv[1]), app.app, threaded=True).serve_forever()")
+
+
+def free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def cold_start(env, headers):
+    """啟動新的後端程序，量測從啟動到第一個 /api/comics 回應 (第一個 byte / 完整內容) 的時間"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', SERVE_SNIPPET, str(port)], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                resp = requests.get(f"{base}/api/comics", headers=headers, stream=True)
+                break
+            except requests.ConnectionError:
+                if proc.poll() is not None:
+                    raise RuntimeError("後端程序啟動失敗")
+                time.sleep(0.005)
+        ttfb = time.perf_counter() - started
+        size = len(resp.content)
+        total = time.perf_counter() - started
+        boot = {}
+        for line in requests.get(f"{base}/metrics").text.splitlines():
+            if line.startswith('webtoon_boot_seconds{'):
+                boot[line.split('"')[1]] = round(float(line.rsplit(' ', 1)[1]) * 1000, 1)
+        return {"ttfb_ms": round(ttfb * 1000, 1), "total_ms": round(total * 1000, 1), "bytes": size,
+                "import_ms": boot.get('import'), "first_request_handler_ms": boot.get('first_request_handler')}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def bench_coldstart(args):
+    """同一份清單分別在沒有快照、只有欄位快照、有暖快照時冷啟動"""
+    records = gen_catalogue.generate(gen_catalogue.load_sample(), args.api_titles, args.seed)
+    path = os.path.join(args.workdir, f'coldstart_catalogue_{args.api_titles}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+    snapshot_path = os.path.join(args.workdir, f'coldstart_snapshot_{args.api_titles}.bin')
+    if os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+    env = dict(os.environ, STORAGE_BACKEND='json', STORAGE_PATH=path, CATALOGUE_SNAPSHOT=snapshot_path,
+               CHANGE_LOG_FILE=os.path.join(args.workdir, 'coldstart_changes.jsonl'))
+    headers = {'Accept-Encoding': 'gzip, br'}
+
+    results = {"titles": args.api_titles}
+    results['no_snapshot'] = cold_start(env, headers)
+    results['snapshot'] = cold_start(env, headers)
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'webtoon_engine', 'warm'], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    results['warm_build_s'] = round(time.perf_counter() - started, 3)
+    results['warm'] = cold_start(env, headers)
+    for name in ('no_snapshot', 'snapshot', 'warm'):
+        r = results[name]
+        print(f"🧊 {name:<12} 第一個 byte {r['ttfb_ms']:8.1f} ms  完整內容 {r['total_ms']:8.1f} ms"
+              f"  (匯入 {r['import_ms']} ms，第一個請求 {r['first_request_handler_ms']} ms)")
+    return results
+
+
+# --- 圖片代理 ---
+
+def bench_image(backend, site, args):
+    from webtoon_engine.image_cache import Image
+
+    server, base = start_http(backend.app)
+    try:
+        covers = [site.cover_url(i) for i in range(args.images)]
+        results = {"images": args.images, "thumbnails": Image is not None}
+        for label, width in (("original", None), ("thumb_320", 320)):
+            if width and Image is None:
+                continue
+            suffix = f"&w={width}" if width else ""
+            urls = [f"{base}/api/proxy-image?url={url}{suffix}" for url in covers]
+            headers = {'Accept': 'image/webp'}
+            results[f"{label}_miss"] = load_test(urls, args.clients, headers)
+            results[f"{label}_hit"] = load_test(urls * 3, args.clients, headers)
+            for kind in ('miss', 'hit'):
+                summary = results[f"{label}_{kind}"]
+                print(f"🖼️ {label}_{kind:<13} p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms")
+        return results
+    finally:
+        server.shutdown()
+
+
+# --- 報告 ---
+
+def compare(baseline, report, path=()):
+    """列出兩份報告中可比較的數字 (延遲 / 耗時 / 吞吐量) 的變化"""
+    for key, value in report.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            compare(old or {}, value, path + (key,))
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            if key.endswith(('_ms', '_s', 'rps', 'per_s')):
+                print(f"  {'.'.join(path + (key,)):<50} {old:>12} -> {value:<12} ({value / old:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suites', default=','.join(SUITES), help=f"要跑的項目 ({', '.join(SUITES)})")
+    parser.add_argument('-o', '--output', default='bench_report.json')
+    parser.add_argument('--baseline', help="上一版的報告，結束時列出差異")
+    parser.add_argument('--workdir', help="暫存目錄 (預設自動建立)")
+    parser.add_argument('--seed', type=int, default=0)
+    # 假伺服器
+    parser.add_argument('--latency', type=float, default=20, help="假伺服器每個請求的延遲 (毫秒)")
+    parser.add_argument('--jitter', type=float, default=10, help="額外的隨機延遲上限 (毫秒)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="回傳 429 的機率")
+    parser.add_argument('--page-size', type=int, default=24)
+    # 爬蟲
+    parser.add_argument('--crawl-titles', type=int, default=1000)
+    parser.add_argument('--bump', type=int, default=30, help="增量爬取前有更新的作品數")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=1)
+    # API / 圖片
+    parser.add_argument('--api-titles', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=500, help="每種查詢的請求數")
+    parser.add_argument('--clients', type=int, default=8, help="同時發送請求的連線數")
+    parser.add_argument('--images', type=int, default=100)
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(',') if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"未知的項目: {', '.join(sorted(unknown))}")
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix='webtoon_bench_')
+    os.makedirs(args.workdir, exist_ok=True)
+
+    sample = gen_catalogue.load_sample()
+    stub_records = gen_catalogue.generate(sample, args.crawl_titles, args.seed)
+    stub, site = stub_server.serve(stub_records, page_size=args.page_size, latency=args.latency / 1000,
+                                   jitter=args.jitter / 1000, rate_429=args.rate_429, seed=args.seed)
+    backend = prepare_backend(args.workdir, site)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'workdir')},
+        },
+        "results": {},
+    }
+    try:
+        if 'crawl' in suites:
+            report['results']['crawl'] = bench_crawl(backend, site, args)
+        if 'api' in suites:
+            report['results']['api'] = bench_api(backend, args)
+        if 'image' in suites:
+            report['results']['image'] = bench_image(backend, site, args)
+        if 'coldstart' in suites:
+            report['results']['coldstart'] = bench_coldstart(args)
+        report['results']['stub_requests'] = dict(site.stats)
+    finally:
+        stub.shutdown()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"\n📊 報告已寫入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n📈 與 {args.baseline} 比較 (commit {baseline['meta'].get('git_commit')}):")
+        compare(baseline.get('results', {}), report['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""合成大型清單：以現有的 comics_data.json 為樣本，放大到 10k / 100k 部作品
+
+產生的紀錄格式與爬蟲寫入的完全相同 (標題、類型、作者、閱讀權限的分佈沿用樣本)，
+同一個 --seed 每次產生的內容都一樣，方便不同版本之間比較效能。
+
+用法 (在 backend 目錄下)：
+    python benchmarks/gen_catalogue.py --count 10000 -o /tmp/comics_10k.json
+    python benchmarks/gen_catalogue.py --count 100000 -o /tmp/comics_100k.json --seed 2
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FILE = os.path.join(BACKEND_DIR, 'comics_data.json')
+
+# 合成標題用的後綴 (與原標題組合，n-gram 搜尋才會有真實的重疊程度)
+TITLE_SUFFIXES = ('', '第二季', '外傳', '：重生', '之戀', '傳說', '物語', '日記', '學園', '大冒險')
+
+
+def load_sample(path=SAMPLE_FILE):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate(sample, count, seed=0, start_id=100000):
+    """依樣本產生 count 筆紀錄；id 從 start_id 開始，不會和真實的 title_no 重疊"""
+    rnd = random.Random(seed)
+    base_time = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    records = []
+    for i in range(count):
+        template = sample[i % len(sample)]
+        comic_id = str(start_id + i)
+        suffix = TITLE_SUFFIXES[(i // len(sample)) % len(TITLE_SUFFIXES)]
+        title = template['title'] + suffix
+        if i >= len(sample) * len(TITLE_SUFFIXES):
+            title = f"{title} {i // (len(sample) * len(TITLE_SUFFIXES)) + 1}"
+        episode_count = max(1, int(rnd.lognormvariate(4.2, 0.8)))
+        crawled = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(base_time + rnd.randrange(300 * 86400)))
+        records.append({
+            "id": comic_id,
+            "title": title,
+            "genre": rnd.choice(sample)['genre'],
+            "author": template.get('author') or "未知",
+            "episodes": f"共 {episode_count} 話",
+            "episode_count": episode_count,
+            "access": rnd.choice(sample)['access'],
+            "picture": template.get('picture', ''),
+            "hyperlink": f"https://www.webtoons.com/zh-hant/x/{comic_id}/list?title_no={comic_id}",
+            "crawl_date": crawled,
+            "last_updated": crawled,
+        })
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以 comics_data.json 為樣本產生大型清單")
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--sample', default=SAMPLE_FILE, help="樣本清單 (預設 backend/comics_data.json)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    records = generate(load_sample(args.sample), args.count, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    print(f"🧬 已產生 {len(records)} 筆資料到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""本機的 Webtoon 假伺服器：用錄下來的列表 / 內頁 / 封面重播回應，效能測試不必連到 webtoons.com
+
+作品清單來自一份 comics_data.json 格式的檔案 (可用 gen_catalogue.py 放大到 10k / 100k 部)，
+列表頁依「更新時間」排序、內頁的話數與閱讀權限都跟著清單走；可以設定延遲、抖動與 429 比例。
+
+用法 (在 backend 目錄下)：
+    python benchmarks/stub_server.py --catalogue comics_data.json --port 8765 --latency 30 --jitter 20 --rate-429 0.01
+
+路徑：
+    /zh-hant/originals/complete?sortOrder=UPDATE&page=N   列表頁 (每頁 --page-size 部)
+    /zh-hant/x/<id>/list?title_no=<id>                     內頁 (支援 ETag / If-None-Match)
+    /img/<id>.png                                          封面
+    /_stub/bump?n=K                                        隨機 K 部作品多一話並移到列表最前面
+    /_stub/stats                                           各類請求的次數
+"""
+import argparse
+import html
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+LIST_PATH = '/zh-hant/originals/complete'
+
+ITEM_TEMPLATE = '''<li>
+<a href="{href}" class="link _originals_title_a">
+<div class="card_flag"></div>
+<img src="{thumb}" width="210" height="210" alt="{title}">
+<div class="info">
+<p class="genre">{genre}</p>
+<p class="subj title">{title}</p>
+<p class="author">{author}</p>
+</div>
+</a>
+</li>'''
+
+_EPISODE_NO_RE = re.compile(r'(data-episode-no="|id="episode_)(\d+)')
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class DetailTemplate:
+    """錄下來的內頁：換掉標題、類型、作者、封面與話次編號就能當成任意作品的內頁"""
+
+    def __init__(self, source):
+        self.source = source
+        self.title = re.search(r'<h1 class="subj">([^<]*)</h1>', source).group(1)
+        self.genre = re.search(r'<h2 class="genre[^"]*">([^<]*)</h2>', source).group(1)
+        self.author = re.search(r'class="author">([^<]*)<', source).group(1)
+        self.cover = re.search(r'<span class="thmb"><img src="([^"]*)"', source).group(1)
+        self.latest = int(re.search(r'data-episode-no="(\d+)"', source).group(1))
+
+    def render(self, comic, picture):
+        offset = comic['episode_count'] - self.latest
+        page = (self.source
+                .replace(self.title, html.escape(comic['title']))
+                .replace(f'>{self.genre}<', f'>{html.escape(comic["genre"])}<')
+                .replace(f'>{self.author}<', f'>{html.escape(comic["author"])}<')
+                .replace(self.cover, picture))
+        return _EPISODE_NO_RE.sub(lambda m: f'{m.group(1)}{max(1, int(m.group(2)) + offset)}', page)
+
+
+class StubWebtoon:
+    """假網站的狀態：依更新時間排序的作品清單 (可被 bump 改動)"""
+
+    def __init__(self, records, base_url, page_size=24, latency=0.0, jitter=0.0, rate_429=0.0,
+                 retry_after=0, seed=0):
+        self.base_url = base_url.rstrip('/')
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._order = [str(r['id']) for r in records]
+        self._comics = {}
+        for record in records:
+            self._comics[str(record['id'])] = {
+                'title': record.get('title') or '',
+                'genre': record.get('genre') or '',
+                'author': record.get('author') or '',
+                'episode_count': record.get('episode_count') or 1,
+                'paid': '追漫券' in (record.get('access') or ''),
+            }
+        self.list_template = _read_fixture('list_complete.html')
+        self.detail_free = DetailTemplate(_read_fixture('detail_free.html'))
+        self.detail_paid = DetailTemplate(_read_fixture('detail_paid.html'))
+        with open(os.path.join(FIXTURE_DIR, 'cover.png'), 'rb') as f:
+            self.cover = f.read()
+        self.stats = {}
+
+    # --- 網址 ---
+
+    def list_url(self):
+        return f"{self.base_url}{LIST_PATH}?sortOrder=UPDATE&page={{page}}"
+
+    def detail_url(self, comic_id):
+        return f"{self.base_url}/zh-hant/x/{comic_id}/list?title_no={comic_id}"
+
+    def cover_url(self, comic_id):
+        return f"{self.base_url}/img/{comic_id}.png"
+
+    # --- 頁面 ---
+
+    @property
+    def max_page(self):
+        return max(1, (len(self._order) + self.page_size - 1) // self.page_size)
+
+    def list_page(self, page):
+        with self._lock:
+            ids = self._order[(page - 1) * self.page_size:page * self.page_size]
+            comics = [(comic_id, dict(self._comics[comic_id])) for comic_id in ids]
+        items = '\n'.join(ITEM_TEMPLATE.format(
+            href=self.detail_url(comic_id), thumb=self.cover_url(comic_id), title=html.escape(c['title']),
+            genre=html.escape(c['genre']), author=html.escape(c['author'])) for comic_id, c in comics)
+        pages = ''.join(f'<a href="?sortOrder=UPDATE&page={n}"><span>{n}</span></a>'
+                        for n in range(1, self.max_page + 1))
+        return self.list_template.replace('<!--ITEMS-->', items).replace('<!--PAGES-->', pages)
+
+    def detail(self, comic_id):
+        """回傳 (HTML, ETag)；找不到時回傳 (None, None)"""
+        with self._lock:
+            comic = dict(self._comics.get(comic_id) or {})
+        if not comic:
+            return None, None
+        template = self.detail_paid if comic['paid'] else self.detail_free
+        etag = f'"{comic_id}-{comic["episode_count"]}-{int(comic["paid"])}"'
+        return template.render(comic, self.cover_url(comic_id)), etag
+
+    def bump(self, n):
+        """隨機挑 n 部作品多一話，並移到「依更新時間排序」的最前面"""
+        with self._lock:
+            picked = self._random.sample(self._order, min(n, len(self._order)))
+            for comic_id in picked:
+                self._comics[comic_id]['episode_count'] += 1
+            picked_set = set(picked)
+            self._order = picked + [comic_id for comic_id in self._order if comic_id not in picked_set]
+        return picked
+
+    # --- 模擬網路狀況 ---
+
+    def delay(self):
+        wait = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self):
+        return self.rate_429 > 0 and self._random.random() < self.rate_429
+
+    def count(self, kind):
+        with self._lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive，與真實網站一樣可以重複使用連線
+    site = None                    # serve() 會設定成 StubWebtoon
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        site = self.site
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        if parts.path == '/_stub/bump':
+            picked = site.bump(int(query.get('n', ['1'])[0]))
+            return self._send(200, json.dumps({"bumped": picked}).encode('utf-8'), 'application/json')
+        if parts.path == '/_stub/stats':
+            return self._send(200, json.dumps(site.stats).encode('utf-8'), 'application/json')
+
+        site.delay()
+        if site.throttled():
+            site.count('429')
+            return self._send(429, b'Too Many Requests', 'text/plain',
+                              {'Retry-After': str(site.retry_after)})
+
+        if parts.path == LIST_PATH:
+            site.count('list')
+            page = int(query.get('page', ['1'])[0])
+            return self._send(200, site.list_page(page).encode('utf-8'))
+        if parts.path.endswith('/list') and 'title_no' in query:
+            site.count('detail')
+            body, etag = site.detail(query['title_no'][0])
+            if body is None:
+                return self._send(404, b'Not Found', 'text/plain')
+            if self.headers.get('If-None-Match') == etag:
+                site.count('detail_304')
+                return self._send(304, headers={'ETag': etag})
+            return self._send(200, body.encode('utf-8'), headers={'ETag': etag})
+        if parts.path.startswith('/img/'):
+            site.count('image')
+            return self._send(200, site.cover, 'image/png', {'Cache-Control': 'max-age=2592000'})
+        return self._send(404, b'Not Found', 'text/plain')
+
+
+def serve(records, host='127.0.0.1', port=0, **options):
+    """在背景執行緒啟動假伺服器，回傳 (server, StubWebtoon)；用完呼叫 server.shutdown()"""
+    server = ThreadingHTTPServer((host, port), None)
+    server.daemon_threads = True
+    site = StubWebtoon(records, f"http://{host}:{server.server_address[1]}", **options)
+    server.RequestHandlerClass = type('BoundStubHandler', (StubHandler,), {'site': site})
+    threading.Thread(target=server.serve_forever, daemon=True, name='stub-webtoon').start()
+    return server, site
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機的 Webtoon 假伺服器")
+    parser.add_argument('--catalogue', default='comics_data.json', help="comics_data.json 格式的作品清單")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--page-size', type=int, default=24, help="每個列表頁的作品數")
+    parser.add_argument('--latency', type=float, default=0, help="每個請求固定延遲 (毫秒)")
+    parser.add_argument('--jitter', type=float, default=0, help="額外的隨機延遲上限 (毫秒)")
+    parser.add_argument('--rate-429', type=float, default=0, help="回傳 429 的機率 (0 ~ 1)")
+    parser.add_argument('--retry-after', type=int, default=0, help="429 時的 Retry-After 秒數")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.catalogue, encoding='utf-8') as f:
+        records = json.load(f)
+    server, site = serve(records, args.host, args.port, page_size=args.page_size,
+                         latency=args.latency / 1000, jitter=args.jitter / 1000, rate_429=args.rate_429,
+                         retry_after=args.retry_after, seed=args.seed)
+    print(f"🧪 假伺服器已啟動：{len(records)} 部作品，{site.max_page} 頁")
+    print(f"   列表網址：{site.list_url()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+# 測試直接匯入 MyComicProject/backend 下的 webtoon_engine (與 app.py 相同)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def load_app(tmp_path, monkeypatch):
+    """以暫存目錄的資料檔重新載入 app.py：load_app(records) 回傳 app 模組"""
+    def load(records=()):
+        path = tmp_path / 'comics.json'
+        path.write_text(json.dumps(list(records), ensure_ascii=False), encoding='utf-8')
+        env = {
+            'STORAGE_BACKEND': 'json', 'STORAGE_PATH': str(path), 'CATALOGUE_SNAPSHOT': '',
+            'CHANGE_LOG_FILE': str(tmp_path / 'changes.jsonl'), 'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+            'CRAWL_CHECKPOINT_FILE': str(tmp_path / 'checkpoint.json'), 'CRAWL_LOCK_FILE': str(tmp_path / '.lock'),
+            'CRAWL_TARGETS_FILE': str(tmp_path / 'targets.json'),
+            'CRAWL_SCHEDULE_FILE': str(tmp_path / 'schedule.json'),
+            'CRAWL_PROFILE_DIR': str(tmp_path / 'profiles'), 'CRAWL_SCHEDULE_EVERY': '0',
+        }
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        reimport(monkeypatch, 'webtoon_engine.settings')
+        monkeypatch.delitem(sys.modules, 'app', raising=False)
+        return importlib.import_module('app')
+    yield load
+    sys.modules.pop('app', None)
+
+
+def reimport(monkeypatch, name):
+    """依目前的環境變數重新匯入模組 (例如讀取設定的 webtoon_engine.settings)，測試結束後換回原本的"""
+    original = importlib.import_module(name)
+    package, _, attr = name.rpartition('.')
+    monkeypatch.setattr(sys.modules[package], attr, original)
+    monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module(name)
@@ -0,0 +1,96 @@
+import json
+
+from webtoon_engine.catalogue import Catalogue
+from webtoon_engine.storage import JsonFileStorage
+
+
+def comic(comic_id, episode_count=1, checked_at=1.0):
+    return {
+        "id": comic_id, "title": f"作品{comic_id}", "genre": "奇幻", "author": "作者",
+        "episodes": f"共 {episode_count} 話", "episode_count": episode_count, "access": "連載中",
+        "picture": f"https://webtoon-phinf.pstatic.net/{comic_id}.png",
+        "hyperlink": f"https://www.webtoons.com/zh-hant/fantasy/a/list?title_no={comic_id}",
+        "crawl_date": "2024-01-01 00:00:00", "last_updated": "2024-01-02 00:00:00",
+        "crawl_meta": {"fingerprint": "f", "position": 0, "target": "t", "etag": None,
+                       "last_modified": None, "checked_at": checked_at},
+    }
+
+
+def open_catalogue(tmp_path, records):
+    path = tmp_path / 'comics.json'
+    path.write_text(json.dumps(records), encoding='utf-8')
+    return Catalogue(JsonFileStorage(str(path)), snapshot_path=str(tmp_path / 'snapshot.bin'))
+
+
+def test_public_records_hide_crawl_meta(tmp_path):
+    catalogue = open_catalogue(tmp_path, [comic('1'), comic('2')])
+    snapshot = catalogue.current()
+    assert 'crawl_meta' not in snapshot.index.get('1')
+    assert all('crawl_meta' not in item for item in snapshot.index.query()['items'])
+    assert b'crawl_meta' not in snapshot.full_body.raw
+    assert 'crawl_meta' in catalogue.records_by_id()['1']    # 爬蟲比對時仍然拿得到
+
+
+def test_meta_only_write_keeps_digest_and_warm_snapshot(tmp_path):
+    catalogue = open_catalogue(tmp_path, [comic('1'), comic('2')])
+    assert catalogue.warm()
+    before = catalogue.current()
+    catalogue.upsert([comic('1', checked_at=2.0)])
+    after = catalogue.current()
+    assert after.version != before.version
+    assert after.digest == before.digest and after.warmed
+    assert after.full_body.raw == before.full_body.raw
+
+    catalogue.upsert([comic('1', episode_count=2, checked_at=3.0)])
+    changed = catalogue.current()
+    assert changed.digest != before.digest and not changed.warmed
+
+
+class CountingStorage(JsonFileStorage):
+    def __init__(self, path):
+        super().__init__(path)
+        self.loads = 0
+
+    def load_all(self):
+        self.loads += 1
+        return super().load_all()
+
+
+def test_snapshot_is_reused_until_data_changes(tmp_path):
+    path = tmp_path / 'comics.json'
+    path.write_text(json.dumps([comic('1'), comic('2')]), encoding='utf-8')
+    storage = CountingStorage(str(path))
+    catalogue = Catalogue(storage)
+    first = catalogue.current()
+    assert catalogue.current() is first and storage.loads == 1
+    assert first.stats['total'] == 2
+
+    # 其他程序 (另一個 worker / 爬蟲) 寫入後，下一次 current() 就會重新載入
+    JsonFileStorage(str(path)).upsert_many([comic('3')])
+    second = catalogue.current()
+    assert second is not first and storage.loads == 2
+    assert second.index.get('3') is not None and second.stats['total'] == 3
+
+    catalogue.invalidate()
+    assert catalogue.current() is not second and storage.loads == 3
+
+
+def test_restart_reuses_warm_snapshot_until_change_token_moves(tmp_path):
+    path = tmp_path / 'comics.json'
+    path.write_text(json.dumps([comic('1'), comic('2')]), encoding='utf-8')
+    snapshot_path = str(tmp_path / 'snapshot.bin')
+    assert Catalogue(CountingStorage(str(path)), snapshot_path=snapshot_path).warm()
+
+    # 重新啟動：後端沒變，直接 mmap 暖快照，不必讀資料或重新序列化
+    storage = CountingStorage(str(path))
+    restarted = Catalogue(storage, snapshot_path=snapshot_path).current()
+    assert storage.loads == 0 and restarted.warmed
+    assert json.loads(restarted.full_body.raw)[0]['id'] == '1'
+
+    # 其他程序改了資料：change_token 不同，快照不能再用，要重新讀取
+    JsonFileStorage(str(path)).upsert_many([comic('1', episode_count=5)])
+    storage = CountingStorage(str(path))
+    rebuilt = Catalogue(storage, snapshot_path=snapshot_path).current()
+    assert storage.loads == 1 and not rebuilt.warmed
+    assert rebuilt.index.get('1')['episode_count'] == 5
+    assert rebuilt.digest != restarted.digest
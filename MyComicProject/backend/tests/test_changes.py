@@ -0,0 +1,72 @@
+from webtoon_engine.changes import OP_DELETE, OP_UPSERT, ChangeLog, diff_records
+
+
+def upsert(comic_id, episode_count, prev=None):
+    return {"id": comic_id, "op": OP_UPSERT, "episode_count": episode_count, "prev_episode_count": prev}
+
+
+def test_since_returns_last_op_per_id(tmp_path):
+    log = ChangeLog(str(tmp_path / 'changes.jsonl'))
+    assert log.since(0) == (0, {})
+    log.append([upsert('1', 1), upsert('2', 1)])
+    log.append([upsert('1', 2, 1), {"id": '2', "op": OP_DELETE}])
+    assert log.since(0) == (4, {'1': OP_UPSERT, '2': OP_DELETE})
+    assert log.since(2) == (4, {'1': OP_UPSERT, '2': OP_DELETE})
+    assert log.since(4) == (4, {})
+    assert log.since(5) == (4, None)
+
+
+def test_other_instance_sees_appends(tmp_path):
+    path = str(tmp_path / 'changes.jsonl')
+    writer, reader = ChangeLog(path), ChangeLog(path)
+    writer.append([upsert('1', 1)])
+    assert reader.latest() == 1
+    assert reader.wait(0, timeout=0)
+
+
+def test_window_limits_incremental_sync(tmp_path):
+    log = ChangeLog(str(tmp_path / 'changes.jsonl'), window=3)
+    for episode in range(1, 6):
+        log.append([upsert('1', episode, episode - 1)])
+    assert log.covers(2) and not log.covers(1)
+    assert log.since(1) == (5, None)
+    assert log.since(2) == (5, {'1': OP_UPSERT})
+
+
+def test_compaction_keeps_window_and_episode_history(tmp_path):
+    path = tmp_path / 'changes.jsonl'
+    log = ChangeLog(str(path), window=2)
+    log.append([upsert('1', 1)])
+    log.append([upsert('1', 1, 1)])          # 只改了標題之類的欄位，不算話數歷史
+    log.append([upsert('1', 2, 1)])
+    log.append([upsert('2', 1)])
+    log.append([upsert('2', 1, 1)])
+    log.compact()
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1 + 4                 # 壓縮標記 + seq 1、3 (話數歷史) + 最近 2 筆
+    assert [entry['seq'] for entry in log.history('1')] == [1, 3]
+    fresh = ChangeLog(str(path), window=2)
+    assert fresh.latest() == 5
+    assert fresh.covers(3) and not fresh.covers(2)
+    assert fresh.since(3) == (5, {'2': OP_UPSERT})
+
+
+def test_appends_compact_the_file_and_readers_follow(tmp_path):
+    path = str(tmp_path / 'changes.jsonl')
+    writer, reader = ChangeLog(path, window=5), ChangeLog(path, window=5)
+    for episode in range(1, 21):
+        writer.append([upsert('1', episode, episode - 1), upsert('2', 1, 1)])
+        assert reader.latest() == writer.latest()
+    with open(path, encoding='utf-8') as f:
+        assert sum(1 for _ in f) < 40
+    assert [entry['episode_count'] for entry in reader.history('1')] == list(range(1, 21))
+    assert reader.since(38) == (40, {'1': OP_UPSERT, '2': OP_UPSERT})
+
+
+def test_diff_records_ignores_crawl_meta_only_changes():
+    old = {'1': {"id": '1', "title": "作品", "episode_count": 3, "crawl_meta": {"etag": 'a'}}}
+    records = [{"id": '1', "title": "作品", "episode_count": 3, "crawl_meta": {"etag": 'b'}},
+               {"id": '2', "title": "新作品", "episode_count": 1}]
+    assert diff_records(old.get, records) == [
+        {"id": '2', "op": OP_UPSERT, "episode_count": 1, "prev_episode_count": None}]
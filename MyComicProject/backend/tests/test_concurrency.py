@@ -0,0 +1,34 @@
+import time
+
+from webtoon_engine.concurrency import HostRateLimiter, ordered_map
+
+
+def test_rate_limiter_paces_each_host_separately():
+    limiter = HostRateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire('http://a.example/list')
+    limiter.acquire('http://b.example/list')                  # 另一個主機有自己的 token
+    elapsed = time.monotonic() - started
+    assert 0.09 <= elapsed < 0.5
+
+
+def test_rate_limiter_disabled():
+    limiter = HostRateLimiter(rate=0)
+    started = time.monotonic()
+    for _ in range(100):
+        limiter.acquire('http://a.example/')
+    assert time.monotonic() - started < 0.05
+
+
+def test_ordered_map_keeps_input_order_and_reports_errors():
+    def work(n):
+        if n == 3:
+            raise ValueError(n)
+        time.sleep(0.01 * (5 - n))
+        return n * 10
+
+    results = list(ordered_map(work, range(5), max_workers=4))
+    assert [item for item, _, _ in results] == [0, 1, 2, 3, 4]
+    assert [value for _, value, _ in results] == [0, 10, 20, None, 40]
+    assert isinstance(results[3][2], ValueError)
@@ -0,0 +1,25 @@
+from webtoon_engine.extract import (ACCESS_FREE, ACCESS_ONGOING_PAID, ACCESS_PAID, PAYWALL_TEXT,
+                                    access_note, extract_detail)
+
+
+def page(body, head=''):
+    return f'<html><head>{head}</head><body>{body}</body></html>'
+
+
+def test_paywall_text_in_page_body():
+    assert access_note(page(f'<p class="notice">{PAYWALL_TEXT}</p>')) == ACCESS_PAID
+    assert access_note(page(f'<p>{PAYWALL_TEXT}</p>'), completed=False) == ACCESS_ONGOING_PAID
+
+
+def test_paywall_text_outside_text_nodes_is_ignored():
+    assert access_note(page('<p>第 1 話</p>', f'<script>var notice = "{PAYWALL_TEXT}";</script>')) == ACCESS_FREE
+    assert access_note(page('', f'<meta name="description" content="{PAYWALL_TEXT}">')) == ACCESS_FREE
+    assert access_note(page(f'<!-- {PAYWALL_TEXT} --><p>第 1 話</p>')) == ACCESS_FREE
+
+
+def test_extract_detail_uses_same_access_rule():
+    html = page('<ul id="_listUl"><li class="_episodeItem" data-episode-no="12"></li></ul>',
+                f'<script>"{PAYWALL_TEXT}"</script>')
+    detail = extract_detail(html)
+    assert detail['episode_count'] == 12
+    assert detail['access'] == ACCESS_FREE
@@ -0,0 +1,22 @@
+from webtoon_engine.http_cache import if_none_match, make_etag, negotiate
+
+
+def test_etag_differs_per_encoding():
+    tags = {make_etag('digest', 'all', encoding) for encoding in ('identity', 'gzip', 'br')}
+    assert len(tags) == 3
+    assert make_etag('digest', 'all', 'gzip') == make_etag('digest', 'all', 'gzip')
+
+
+def test_if_none_match_lists_star_and_weak_tags():
+    etag = make_etag('digest', 'all', 'gzip')
+    assert if_none_match(f'"other", {etag}', etag)
+    assert if_none_match(f'W/{etag}', etag)
+    assert if_none_match('*', etag)
+    assert not if_none_match('', etag)
+    assert not if_none_match(make_etag('digest', 'all', 'identity'), etag)
+
+
+def test_negotiate_respects_q_values():
+    assert negotiate('gzip;q=0, identity') is None
+    assert negotiate('gzip, deflate') == 'gzip'
+    assert negotiate('') is None
@@ -0,0 +1,61 @@
+import os
+
+from webtoon_engine.image_cache import ImageCache, cache_key
+
+URL = 'https://webtoon-phinf.pstatic.net/cover.png'
+
+
+class Response:
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'image/png'}
+
+    def iter_content(self, size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+def counting_fetcher(requested):
+    def fetch(url, stream=False):
+        requested.append(url)
+        return Response(b'x' * 100)
+    return fetch
+
+
+def test_alias_points_at_the_target_until_it_is_evicted(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=150, fetcher=counting_fetcher([]))
+    original, hit = cache.get_original(URL)
+    thumb_key = cache_key(URL, 'w320.webp')
+    cache.alias(thumb_key, original)
+
+    image = cache.lookup(thumb_key)
+    assert image.key == original.key and image.etag == original.etag
+
+    cache.get_original(URL + '?other')                 # 超過容量，原圖被淘汰
+    assert not os.path.exists(original.path)
+    assert cache.lookup(thumb_key) is None
+
+
+def test_proxy_refetches_when_the_file_is_evicted_before_it_is_sent(load_app):
+    app = load_app()
+    requested = []
+    cache = app.image_cache = ImageCache(app.IMAGE_CACHE_DIR, 10 ** 6, fetcher=counting_fetcher(requested))
+    client = app.app.test_client()
+    assert client.get('/api/proxy-image', query_string={'url': URL}).status_code == 200
+
+    # 模擬 lookup 之後、send_file 之前被其他請求的 LRU 淘汰刪掉
+    lookup = cache.lookup
+
+    def evicting_lookup(key):
+        image = lookup(key)
+        if image is not None and len(requested) == 1:
+            os.remove(image.path)
+        return image
+    cache.lookup = evicting_lookup
+
+    resp = client.get('/api/proxy-image', query_string={'url': URL})
+    assert resp.status_code == 200 and resp.data == b'x' * 100
+    assert len(requested) == 2
@@ -0,0 +1,77 @@
+from webtoon_engine.incremental import (build_crawl_meta, conditional_headers, list_fingerprint,
+                                        needs_detail_fetch)
+
+NOW = 1_000_000.0
+
+
+def make_entry(position=0, target='bench', title='標題', genre='奇幻', thumbnail='a.png'):
+    return {"comic_id": "1", "fingerprint": list_fingerprint(title, genre, thumbnail),
+            "position": position, "target": target}
+
+
+def stored(entry, checked_at=NOW, etag='"v1"'):
+    return {"id": "1", "crawl_meta": {"fingerprint": entry['fingerprint'], "position": entry['position'],
+                                      "target": entry['target'], "etag": etag, "last_modified": None,
+                                      "checked_at": checked_at}}
+
+
+def test_new_or_unfingerprinted_records_are_fetched():
+    entry = make_entry()
+    assert needs_detail_fetch(None, entry, now=NOW)
+    assert needs_detail_fetch({"id": "1"}, entry, now=NOW)
+
+
+def test_unchanged_entry_is_skipped():
+    entry = make_entry(position=30)
+    assert not needs_detail_fetch(stored(entry), entry, now=NOW)
+
+
+def test_fingerprint_change_is_fetched():
+    old = stored(make_entry())
+    assert needs_detail_fetch(old, make_entry(title='新標題'), now=NOW)
+
+
+def test_position_change_in_either_direction_is_fetched():
+    old = stored(make_entry(position=10))
+    assert needs_detail_fetch(old, make_entry(position=3), now=NOW)
+    assert needs_detail_fetch(old, make_entry(position=11), now=NOW)
+
+
+def test_position_in_another_list_is_not_compared():
+    old = stored(make_entry(position=10, target='other'))
+    assert not needs_detail_fetch(old, make_entry(position=3), now=NOW)
+
+
+def test_recheck_fetches_titles_that_stayed_at_the_top():
+    # 本來就在第一位的作品多了一話，位置不會變
+    entry = make_entry(position=0)
+    assert not needs_detail_fetch(stored(entry), entry, now=NOW)
+    assert needs_detail_fetch(stored(entry), entry, now=NOW, recheck=True)
+
+
+def test_stale_records_are_fetched_after_ttl():
+    entry = make_entry(position=5)
+    assert needs_detail_fetch(stored(entry, checked_at=NOW - 101), entry, ttl=100, now=NOW)
+    assert not needs_detail_fetch(stored(entry, checked_at=NOW - 99), entry, ttl=100, now=NOW)
+
+
+def test_conditional_headers_and_meta():
+    entry = make_entry(position=4)
+
+    class Response:
+        headers = {'ETag': '"v2"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+    meta = build_crawl_meta(entry, Response(), now=NOW)
+    assert meta['position'] == 4 and meta['etag'] == '"v2"' and meta['checked_at'] == NOW
+    headers = conditional_headers({"crawl_meta": meta})
+    assert headers == {'If-None-Match': '"v2"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert conditional_headers(None) == {}
+
+
+def test_only_unsorted_ongoing_lists_recheck_everything():
+    from webtoon_engine.targets import default_targets
+
+    targets = {target.name: target for target in default_targets()}
+    assert targets['zh-hant-ongoing-monday'].recheck_all
+    assert not targets['zh-hant-completed'].recheck_all
+    assert not targets['zh-hant-canvas'].recheck_all
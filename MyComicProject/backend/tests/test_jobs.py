@@ -0,0 +1,133 @@
+import threading
+
+from webtoon_engine.jobs import DONE_MESSAGE, CrawlJobRunner, sse_stream
+
+
+def make_runner(tmp_path, release):
+    def crawl(job):
+        yield "第一則"
+        yield "第二則"
+        release.wait(5)
+        yield "第三則"
+
+    return CrawlJobRunner(crawl, str(tmp_path / 'checkpoint.json'), str(tmp_path / 'crawl.lock'))
+
+
+def data_lines(chunks):
+    return [chunk for chunk in chunks if chunk.startswith(('id:', 'data:'))]
+
+
+def test_stream_tags_events_with_job_and_seq(tmp_path):
+    release = threading.Event()
+    release.set()
+    runner = make_runner(tmp_path, release)
+    chunks = data_lines(sse_stream(runner, {}, started_message="開始"))
+    job = runner.current
+    assert chunks[0] == "data: 開始\n\n"
+    assert chunks[1] == f"id: {job.id}:1\ndata: 第一則\n\n"
+    assert chunks[-1] == f"id: {job.id}:4\ndata: {DONE_MESSAGE}\n\n"
+
+
+def test_reconnect_resumes_after_last_event_id(tmp_path):
+    release = threading.Event()
+    runner = make_runner(tmp_path, release)
+    stream = sse_stream(runner, {})
+    first = next(chunk for chunk in stream if chunk.startswith('id:'))
+    job = runner.current
+    assert first == f"id: {job.id}:1\ndata: 第一則\n\n"
+
+    release.set()
+    resumed = data_lines(sse_stream(runner, {}, last_event_id=f"{job.id}:1"))
+    assert [chunk.split('data: ')[1] for chunk in resumed] == ["第二則\n\n", "第三則\n\n", f"{DONE_MESSAGE}\n\n"]
+    assert runner.current is job
+
+
+def test_reconnect_to_unknown_job_ends_stream(tmp_path):
+    runner = make_runner(tmp_path, threading.Event())
+    assert list(sse_stream(runner, {}, last_event_id="gone:3")) == [f"data: {DONE_MESSAGE}\n\n"]
+    assert runner.current is None
+
+
+def run_to_end(runner, params=None, restart=False):
+    job, created = runner.start(params or {}, restart=restart)
+    assert created
+    for _ in job.subscribe(heartbeat=1):
+        pass
+    return job
+
+
+def test_failed_job_resumes_from_checkpoint(tmp_path):
+    attempts = []
+
+    def crawl(job):
+        start = (job.resume_state or {}).get('page', 0) + 1
+        attempts.append((start, job.params))
+        for page in range(start, 4):
+            if page == 2 and len(attempts) == 1:
+                raise RuntimeError("連線中斷")
+            job.save_progress(page=page)
+            yield f"第 {page} 頁"
+
+    runner = CrawlJobRunner(crawl, str(tmp_path / 'checkpoint.json'), str(tmp_path / 'crawl.lock'))
+    assert run_to_end(runner, {"pages": 3}).status == 'failed'
+    assert runner.checkpoint.load()['page'] == 1
+
+    assert run_to_end(runner, {"pages": 9}).status == 'done'
+    assert attempts == [(1, {"pages": 3}), (2, {"pages": 3})]     # 接續時沿用上次的參數
+    assert runner.checkpoint.load() is None
+
+    run_to_end(runner, {"pages": 9})
+    assert attempts[-1] == (1, {"pages": 9})
+
+
+def two_workers(tmp_path, crawl):
+    # 兩個執行器各自開檔取得 flock，就像兩個 gunicorn worker
+    paths = (str(tmp_path / 'checkpoint.json'), str(tmp_path / 'crawl.lock'))
+    return CrawlJobRunner(crawl, *paths), CrawlJobRunner(crawl, *paths)
+
+
+def test_other_worker_attaches_to_running_crawl(tmp_path):
+    release = threading.Event()
+    owner, other = two_workers(tmp_path, make_runner(tmp_path, release).crawl_func)
+    job, created = owner.start({"pages": 1})
+    assert created
+
+    remote, created = other.start({"pages": 9})
+    assert not created and remote.id == job.id and remote.params == {"pages": 1}
+    assert other.current.id == job.id
+    events = remote.subscribe(poll=0.01)
+    assert next(events) == (1, "第一則")
+    release.set()
+    assert [message for _, message in events] == ["第二則", "第三則", DONE_MESSAGE]
+    assert remote.status == 'done'
+    assert other.current is None
+
+
+def test_sse_stream_from_other_worker_resumes_after_last_event_id(tmp_path):
+    release = threading.Event()
+    owner, other = two_workers(tmp_path, make_runner(tmp_path, release).crawl_func)
+    job, _ = owner.start({})
+    for event in job.subscribe():
+        if event and event[0] == 2:
+            break
+    release.set()
+    chunks = data_lines(sse_stream(other, {}, last_event_id=f"{job.id}:2"))
+    assert chunks == [f"id: {job.id}:3\ndata: 第三則\n\n", f"id: {job.id}:4\ndata: {DONE_MESSAGE}\n\n"]
+
+
+def test_cancel_from_other_worker(tmp_path):
+    def crawl(job):
+        while True:  # 取消由執行器在每則訊息之後檢查
+            yield "進行中"
+            threading.Event().wait(0.01)
+
+    owner, other = two_workers(tmp_path, crawl)
+    job, _ = owner.start({})
+    assert other.cancel(job_id='other-job') is None
+    assert other.cancel(job_id=job.id).id == job.id
+    for _ in job.subscribe(heartbeat=1):
+        pass
+    assert job.status == 'cancelled'
+    job2, created = other.start({}, restart=True)
+    assert created and not job2.cancelled
+    job2.cancel()
@@ -0,0 +1,96 @@
+import functools
+
+from test_scan import ITEM, Response
+
+from webtoon_engine import pipeline, settings
+from webtoon_engine.catalogue import Catalogue
+from webtoon_engine.pipeline import CrawlEngine
+from webtoon_engine.storage import JsonFileStorage, SqliteStorage
+from webtoon_engine.targets import CrawlTarget, TargetScheduler
+
+DETAIL = '<ul id="_listUl"><li class="_episodeItem" data-episode-no="5"></li></ul><p class="author">作者</p>'
+
+
+class Job:
+    def __init__(self, params, resume_state=None):
+        self.id = 'test'
+        self.params = dict({"concurrency": 1, "incremental": False, "processes": 1, "rate": 0, "pages": 0,
+                            "targets": 'all', "prefetch": False, "profile": False}, **params)
+        self.resume_state = resume_state
+        self.progress = []
+
+    def save_progress(self, **state):
+        self.progress.append(state)
+
+
+def make_engine(tmp_path, fetcher, targets):
+    scheduler = TargetScheduler(targets, str(tmp_path / 'schedule.json'))
+    catalogue = Catalogue(JsonFileStorage(str(tmp_path / 'comics.json')))
+    return CrawlEngine(catalogue, scheduler, fetcher=fetcher), scheduler
+
+
+def site(list_status):
+    def fetch(url, headers=None):
+        if '/list' in url:
+            return Response(ITEM.format(id='1'), list_status.get(url.split('/')[2], 200))
+        return Response(DETAIL)
+    return fetch
+
+
+def crawl(engine, job):
+    return list(engine.run(job))
+
+
+def test_failed_list_page_does_not_mark_target_done(tmp_path):
+    ok = CrawlTarget('ok', 'http://ok/list', completed=False)
+    broken = CrawlTarget('broken', 'http://broken/list', completed=False)
+    engine, scheduler = make_engine(tmp_path, site({'broken': 404}), [ok, broken])
+    messages = crawl(engine, Job({}))
+    assert any('broken 有 1 頁讀取失敗' in message for message in messages)
+    assert [target.name for target in scheduler.due()] == ['broken']
+    assert engine.catalogue.current().index.get('1')['episode_count'] == 5
+
+
+def test_manual_crawl_runs_enabled_targets_even_if_not_due(tmp_path):
+    target = CrawlTarget('ok', 'http://ok/list', completed=False)
+    engine, scheduler = make_engine(tmp_path, site({}), [target])
+    crawl(engine, Job({}))
+    assert scheduler.due() == []
+    messages = crawl(engine, Job({}))
+    assert any('開始爬取 ok' in message for message in messages)
+    assert any('沒有到期' in message for message in crawl(engine, Job({"targets": 'due'})))
+
+
+def test_resume_starts_from_the_interrupted_target(tmp_path):
+    first = CrawlTarget('first', 'http://first/list', completed=False, priority=5)
+    second = CrawlTarget('second', 'http://second/list', completed=False)
+    engine, _ = make_engine(tmp_path, site({}), [first, second])
+    messages = crawl(engine, Job({}, resume_state={"target": 'second', "page": 0}))
+    assert not any('開始爬取 first' in message for message in messages)
+    assert any('開始爬取 second' in message for message in messages)
+
+
+def test_cli_crawls_into_the_configured_backend_and_warms_the_snapshot(tmp_path, monkeypatch, capsys):
+    for name, value in {
+        'STORAGE_BACKEND': 'sqlite', 'STORAGE_PATH': str(tmp_path / 'comics.db'), 'DATA_FILE': str(tmp_path / 'none.json'),
+        'CHANGE_LOG_FILE': str(tmp_path / 'changes.jsonl'), 'CATALOGUE_SNAPSHOT': str(tmp_path / 'snapshot.bin'),
+        'CRAWL_SCHEDULE_FILE': str(tmp_path / 'schedule.json'), 'IMAGE_CACHE_DIR': str(tmp_path / 'images'),
+        'CRAWL_CHECKPOINT_FILE': str(tmp_path / 'checkpoint.json'), 'CRAWL_LOCK_FILE': str(tmp_path / '.lock'),
+        'CRAWL_PROFILE_DIR': str(tmp_path / 'profiles'),
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(pipeline, 'load_targets', lambda path: [CrawlTarget('ok', 'http://ok/list', completed=False)])
+    monkeypatch.setattr(pipeline, 'CrawlEngine', functools.partial(CrawlEngine, fetcher=site({})))
+
+    assert pipeline.main(['crawl', '--processes', '1', '--rate', '0', '--no-prefetch', '--no-incremental']) == 0
+    assert '開始爬取 ok' in capsys.readouterr().out
+    assert [record['id'] for record in SqliteStorage(str(tmp_path / 'comics.db')).load_all()] == ['1']
+
+    assert pipeline.main(['warm']) == 0                            # 爬完時已經寫過暖快照
+    assert '已是最新' in capsys.readouterr().out
+    (tmp_path / 'snapshot.bin').unlink()
+    assert pipeline.main(['warm']) == 0
+    assert '已寫入' in capsys.readouterr().out and (tmp_path / 'snapshot.bin').exists()
+
+    monkeypatch.setattr(settings, 'CATALOGUE_SNAPSHOT', '')
+    assert pipeline.main(['warm']) == 1
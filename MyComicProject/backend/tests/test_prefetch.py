@@ -0,0 +1,46 @@
+import threading
+
+from webtoon_engine.image_cache import ImageCache, cache_key
+from webtoon_engine.prefetch import CoverPrefetcher
+
+from test_image_cache import Response
+
+
+def test_prefetch_downloads_each_cover_once(tmp_path):
+    requested = []
+    lock = threading.Lock()
+
+    def fetch(url, stream=False):
+        with lock:
+            requested.append(url)
+        return Response(b'x' * 10, 404 if 'broken' in url else 200)
+
+    cache = ImageCache(str(tmp_path), 10 ** 6, fetcher=fetch)
+    urls = [f'https://webtoon-phinf.pstatic.net/{i}.png' for i in range(5)]
+    prefetcher = CoverPrefetcher(cache, max_workers=2)
+    try:
+        assert all(prefetcher.submit(url) for url in urls)
+        assert not prefetcher.submit(urls[0])                       # 重複
+        assert not prefetcher.submit('https://evil.example.com/x.png')  # 不在白名單
+        assert not prefetcher.submit(None)
+        assert prefetcher.submit('https://webtoon-phinf.pstatic.net/broken.png')
+        assert prefetcher.wait(timeout=5)
+    finally:
+        prefetcher.close()
+
+    assert sorted(requested) == sorted(urls + ['https://webtoon-phinf.pstatic.net/broken.png'])
+    assert all(cache.contains(cache_key(url)) for url in urls)
+    assert prefetcher.progress() == {"queued": 6, "done": 5, "skipped": 0, "failed": 1, "bytes": 50}
+
+
+def test_already_cached_covers_are_skipped(tmp_path):
+    url = 'https://webtoon-phinf.pstatic.net/1.png'
+    cache = ImageCache(str(tmp_path), 10 ** 6, fetcher=lambda url, stream=False: Response(b'x'))
+    cache.get_original(url)
+    prefetcher = CoverPrefetcher(cache)
+    try:
+        assert not prefetcher.submit(url)
+        assert prefetcher.wait(timeout=1)
+    finally:
+        prefetcher.close()
+    assert prefetcher.progress()['skipped'] == 1 and prefetcher.pending == 0
@@ -0,0 +1,25 @@
+import os
+
+from conftest import reimport
+
+
+def test_default_profile_dir_follows_settings(tmp_path, monkeypatch):
+    data_dir, cwd = tmp_path / 'data', tmp_path / 'cwd'
+    cwd.mkdir()
+    monkeypatch.setenv('CRAWL_PROFILE_DIR', str(data_dir / 'profiles'))
+    monkeypatch.chdir(cwd)
+    reimport(monkeypatch, 'webtoon_engine.settings')
+    profiling = reimport(monkeypatch, 'webtoon_engine.profiling')
+
+    # 沒指定目錄：報告寫到設定的資料目錄，不會散落在啟動時的工作目錄
+    with profiling.profile_run('test', engine='cprofile') as run:
+        sum(range(1000))
+    assert os.path.dirname(run.path) == str(data_dir / 'profiles') and os.path.exists(run.path)
+    assert list(cwd.iterdir()) == []
+
+
+def test_profile_run_writes_report(tmp_path):
+    from webtoon_engine import profiling
+    with profiling.profile_run('test', str(tmp_path), engine='cprofile') as run:
+        sum(range(1000))
+    assert run.path and os.path.exists(run.path)
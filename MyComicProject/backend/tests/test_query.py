@@ -0,0 +1,61 @@
+import pytest
+
+from webtoon_engine.columnar import CompactCatalogue
+from webtoon_engine.query import CatalogueIndex
+
+
+def comic(comic_id, title, genre='奇幻', access='連載中', episode_count=1):
+    return {
+        "id": comic_id, "title": title, "genre": genre, "author": "作者",
+        "episodes": f"共 {episode_count} 話", "episode_count": episode_count, "access": access,
+        "picture": f"https://webtoon-phinf.pstatic.net/{comic_id}.png",
+        "hyperlink": f"https://www.webtoons.com/zh-hant/a/list?title_no={comic_id}",
+        "crawl_date": "2024-01-01 00:00:00", "last_updated": "2024-01-02 00:00:00",
+    }
+
+
+RECORDS = [
+    comic('1', '勇者傳說', episode_count=30),
+    comic('2', '戀愛日記', genre='愛情', episode_count=5),
+    comic('3', '勇者歸來', access='可免費看完整話數', episode_count=12),
+    comic('4', '深夜食堂', genre='劇情', access='需要追漫券', episode_count=50),
+    comic('5', '魔法學院', episode_count=8),
+]
+
+
+@pytest.fixture
+def client(load_app):
+    return load_app(RECORDS).app.test_client()
+
+
+def test_unknown_params_keep_the_full_list_shape(client):
+    full = client.get('/api/comics').get_json()
+    assert [item['id'] for item in full] == ['1', '2', '3', '4', '5']
+    # 防快取參數不會讓回應變成分頁格式
+    assert client.get('/api/comics?_=123').get_json() == full
+    assert isinstance(client.get('/api/comics?limit=2').get_json(), dict)
+
+
+def test_pagination_and_filters(client):
+    page = client.get('/api/comics?limit=2&page=2').get_json()
+    assert [item['id'] for item in page['items']] == ['3', '4']
+    assert (page['total'], page['page'], page['limit'], page['pages']) == (5, 2, 2, 3)
+
+    assert [c['id'] for c in client.get('/api/comics?q=勇者').get_json()['items']] == ['1', '3']
+    assert [c['id'] for c in client.get('/api/comics?genre=愛情').get_json()['items']] == ['2']
+    assert [c['id'] for c in client.get('/api/comics?status=paid').get_json()['items']] == ['4']
+    assert [c['id'] for c in client.get('/api/comics?status=free_completed').get_json()['items']] == ['3']
+    ordered = client.get('/api/comics?sort=episode_count&order=desc').get_json()['items']
+    assert [c['id'] for c in ordered] == ['4', '1', '3', '5', '2']
+
+
+def test_invalid_status_or_sort_is_rejected(client):
+    assert client.get('/api/comics?status=nope').status_code == 400
+    assert client.get('/api/comics?sort=nope').status_code == 400
+
+
+def test_limit_is_clamped():
+    index = CatalogueIndex(CompactCatalogue.from_records(RECORDS)[0])
+    assert index.query(limit=0)['limit'] == 1
+    result = index.query(page=0, limit=1000)
+    assert result['limit'] == 100 and result['page'] == 1 and len(result['items']) == 5
@@ -0,0 +1,81 @@
+from webtoon_engine.incremental import list_fingerprint
+from webtoon_engine.scan import scan_page
+from webtoon_engine.targets import CrawlTarget
+
+TARGET = CrawlTarget('test', 'http://stub/list?page={page}', sorted_by_update=True)
+ITEM = ('<a class="link _originals_title_a" href="http://stub/detail?title_no={id}">'
+        '<img src="http://stub/{id}.png"><p class="genre">奇幻</p><p class="title">作品{id}</p></a>')
+
+
+class Response:
+    def __init__(self, text='', status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = None
+
+
+class NoLimit:
+    def acquire(self, url):
+        pass
+
+
+def record(comic_id, position=None):
+    meta = {"fingerprint": list_fingerprint(f'作品{comic_id}', '奇幻', f'http://stub/{comic_id}.png'),
+            "target": 'test', "etag": None, "last_modified": None, "checked_at": 9e18}
+    if position is not None:
+        meta['position'] = position
+    return {"id": comic_id, "title": f'作品{comic_id}', "episode_count": 3, "crawl_meta": meta}
+
+
+def run(generator):
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
+
+
+def fetcher_for(ids, requested):
+    listing = ''.join(ITEM.format(id=comic_id) for comic_id in ids)
+
+    def fetch(url, headers=None):
+        if '/list' in url:
+            return Response(listing)
+        requested.append(url)
+        return Response(status_code=304)
+    return fetch
+
+
+def test_skipped_entries_persist_their_new_position():
+    # 舊資料沒有記錄位置：不必抓內頁，但位置要寫回 (放進 dirty)
+    local_db = {'1': record('1'), '2': record('2')}
+    requested = []
+    result = run(scan_page(2, local_db, fetcher_for(['1', '2'], requested), NoLimit(),
+                           incremental=True, position=24, target=TARGET))
+    assert requested == []
+    assert set(result.dirty) == {'1', '2'}
+    assert local_db['2']['crawl_meta']['position'] == 25
+
+
+def test_recheck_sends_conditional_gets_and_304_is_not_a_change():
+    local_db = {'1': record('1', 0), '2': record('2', 1)}
+    requested = []
+    result = run(scan_page(1, local_db, fetcher_for(['1', '2'], requested), NoLimit(),
+                           incremental=True, target=TARGET, recheck=True))
+    assert len(requested) == 2
+    assert result.changes == 0 and result.skipped == 2
+
+
+def test_non_200_list_page_is_a_failed_page():
+    for status in (404, 429, 503):
+        messages = []
+        gen = scan_page(1, {}, lambda url, headers=None: Response('<html></html>', status), NoLimit(), target=TARGET)
+        while True:
+            try:
+                messages.append(next(gen))
+            except StopIteration as stop:
+                result = stop.value
+                break
+        assert not result.ok
+        assert f"HTTP {status}" in messages[0]
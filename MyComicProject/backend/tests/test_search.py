@@ -0,0 +1,54 @@
+from webtoon_engine.search import SearchIndex
+
+ENTRIES = [
+    ('1', '全知讀者視角', '申松', '奇幻'),
+    ('2', '讀者', '作者甲', '愛情'),
+    ('3', 'Tower of God', 'SIU', '奇幻'),
+    ('4', 'Lore Olympus', 'Rachel Smythe', '愛情'),
+    ('5', '再婚皇后', 'Alphatart', '奇幻'),
+]
+
+
+def build():
+    index = SearchIndex()
+    index.rebuild(ENTRIES)
+    return index
+
+
+def ids(result):
+    return [comic_id for comic_id, _ in result[1]]
+
+
+def test_exact_title_ranks_first_and_fields_are_weighted():
+    index = build()
+    assert ids(index.search('讀者'))[:2] == ['2', '1']
+    total, hits = index.search('奇幻')
+    assert total == 3 and set(ids((total, hits))) == {'1', '3', '5'}
+
+
+def test_normalization_prefix_and_typo():
+    index = build()
+    assert ids(index.search('ＴＯＷＥＲ'))[0] == '3'          # 全形、大小寫
+    assert ids(index.search('lore olym')) == ['4']             # 最後一個字只打前綴
+    assert ids(index.search('olimpus')) == ['4']               # 一個錯字
+    assert index.search('zzzz') == (0, [])
+
+
+def test_incremental_update_matches_rebuild():
+    index = build()
+    index.update([{"id": '3', "title": '神之塔', "author": 'SIU', "genre": '奇幻'},
+                  {"id": '6', "title": '讀者之聲', "author": '某人', "genre": '愛情'}])
+    index.remove(['2'])
+    rebuilt = SearchIndex()
+    rebuilt.rebuild([e for e in ENTRIES if e[0] not in ('2', '3')]
+                    + [('3', '神之塔', 'SIU', '奇幻'), ('6', '讀者之聲', '某人', '愛情')])
+    for q in ('讀者', 'tower', '神之塔', '奇幻', 'siu'):
+        assert index.search(q) == rebuilt.search(q), q
+    assert len(index) == len(rebuilt) == 5
+
+
+def test_result_cache_is_cleared_on_write():
+    index = build()
+    assert ids(index.search('再婚')) == ['5']
+    index.remove(['5'])
+    assert index.search('再婚') == (0, [])
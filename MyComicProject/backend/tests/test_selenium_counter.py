@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# webtoon_selenium_crawler.py 在專案根目錄
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+import webtoon_selenium_crawler as counter  # noqa: E402
+
+URL = 'https://www.webtoons.com/zh-hant/fantasy/a/list?title_no=1'
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+        self.encoding = None
+
+    def raise_for_status(self):
+        pass
+
+
+def list_page(page, total, per_page=10, group=10):
+    """沒有話次編號 (只能數 li) 的列表頁；分頁列一次顯示 group 頁"""
+    last = (total + per_page - 1) // per_page
+    items = min(per_page, total - (page - 1) * per_page)
+    first_shown = (page - 1) // group * group + 1
+    shown = range(first_shown, min(first_shown + group - 1, last) + 1)
+    links = ''.join(f'<a href="#">{n}</a>' for n in shown)
+    if shown[-1] < last:
+        links += '<a class="pg_next" href="#">下一頁</a>'
+    return f'<ul id="_listUl">{"<li>話</li>" * items}</ul><div class="paginate">{links}</div>'
+
+
+def serve(monkeypatch, total, requested):
+    def fetch(url, headers=None):
+        page = int(parse_qs(urlsplit(url).query).get('page', ['1'])[0])
+        requested.append(page)
+        return Response(list_page(page, total))
+    monkeypatch.setattr(counter, 'fetch', fetch)
+
+
+def test_fast_path_uses_latest_episode_number(monkeypatch):
+    requested = []
+    monkeypatch.setattr(counter, 'fetch', lambda url, headers=None: requested.append(url) or Response(
+        '<ul id="_listUl"><li class="_episodeItem" data-episode-no="87"></li></ul>'))
+    assert counter.count_episodes_fast(URL) == 87
+    assert requested == [URL]
+
+
+@pytest.mark.parametrize('total, pages', [(23, [1, 3]), (115, [1, 10, 11, 12]), (7, [1])])
+def test_fast_path_jumps_to_the_last_page(monkeypatch, total, pages):
+    requested = []
+    serve(monkeypatch, total, requested)
+    assert counter.count_episodes_fast(URL) == total
+    assert requested == pages
+
+
+def test_falls_back_to_browser_only_when_fast_path_finds_nothing(monkeypatch):
+    monkeypatch.setattr(counter, 'fetch', lambda url, headers=None: Response('<div id="app"></div>'))
+    monkeypatch.setattr(counter, 'count_episodes_selenium', lambda url, pool=None: 42)
+    assert counter.get_all_episodes_count(URL) == 42
+
+    def broken(url, pool=None):
+        raise RuntimeError('chrome crashed')
+    monkeypatch.setattr(counter, 'count_episodes_selenium', broken)
+    assert counter.get_all_episodes_count(URL) == 0
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_driver_pool_reuses_warm_drivers_and_replaces_broken_ones(monkeypatch):
+    started = []
+    monkeypatch.setattr(counter, '_new_driver', lambda: started.append(FakeDriver()) or started[-1])
+    pool = counter.DriverPool(size=2)
+
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first and len(started) == 1      # 暖機中的 driver 直接重用
+
+    pool.release(first, broken=True)
+    assert first.quit_called
+    second = pool.acquire()
+    assert second is not first and len(started) == 2
+
+    third = pool.acquire()
+    waiter = threading.Thread(target=lambda: started.append(pool.acquire()))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()                                   # 已達上限：等到有 driver 歸還
+    pool.release(third)
+    waiter.join(2)
+    assert started[-1] is third
+
+    pool.close()
+    assert second.quit_called and third.quit_called
@@ -0,0 +1,33 @@
+import os
+
+from webtoon_engine.sharding import compact_view, merge_dirty, scan_pages_sharded
+from webtoon_engine.targets import CrawlTarget
+
+TARGET = CrawlTarget('test', 'http://stub/list?page={page}', sorted_by_update=True)
+
+
+def crash(url, headers=None):
+    os._exit(1)  # 模擬 worker 程序當掉
+
+
+def test_compact_view_keeps_only_diff_fields():
+    local_db = {"1": {"id": "1", "title": "作品", "author": "作者", "episode_count": 3,
+                      "crawl_meta": {"position": 0}}}
+    assert compact_view(local_db) == {"1": {"id": "1", "episode_count": 3, "crawl_meta": {"position": 0}}}
+
+
+def test_merge_dirty_restores_full_records():
+    local_db = {"1": {"id": "1", "title": "作品", "episode_count": 3, "crawl_meta": {"position": 0}}}
+    full = {"id": "2", "title": "新作品", "episode_count": 1, "author": "作者"}
+    merged = merge_dirty(local_db, {"1": {"id": "1", "episode_count": 3, "crawl_meta": {"position": 5}},
+                                    "2": full})
+    assert merged["1"] == {"id": "1", "title": "作品", "episode_count": 3, "crawl_meta": {"position": 5}}
+    assert merged["2"] is full
+    assert local_db["1"]["crawl_meta"] == {"position": 0}
+
+
+def test_broken_worker_becomes_failed_page():
+    results = list(scan_pages_sharded([1, 2], {}, crash, processes=1, rate=0, target=TARGET, seen=set()))
+    assert [result.page for _, result in results] == [1, 2]
+    assert all(not result.ok for _, result in results)
+    assert all(messages[0].startswith("❌") for messages, _ in results)
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from webtoon_engine.catalogue import Catalogue
+from webtoon_engine.columnar import CompactCatalogue
+from webtoon_engine.storage import JsonFileStorage, JsonlLogStorage, open_storage
+
+
+def comic(comic_id, episode_count=1, **extra):
+    return dict({
+        "id": comic_id, "title": f"作品{comic_id}", "genre": "奇幻", "author": "作者",
+        "episodes": f"共 {episode_count} 話", "episode_count": episode_count, "access": "連載中",
+        "picture": f"https://webtoon-phinf.pstatic.net/{comic_id}.png",
+        "hyperlink": f"https://www.webtoons.com/zh-hant/fantasy/a/list?title_no={comic_id}",
+        "crawl_date": "2024-01-01 00:00:00", "last_updated": "2024-01-02 00:00:00",
+    }, **extra)
+
+
+def test_jsonl_compaction_tracks_live_records_across_appends(tmp_path, monkeypatch):
+    monkeypatch.setattr(JsonlLogStorage, 'COMPACT_MIN_LINES', 4)
+    storage = JsonlLogStorage(str(tmp_path / 'log.jsonl'))
+    storage.load_all()
+    storage.upsert_many([comic(str(i)) for i in range(10)])   # 全新的紀錄不會觸發壓縮
+    assert storage._lines == 10
+    storage.upsert_many([comic('0', 2), comic('1', 2)])
+    storage.delete_many(['2'])
+    assert storage._lines == 13
+    for episode in range(3, 12):
+        storage.upsert_many([comic('0', episode)])
+    assert storage._lines < 22                                    # 重複紀錄過多時已壓縮
+    records = {r['id']: r for r in storage.load_all()}
+    assert len(records) == 9 and records['0']['episode_count'] == 11 and '2' not in records
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'jsonl'])
+def test_open_storage_imports_legacy_json_only_into_an_empty_store(tmp_path, monkeypatch, backend):
+    legacy = tmp_path / 'comics_data.json'
+    legacy.write_text(json.dumps([comic('1'), comic('2')]), encoding='utf-8')
+    path = str(tmp_path / f'store.{backend}')
+    storage = open_storage(backend, path, str(legacy))
+    assert not storage.is_empty() and len(storage.load_all()) == 2
+
+    storage.delete_many(['2'])
+    # 已有資料的後端不必整份讀出來檢查，也不會重新匯入
+    monkeypatch.setattr(type(storage), 'load_all', lambda self: pytest.fail('load_all() called'))
+    reopened = open_storage(backend, path, str(legacy))
+    monkeypatch.undo()
+    assert [r['id'] for r in reopened.load_all()] == ['1']
+
+
+def test_json_batch_writes_once_per_flush(tmp_path, monkeypatch):
+    path = tmp_path / 'comics.json'
+    path.write_text(json.dumps([comic('1')]), encoding='utf-8')
+    storage = JsonFileStorage(str(path))
+    writes = []
+    original = storage.upsert_many
+    monkeypatch.setattr(storage, 'upsert_many', lambda records: (writes.append(len(records)), original(records)))
+    catalogue = Catalogue(storage)
+
+    with catalogue.batch():
+        catalogue.upsert([comic('1', 2)])
+        catalogue.upsert([comic('2')])
+        catalogue.upsert([comic('1', 3)])
+        assert catalogue.pending == 2 and writes == []
+        assert not catalogue.flush(max_age=60)
+    assert writes == [2]
+    assert {r['id']: r['episode_count'] for r in catalogue.current().records} == {'1': 3, '2': 1}
+
+    catalogue.upsert([comic('3')])                                # 不在 batch() 中時照常直接寫入
+    assert writes == [2, 1]
+
+
+def test_compact_catalogue_round_trip(tmp_path):
+    meta = {"fingerprint": "abc", "position": 3, "target": "zh-hant-completed", "etag": None,
+            "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "checked_at": 1700000000.5}
+    records = [comic('1', crawl_meta=meta), comic('2', 5), {"id": '3', "title": "欄位不齊的舊資料"}]
+    store, body = CompactCatalogue.from_records(records, source='test')
+    visible = [{key: value for key, value in r.items() if key != 'crawl_meta'} for r in records]
+    assert list(store) == records
+    assert list(store.visible_records()) == visible
+    assert json.loads(body) == visible
+
+    path = str(tmp_path / 'snapshot.bin')
+    store.save(path)
+    loaded = CompactCatalogue.open(path)
+    assert list(loaded) == records
+    assert loaded.digest == store.digest and loaded.header['source'] == 'test'
+    with pytest.raises(IndexError):
+        loaded[3]
@@ -0,0 +1 @@
+"""Webtoon 爬蟲共用引擎 (併發、限速等工具)"""
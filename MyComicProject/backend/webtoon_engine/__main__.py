@@ -0,0 +1,6 @@
+"""python -m webtoon_engine crawl --pages N --concurrency N --incremental"""
+import sys
+
+from .pipeline import main
+
+sys.exit(main())
@@ -0,0 +1,290 @@
+"""全程序共用的漫畫清單快取：讀一次資料，之後只在資料或版本變動時重新載入
+
+gunicorn 的每個 worker 各自有一份快取；任何 worker 存檔後儲存後端的
+change_token() 都會改變，其他 worker 在下一次請求時就會自動重新載入。
+有給 ChangeLog 時，每次寫入都會追加前端看得到的變動 (先寫資料、再寫變更紀錄)。
+
+清單在記憶體中是欄位式的 (webtoon_engine.columnar)；有設定 snapshot_path 時，
+載入的結果會存成快照檔，下次啟動 (或其他 worker) 只要後端的 change_token() 沒變就直接 mmap。
+爬蟲結束時 warm() 會把完整清單的回應 (原始 / gzip / br) 與排序名次也寫進快照檔 (暖快照)，
+冷啟動後的第一個請求不必再序列化、壓縮或排序。
+
+整份重寫的後端 (JSON 檔) 在 batch() 中的寫入會先累積起來，由 flush() 一次寫入，
+爬蟲不必每掃完一頁就重寫整個檔案。
+
+全文搜尋索引 (search_index()) 在第一次搜尋時才建立，之後跨版本沿用：本程序的寫入在
+upsert / delete 時逐筆更新，其他程序的寫入依變更紀錄逐筆更新，只有無法得知變動範圍時才整份重建。
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+from .changes import OP_DELETE, diff_records
+from .columnar import CompactCatalogue
+from .http_cache import ENCODINGS, PrecompressedBody
+from .query import SORT_KEYS, CatalogueIndex
+from .search import SearchIndex
+
+
+class CatalogueSnapshot:
+    """某一個版本的清單 (唯讀)：紀錄、索引、完整清單的回應與統計"""
+
+    def __init__(self, records, version, change_seq=0, body=None, file_key=None):
+        self.version = version
+        # 載入前讀到的變更序號：這份快照至少包含到這個序號為止的所有變動
+        self.change_seq = change_seq
+        self.file_key = file_key  # 載入時後端的 change_token()
+        self.records = records  # columnar.CompactCatalogue
+        # 暖快照有存排序名次時直接使用 (mmap，不必重新排序)
+        ranks = {key: records.block(f'rank.{key}') for key in SORT_KEYS}
+        self.index = CatalogueIndex(records, {key: rank.cast('I') for key, rank in ranks.items() if rank})
+        # 內容摘要當作資料版本：每個 gunicorn worker 算出來都一樣，可直接用於 ETag
+        self.digest = records.digest
+        self.stats = self.index.stats()
+        # /api/comics 完整清單的回應內容：第一次被請求時才序列化 (壓縮版本也一併快取)
+        self._body = body
+        self._full_body = None
+        self._lock = threading.Lock()
+
+    @property
+    def full_body(self):
+        if self._full_body is None:
+            with self._lock:
+                if self._full_body is None:
+                    records = self.records
+                    # 暖快照：直接使用預先序列化、壓縮好的內容
+                    raw = self._body or records.block('body') or records.to_json()
+                    variants = {encoding: records.block(f'body.{encoding}') for encoding in ENCODINGS}
+                    self._full_body = PrecompressedBody(raw, {k: v for k, v in variants.items() if v})
+                    self._body = None
+        return self._full_body
+
+    @property
+    def warmed(self):
+        """是否由暖快照載入 (已有預先算好的回應)"""
+        return self.records.block('body') is not None
+
+
+class Catalogue:
+    """包住儲存後端 (webtoon_engine.storage) 的快取物件"""
+
+    def __init__(self, storage, changes=None, snapshot_path=None):
+        self.storage = storage
+        self.changes = changes       # webtoon_engine.changes.ChangeLog (選用)
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._file_key = None        # 上次載入時後端的 change_token()
+        self._version = 0            # 本程序內的版本號，invalidate() 時 +1
+        self._loaded_version = None
+        self._snapshot = CatalogueSnapshot(CompactCatalogue.from_records([])[0], 0)
+        self.search = SearchIndex()
+        self._search_lock = threading.Lock()
+        self._search_key = None      # 搜尋索引對應的後端 change_token() (None = 還沒建立)
+        self._search_seq = 0         # 搜尋索引至少包含到這個變更序號
+        self._search_version = None  # 搜尋索引已跟上的快照版本
+        self._warm_version = None    # 上次寫出暖快照的快照版本
+        self._batch_thread = None    # 正在 batch() 中的執行緒
+        self._pending = {}           # batch() 中累積、還沒寫入的紀錄 {id: data}
+        self._pending_since = None   # 最早一筆累積紀錄的時間 (time.monotonic)
+
+    def _stat_key(self):
+        try:
+            return self.storage.change_token()
+        except Exception:
+            return None
+
+    def _is_fresh(self, file_key):
+        return file_key == self._file_key and self._loaded_version == self._version
+
+    def current(self):
+        """取得最新的清單快照 (必要時才重新讀檔)"""
+        file_key = self._stat_key()
+        if self._is_fresh(file_key):
+            return self._snapshot
+        with self._lock:
+            file_key = self._stat_key()
+            if not self._is_fresh(file_key):
+                change_seq = self.changes.latest() if self.changes else 0
+                loaded = self._read(file_key)
+                # 讀檔失敗時沿用舊快照，也不記錄 file_key，下次請求會再試一次
+                if loaded is not None:
+                    records, body = loaded
+                    self._snapshot = CatalogueSnapshot(records, self._snapshot.version + 1, change_seq, body,
+                                                       file_key)
+                    self._file_key = file_key
+                    self._loaded_version = self._version
+            return self._snapshot
+
+    def search_index(self):
+        """回傳 (跟上最新清單的全文搜尋索引, 清單快照)；第一次呼叫時才建立索引"""
+        snapshot = self.current()
+        with self._search_lock:
+            if self._search_version != snapshot.version:
+                self._sync_search(snapshot, snapshot.file_key)
+                self._search_version = snapshot.version
+        return self.search, snapshot
+
+    def _sync_search(self, snapshot, file_key):
+        """讓搜尋索引跟上新載入的快照"""
+        ops = None
+        if self._search_key is not None and self.changes:
+            _, ops = self.changes.since(self._search_seq)
+        if ops is not None:
+            # 依變更紀錄只更新變動過的作品 (本程序寫入的已經套用過，重複套用不會有影響)
+            updated, removed = [], []
+            for comic_id in ops:
+                record = snapshot.index.get(comic_id)
+                if record is None:
+                    removed.append(comic_id)
+                else:
+                    updated.append(record)
+            self.search.update(updated)
+            self.search.remove(removed)
+        elif self._search_key is None or file_key != self._search_key:
+            records = snapshot.records
+            self.search.rebuild(zip(records.column('id'), records.column('title'),
+                                    records.decoded('author'), records.decoded('genre')))
+        self._search_key = file_key
+        self._search_seq = snapshot.change_seq
+
+    def _source(self, file_key):
+        """快照檔記錄的資料來源；和目前的後端一致才能直接使用"""
+        storage = self.storage
+        return [type(storage).__name__, os.path.abspath(getattr(storage, 'path', '')),
+                json.loads(json.dumps(file_key))]
+
+    def _open_snapshot(self):
+        try:
+            return CompactCatalogue.open(self.snapshot_path) if self.snapshot_path else None
+        except (OSError, ValueError):
+            return None
+
+    def _read_snapshot(self, file_key):
+        if file_key is None:
+            return None
+        records = self._open_snapshot()
+        return records if records is not None and records.header.get('source') == self._source(file_key) else None
+
+    def _reuse_warm(self, records):
+        """對外內容沒變 (例如只更新了爬蟲中繼資料) 時，沿用上一份暖快照的回應與排序名次"""
+        for old in (self._snapshot.records, self._open_snapshot()):
+            if old is not None and old.digest == records.digest and old.block('body') is not None:
+                return records.with_blocks(old.extra_blocks())
+        return records
+
+    def _read(self, file_key):
+        """回傳 (欄位式清單, 完整清單 JSON 或 None)"""
+        records = self._read_snapshot(file_key)
+        if records is not None:
+            return records, None
+        try:
+            records, body = CompactCatalogue.from_records(self.storage.load_all(), source=self._source(file_key))
+        except Exception as e:
+            print(f"讀取資料失敗: {e}")
+            return None
+        records = self._reuse_warm(records)
+        if self.snapshot_path and file_key is not None:
+            try:
+                records.save(self.snapshot_path)
+            except OSError as e:
+                print(f"寫入清單快照失敗: {e}")
+            # 改用 mmap 的版本 (其他 worker 同時寫入了別的版本時就沿用記憶體中的這份)
+            mapped = self._read_snapshot(file_key)
+            if mapped is not None:
+                records = mapped
+        return records, body
+
+    def warm(self):
+        """把目前的清單連同完整回應 (原始 / 各種壓縮) 與排序名次寫成暖快照；有寫入時回傳 True"""
+        snapshot = self.current()
+        if (not self.snapshot_path or snapshot.file_key is None or snapshot.warmed
+                or snapshot.version == self._warm_version):
+            return False
+        body = snapshot.full_body
+        blocks = [('body', body.raw)]
+        blocks += [(f'body.{encoding}', data) for encoding, data in body.compressed().items()]
+        blocks += snapshot.index.warm_blocks()
+        try:
+            snapshot.records.with_blocks(blocks).save(self.snapshot_path)
+        except OSError as e:
+            print(f"寫入暖快照失敗: {e}")
+            return False
+        self._warm_version = snapshot.version
+        return True
+
+    def invalidate(self):
+        """本程序寫入資料後呼叫，強制下一次 current() 重新載入"""
+        with self._lock:
+            self._version += 1
+
+    def records_by_id(self):
+        """給爬蟲修改用的 {id: data} 字典 (每筆都是新組成的 dict，不會動到快取中的資料)"""
+        return {item['id']: item for item in self.current().records}
+
+    @contextlib.contextmanager
+    def batch(self):
+        """這個執行緒在區塊內的 upsert 先累積起來，結束時 (或呼叫 flush()) 才一次寫入
+
+        只對整份重寫的後端 (storage.rewrites_all) 有作用；其他後端照常逐次寫入。
+        """
+        if not self.storage.rewrites_all or self._batch_thread is not None:
+            yield
+            return
+        self._batch_thread = threading.get_ident()
+        try:
+            yield
+        finally:
+            self._batch_thread = None
+            self.flush()
+
+    @property
+    def pending(self):
+        """batch() 中還沒寫入的紀錄數"""
+        return len(self._pending)
+
+    def flush(self, max_age=0):
+        """寫入 batch() 中累積的紀錄；最早一筆累積不到 max_age 秒時先不寫。回傳是否已全部寫入"""
+        if not self._pending:
+            return True
+        if time.monotonic() - self._pending_since < max_age:
+            return False
+        records, self._pending, self._pending_since = list(self._pending.values()), {}, None
+        self._write(records)
+        return True
+
+    def upsert(self, records):
+        """寫入新增 / 變動的紀錄 (由後端決定是逐筆 upsert 還是整份重寫)，並讓快取失效"""
+        if self._batch_thread == threading.get_ident():
+            for record in records:
+                self._pending[record['id']] = record
+            if self._pending and self._pending_since is None:
+                self._pending_since = time.monotonic()
+            return
+        self._write(list(records))
+
+    def _write(self, records):
+        changes = diff_records(self.current().index.get, records) if self.changes else None
+        self.storage.upsert_many(records)
+        self._searched_write(lambda: self.search.update(records))
+        self.invalidate()
+        if changes:
+            self.changes.append(changes)
+
+    def delete(self, ids):
+        """刪除紀錄；變更紀錄中會留下 tombstone，讓已同步的前端也一併移除"""
+        ids = [str(comic_id) for comic_id in ids]
+        self.storage.delete_many(ids)
+        self._searched_write(lambda: self.search.remove(ids))
+        self.invalidate()
+        if self.changes:
+            self.changes.append([{"id": comic_id, "op": OP_DELETE} for comic_id in ids])
+
+    def _searched_write(self, apply):
+        """把本程序剛寫入的變動套用到搜尋索引；索引還沒建立或還沒跟上最新清單時，留到下一次搜尋再同步"""
+        with self._search_lock:
+            if self._search_key is not None and self._search_version == self._snapshot.version:
+                apply()
+                # 沒有變更紀錄時，重新載入只要後端的 change_token() 和寫入後相同，就不必重建索引
+                self._search_key = self._stat_key()
@@ -0,0 +1,206 @@
+"""變更紀錄：每次寫入時追加遞增的序號 (seq)，前端只需同步某個序號之後變動的作品
+
+- 每行一筆 JSON：{"seq", "id", "op": "upsert" / "delete", "at", "episode_count", "prev_episode_count"}
+- 只記錄使用者看得到的變動；只更新爬蟲中繼資料 (crawl_meta) 的寫入不算
+- 同一個 id 的話數變動 (與刪除) 就是它的話數歷史
+- 多個 gunicorn worker 共用同一個檔案：寫入時持有檔案鎖，讀取端只讀上次之後新增的部分
+- 記憶體中只保留最近 window 筆；更舊的 since 由呼叫端改回傳完整清單 (reset)
+- 檔案每多出 window 筆就壓縮一次：只留最近 window 筆，更舊的只留話數歷史需要的紀錄
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+from .storage import _FileLock
+
+OP_UPSERT = 'upsert'
+OP_DELETE = 'delete'
+
+# 記憶體中保留、可以增量同步的最近變動筆數
+DEFAULT_WINDOW = 10000
+
+
+def visible_fields(record):
+    """前端看得到的欄位 (比對是否真的有變動用)"""
+    return {key: value for key, value in (record or {}).items() if key != 'crawl_meta'}
+
+
+def _in_history(entry):
+    """壓縮時要留下的舊紀錄：刪除，或話數有變 (含新增)"""
+    return entry.get('op') == OP_DELETE or entry.get('episode_count') != entry.get('prev_episode_count')
+
+
+class ChangeLog:
+    def __init__(self, path, window=DEFAULT_WINDOW):
+        self.path = path
+        self.window = max(1, window)
+        self._cond = threading.Condition()
+        self._inode = None     # 壓縮會換掉檔案，inode 改變時從頭重讀
+        self._offset = 0       # 已經讀到檔案的哪個位置
+        self._lines = 0        # 目前檔案的紀錄筆數
+        self._compact_at = self.window
+        self._entries = deque(maxlen=self.window)
+        self._latest = 0
+        self._complete_from = 1  # 從這個序號起，之後的變動都還在記憶體中
+
+    # --- 讀取 ---
+
+    def _refresh(self):
+        """讀入其他程序 (或本程序) 新追加的完整行 (呼叫端需持有 _cond)"""
+        try:
+            with open(self.path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode:
+                    self._inode, self._offset, self._lines = inode, 0, 0
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        from_start = self._offset == 0
+        end = data.rfind(b'\n') + 1  # 寫到一半的最後一行留到下次再讀
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self._lines += 1
+            if 'compacted' in entry:
+                # 壓縮過的檔案：這個序號以前只剩話數歷史，不能拿來增量同步
+                self._complete_from = max(self._complete_from, entry['compacted'] + 1)
+                continue
+            if entry['seq'] <= self._latest:
+                continue
+            if len(self._entries) == self.window:
+                self._complete_from = max(self._complete_from, self._entries[0]['seq'] + 1)
+            self._entries.append(entry)
+            self._latest = entry['seq']
+        self._offset += end
+        if from_start:
+            self._compact_at = self._lines + self.window
+
+    def latest(self):
+        """目前最新的序號 (還沒有任何變動時為 0)"""
+        with self._cond:
+            self._refresh()
+            return self._latest
+
+    def covers(self, since):
+        """紀錄是否完整涵蓋 since 之後的所有變動 (否則前端要重新下載完整清單)"""
+        with self._cond:
+            self._refresh()
+            return self._complete_from - 1 <= since <= self._latest
+
+    def since(self, since):
+        """since 之後的變動，回傳 (最新序號, {id: 最後一次的 op})；不涵蓋 since 時 op 的部分為 None"""
+        with self._cond:
+            self._refresh()
+            if not self._complete_from - 1 <= since <= self._latest:
+                return self._latest, None
+            newer = []
+            for entry in reversed(self._entries):
+                if entry['seq'] <= since:
+                    break
+                newer.append(entry)
+            return self._latest, {str(entry['id']): entry['op'] for entry in reversed(newer)}
+
+    def history(self, comic_id):
+        """這部作品的所有變動 (由舊到新)；歷史不常查，直接從檔案讀，不佔記憶體"""
+        comic_id = str(comic_id)
+        history = []
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if comic_id.encode('utf-8') not in line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if str(entry.get('id')) == comic_id:
+                        history.append(entry)
+        except OSError:
+            pass
+        return history
+
+    def wait(self, since, timeout):
+        """等到有 since 之後的變動或逾時；其他程序寫入的變動每秒檢查一次"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refresh()
+                if self._latest > since:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 1.0))
+
+    # --- 寫入 ---
+
+    def append(self, changes):
+        """追加變動 (list of dict，至少有 id 與 op)，依序配發序號，回傳最新序號"""
+        if not changes:
+            return self.latest()
+        with self._cond, _FileLock(self.path + '.lock'):
+            self._refresh()  # 先讀完其他程序寫的，序號才不會重複
+            seq = self._latest
+            now = time.time()
+            lines = []
+            for change in changes:
+                seq += 1
+                lines.append(json.dumps(dict(change, seq=seq, at=now), ensure_ascii=False,
+                                        separators=(',', ':')) + '\n')
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh()
+            if self._lines >= self._compact_at:
+                self._compact()
+            self._cond.notify_all()
+            return seq
+
+    def _compact(self):
+        """最近 window 筆原樣保留，更舊的只留話數歷史，原子性地換掉舊檔 (呼叫端需持有兩種鎖)"""
+        boundary = self._latest - self.window
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.changes_', suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'wb') as out, open(self.path, 'rb') as f:
+            out.write(json.dumps({"compacted": boundary}).encode('utf-8') + b'\n')
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if 'compacted' in entry:
+                    continue
+                if entry['seq'] > boundary or _in_history(entry):
+                    out.write(line if line.endswith(b'\n') else line + b'\n')
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+        self._refresh()
+
+    def compact(self):
+        with self._cond, _FileLock(self.path + '.lock'):
+            self._refresh()
+            self._compact()
+
+
+def diff_records(old_by_id, records):
+    """與舊紀錄比對，回傳需要記錄的變動 (新增或前端看得到的欄位有變)"""
+    changes = []
+    for record in records:
+        old = old_by_id(record['id'])
+        if old is not None and visible_fields(old) == visible_fields(record):
+            continue
+        changes.append({
+            "id": str(record['id']),
+            "op": OP_UPSERT,
+            "episode_count": record.get('episode_count'),
+            "prev_episode_count": old.get('episode_count') if old else None,
+        })
+    return changes
@@ -0,0 +1,403 @@
+"""精簡的欄位式清單：十萬部以上的作品也只佔少量記憶體，快照檔可以直接 mmap 載入
+
+- 類型 / 作者 / 閱讀權限 / 網址前綴 / 爬取目標用字典編碼，每筆只存一個整數代碼
+- 話數、時間、列表位置等數字存成 array；字串欄位是一整塊 UTF-8 + 位移表，取用時才解碼
+- episodes ("共 N 話") 由 episode_count 推導，不另外儲存
+- 格式不符的紀錄 (欄位多或少、型別不同) 原封不動放在 overflow，讀回來一定和寫入的相同
+- crawl_meta 是爬蟲內部用的，只有 [pos] / 迭代 (給爬蟲) 才會帶上；visible() 與 to_json()
+  (API 回應、內容摘要) 都不含，只更新爬蟲中繼資料時摘要 (ETag) 不會改變
+
+檔案格式：MAGIC + header 長度 (u32) + header (JSON：字典表、欄位位置、overflow) + 8 bytes 對齊的資料區
+資料區之後可以再加上額外的區塊 (with_blocks)，例如暖快照預先算好的回應內容與排序名次。
+"""
+import calendar
+import copy
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from .query import STATUSES, comic_status
+
+MAGIC = b'WTCAT\x00\x01\x00'
+FORMAT_VERSION = 1
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+RECORD_KEYS = ('id', 'title', 'genre', 'author', 'episodes', 'episode_count', 'access', 'picture',
+               'hyperlink', 'crawl_date', 'last_updated')
+META_KEYS = ('fingerprint', 'position', 'target', 'etag', 'last_modified', 'checked_at')
+STRING_FIELDS = ('id', 'title', 'genre', 'author', 'access', 'picture', 'hyperlink')
+
+# 欄位名稱 -> array typecode ('s' 是字串欄位，'s?' 是可以是 None 的字串欄位)
+COLUMNS = {
+    'id': 's', 'title': 's', 'genre': 'I', 'author': 'I', 'access': 'I', 'status': 'B',
+    'episode_count': 'q', 'picture_prefix': 'I', 'picture': 's', 'hyperlink_prefix': 'I', 'hyperlink': 's',
+    'crawl_date': 'q', 'last_updated': 'q',
+    'has_meta': 'B', 'meta_fingerprint': 's?', 'meta_position': 'q', 'meta_target': 'I', 'meta_etag': 's?',
+    'meta_last_modified': 's?', 'meta_checked_at': 'd',
+}
+# 用字典編碼的欄位 -> 字典表名稱 (兩種網址共用一張前綴表)
+TABLES = {'genre': 'genre', 'author': 'author', 'access': 'access', 'picture_prefix': 'prefix',
+          'hyperlink_prefix': 'prefix', 'meta_target': 'target'}
+
+# _encode 產生的基本區塊；其餘都是 with_blocks 加上的額外區塊
+BASE_BLOCKS = frozenset(
+    part for name, code in COLUMNS.items()
+    for part in ((f'{name}.offsets', f'{name}.data') + ((f'{name}.nulls',) if code == 's?' else ())
+                 if code.startswith('s') else (name,)))
+
+_RECORD_KEY_SET = frozenset(RECORD_KEYS)
+_META_KEY_SET = frozenset(META_KEYS)
+_TIME_RE = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\Z')
+
+
+def episodes_text(episode_count):
+    return f"共 {episode_count} 話"
+
+
+def parse_time(text):
+    """"YYYY-mm-dd HH:MM:SS" -> 整數秒 (當成 UTC，只求能原樣轉回字串)；格式不符時回傳 None"""
+    if not isinstance(text, str) or not _TIME_RE.match(text):
+        return None
+    seconds = calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                               int(text[11:13]), int(text[14:16]), int(text[17:19]), 0, 0, 0))
+    return seconds if format_time(seconds) == text else None
+
+
+def format_time(seconds):
+    return time.strftime(TIME_FORMAT, time.gmtime(seconds))
+
+
+def split_url(url, depth=0):
+    """網址拆成 (前綴, 其餘)；前綴是 scheme://host/ 再加上 depth 層路徑 (例如語系 zh-hant/)"""
+    start = url.find('://')
+    cut = url.find('/', start + 3) if start >= 0 else -1
+    if cut < 0:
+        return '', url
+    for _ in range(depth):
+        nxt = url.find('/', cut + 1)
+        if nxt < 0 or '?' in url[cut:nxt]:
+            break
+        cut = nxt
+    return url[:cut + 1], url[cut + 1:]
+
+
+def _fits(record):
+    """這筆紀錄能不能完全用欄位表示 (解碼後與原本的 dict 相同)；時間欄位由呼叫端另外檢查"""
+    keys = set(record)
+    meta = record.get('crawl_meta')
+    if keys - {'crawl_meta'} != _RECORD_KEY_SET:
+        return False
+    if 'crawl_meta' in keys and not (isinstance(meta, dict) and meta.keys() == _META_KEY_SET):
+        return False
+    if not all(isinstance(record[key], str) for key in STRING_FIELDS):
+        return False
+    if type(record['episode_count']) is not int or record['episodes'] != episodes_text(record['episode_count']):
+        return False
+    if meta is not None:
+        if type(meta['position']) is not int or type(meta['checked_at']) is not float:
+            return False
+        if not all(meta[key] is None or isinstance(meta[key], str)
+                   for key in ('fingerprint', 'target', 'etag', 'last_modified')):
+            return False
+    return True
+
+
+def _text(value):
+    return value if isinstance(value, str) else ''
+
+
+class _Table:
+    """字典編碼：值 -> 代碼"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _StringBuilder:
+    def __init__(self, nullable=False):
+        self.parts = []
+        self.offsets = array('Q', [0])
+        self.nulls = array('B') if nullable else None
+        self._size = 0
+
+    def add(self, value):
+        if self.nulls is not None:
+            self.nulls.append(value is None)
+        data = (value or '').encode('utf-8')
+        self.parts.append(data)
+        self._size += len(data)
+        self.offsets.append(self._size)
+
+
+def _encode(records):
+    """把紀錄拆成欄位，回傳 (header, [(區塊名稱, bytes)])"""
+    tables = {name: _Table() for name in set(TABLES.values())}
+    strings = {name: _StringBuilder(code == 's?') for name, code in COLUMNS.items() if code.startswith('s')}
+    numbers = {name: array(code) for name, code in COLUMNS.items() if not code.startswith('s')}
+    overflow = {}
+
+    def put(name, value):
+        if name in strings:
+            strings[name].add(value)
+        elif name in TABLES:
+            numbers[name].append(tables[TABLES[name]].code(value))
+        else:
+            numbers[name].append(value)
+
+    for pos, record in enumerate(records):
+        crawl_date = parse_time(record.get('crawl_date'))
+        last_updated = parse_time(record.get('last_updated'))
+        fits = _fits(record) and crawl_date is not None and last_updated is not None
+        if not fits:
+            overflow[pos] = record
+        # 格式不符的紀錄也要填索引會用到的欄位 (標題、作者、類型、狀態、話數、時間)
+        count = record.get('episode_count')
+        put('id', str(record.get('id')))
+        put('title', _text(record.get('title')))
+        put('genre', _text(record.get('genre')))
+        put('author', _text(record.get('author')))
+        put('access', _text(record.get('access')))
+        put('status', STATUSES.index(comic_status(record)))
+        put('episode_count', count if type(count) is int else 0)
+        picture = split_url(record['picture']) if fits else ('', '')
+        put('picture_prefix', picture[0])
+        put('picture', picture[1])
+        hyperlink = split_url(record['hyperlink'], depth=1) if fits else ('', '')
+        put('hyperlink_prefix', hyperlink[0])
+        put('hyperlink', hyperlink[1])
+        put('crawl_date', -1 if crawl_date is None else crawl_date)
+        put('last_updated', -1 if last_updated is None else last_updated)
+        meta = record.get('crawl_meta') if fits else None
+        put('has_meta', meta is not None)
+        meta = meta or {}
+        put('meta_fingerprint', meta.get('fingerprint'))
+        put('meta_position', meta.get('position', 0))
+        put('meta_target', meta.get('target'))
+        put('meta_etag', meta.get('etag'))
+        put('meta_last_modified', meta.get('last_modified'))
+        put('meta_checked_at', meta.get('checked_at', 0.0))
+
+    blocks = []
+    for name, code in COLUMNS.items():
+        if name in strings:
+            builder = strings[name]
+            blocks.append((f'{name}.offsets', builder.offsets.tobytes()))
+            blocks.append((f'{name}.data', b''.join(builder.parts)))
+            if builder.nulls is not None:
+                blocks.append((f'{name}.nulls', builder.nulls.tobytes()))
+        else:
+            blocks.append((name, numbers[name].tobytes()))
+    header = {
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "count": len(records),
+        "tables": {name: table.values for name, table in tables.items()},
+        "overflow": overflow,
+    }
+    return header, blocks
+
+
+def _pack(header, blocks):
+    """組成完整的快照檔內容；各區塊的位置記在 header["blocks"] (相對於資料區開頭)"""
+    layout, offset = {}, 0
+    for name, data in blocks:
+        layout[name] = [offset, len(data)]
+        offset += (len(data) + 7) // 8 * 8
+    raw_header = json.dumps(dict(header, blocks=layout), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(raw_header)) + raw_header
+    parts = [prefix, b'\0' * (-len(prefix) % 8)]
+    for _, data in blocks:
+        parts.append(data)
+        parts.append(b'\0' * (-len(data) % 8))
+    return b''.join(parts)
+
+
+def _read_header(buf):
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError("不是清單快照檔")
+    (size,) = struct.unpack('<I', bytes(buf[len(MAGIC):len(MAGIC) + 4]))
+    start = len(MAGIC) + 4
+    header = json.loads(bytes(buf[start:start + size]).decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+        raise ValueError("快照檔版本或位元組順序不符")
+    data_start = start + size
+    return header, data_start + (-data_start % 8)
+
+
+class _StringColumn:
+    """一整塊 UTF-8 + 位移表，[pos] 時才解碼"""
+
+    def __init__(self, offsets, data, nulls=None):
+        self._offsets = offsets
+        self._data = data
+        self._nulls = nulls
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, pos):
+        if self._nulls is not None and self._nulls[pos]:
+            return None
+        return str(self._data[self._offsets[pos]:self._offsets[pos + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[pos] for pos in range(len(self)))
+
+
+class CompactCatalogue:
+    """唯讀的欄位式清單：可以 len()、[pos]、迭代 (取出時才組成 dict，每次都是新的物件)"""
+
+    def __init__(self, buf):
+        self._buf = buf  # bytes 或 mmap，必須和 memoryview 一樣活得夠久
+        self.header, data_start = _read_header(buf)
+        self._view = memoryview(buf)[data_start:]
+        self._count = self.header['count']
+        self._tables = self.header['tables']
+        self._overflow = {int(pos): record for pos, record in self.header['overflow'].items()}
+        self.digest = self.header.get('digest')
+        self._columns = {}
+        for name, code in COLUMNS.items():
+            if code.startswith('s'):
+                self._columns[name] = _StringColumn(
+                    self._block(f'{name}.offsets', 'Q'), self._block(f'{name}.data'),
+                    self._block(f'{name}.nulls', 'B') if code == 's?' else None)
+            else:
+                self._columns[name] = self._block(name, code)
+
+    def _block(self, name, code=None):
+        offset, size = self.header['blocks'][name]
+        view = self._view[offset:offset + size]
+        return view.cast(code) if code else view
+
+    # --- 建立 / 載入 / 儲存 ---
+
+    @classmethod
+    def from_records(cls, records, **meta):
+        """由 dict 紀錄建立；meta (例如資料來源與版本) 會存在 header 中。回傳 (清單, 完整 JSON)"""
+        header, blocks = _encode(list(records))
+        store = cls(_pack(header, blocks))
+        body = store.to_json()
+        # 內容摘要當作資料版本 (ETag 用)，載入快照時不必重新序列化就能取得
+        header.update(meta, digest=hashlib.sha1(body).hexdigest())
+        return cls(_pack(header, blocks)), body
+
+    @classmethod
+    def open(cls, path):
+        """以 mmap 開啟快照檔 (唯讀，多個程序共用同一份分頁快取)"""
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def with_blocks(self, blocks, **meta):
+        """加上 (或取代) 額外的資料區塊 [(名稱, bytes)] 與 header 欄位，回傳新的清單"""
+        names = {name for name, _ in blocks}
+        existing = [(name, self._view[offset:offset + size])
+                    for name, (offset, size) in self.header['blocks'].items() if name not in names]
+        return type(self)(_pack(dict(self.header, **meta), existing + list(blocks)))
+
+    def save(self, path):
+        """原子性地寫出快照檔"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.snapshot_', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self._buf)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # --- 讀取 ---
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (self[pos] for pos in range(self._count))
+
+    def column(self, name):
+        """原始欄位 (數字欄位是 memoryview，字串欄位可用 [pos] 取值)"""
+        return self._columns[name]
+
+    def block(self, name):
+        """額外的資料區塊 (memoryview)；沒有這個區塊時回傳 None"""
+        return self._block(name) if name in self.header['blocks'] else None
+
+    def extra_blocks(self):
+        """with_blocks 加上的所有額外區塊 [(名稱, memoryview)]"""
+        return [(name, self._block(name)) for name in self.header['blocks'] if name not in BASE_BLOCKS]
+
+    def table(self, name):
+        return self._tables[name]
+
+    def decoded(self, name):
+        """字典編碼欄位解碼後的值 (例如 genre 的文字)"""
+        values = self._tables[TABLES[name]]
+        return [values[code] for code in self._columns[name]]
+
+    def __getitem__(self, pos):
+        return self._record(pos, True)
+
+    def visible(self, pos):
+        """對外提供的紀錄 (不含爬蟲內部的 crawl_meta)"""
+        return self._record(pos, False)
+
+    def visible_records(self):
+        return (self.visible(pos) for pos in range(self._count))
+
+    def _record(self, pos, with_meta):
+        if pos < 0:
+            pos += self._count
+        if not 0 <= pos < self._count:
+            raise IndexError(pos)
+        if pos in self._overflow:
+            record = self._overflow[pos]
+            if not with_meta:
+                return copy.deepcopy({key: value for key, value in record.items() if key != 'crawl_meta'})
+            return copy.deepcopy(record)
+        c, t = self._columns, self._tables
+        count = c['episode_count'][pos]
+        record = {
+            "id": c['id'][pos],
+            "title": c['title'][pos],
+            "genre": t['genre'][c['genre'][pos]],
+            "author": t['author'][c['author'][pos]],
+            "episodes": episodes_text(count),
+            "episode_count": count,
+            "access": t['access'][c['access'][pos]],
+            "picture": t['prefix'][c['picture_prefix'][pos]] + c['picture'][pos],
+            "hyperlink": t['prefix'][c['hyperlink_prefix'][pos]] + c['hyperlink'][pos],
+            "crawl_date": format_time(c['crawl_date'][pos]),
+            "last_updated": format_time(c['last_updated'][pos]),
+        }
+        if with_meta and c['has_meta'][pos]:
+            record['crawl_meta'] = {
+                "fingerprint": c['meta_fingerprint'][pos],
+                "position": c['meta_position'][pos],
+                "target": t['target'][c['meta_target'][pos]],
+                "etag": c['meta_etag'][pos],
+                "last_modified": c['meta_last_modified'][pos],
+                "checked_at": c['meta_checked_at'][pos],
+            }
+        return record
+
+    def to_json(self):
+        """完整清單對外的精簡 JSON (與 json.dumps(list(visible_records())) 相同)"""
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        parts = (encoder.encode(record) for record in self.visible_records())
+        return ('[' + ','.join(parts) + ']').encode('utf-8')
@@ -0,0 +1,71 @@
+"""併發抓取工具：有上限的 worker pool 與每個主機的限速器"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+class HostRateLimiter:
+    """每個主機各自一個 token bucket，取代原本固定的 time.sleep"""
+
+    def __init__(self, rate=8.0, burst=None):
+        # rate: 每秒允許的請求數 (<= 0 代表不限速)
+        self.rate = float(rate)
+        self.burst = burst or max(1, int(self.rate))
+        self._buckets = {}  # host -> (剩餘 token, 上次補充時間)
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        """阻塞直到該主機有可用的 token"""
+        if self.rate <= 0:
+            return
+        host = urlsplit(url).netloc
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+def ordered_map(func, items, max_workers=8):
+    """以最多 max_workers 個執行緒併發執行 func，並「依輸入順序」產出 (item, result, error)
+
+    同時在途的工作最多 max_workers * 2 個，避免一次把上千個請求塞進佇列；
+    呼叫端提早關閉 generator (例如 SSE 連線中斷) 時，尚未開始的工作會被取消。
+    """
+    if max_workers <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) >= max_workers * 2:
+                yield _pop_result(pending)
+        while pending:
+            yield _pop_result(pending)
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def _pop_result(pending):
+    item, future = pending.popleft()
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
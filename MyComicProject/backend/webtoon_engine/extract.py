@@ -0,0 +1,119 @@
+"""內頁解析：一次解析取得話數、封面、作者與閱讀權限
+
+- extract_episode_count：正規表示式預掃描，找到 _listUl 的第一個話次就停，不建整棵樹
+- extract_detail：只解析一次 (優先用 lxml，沒安裝時退回 BeautifulSoup)
+"""
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # lxml 是選用套件
+    lxml = None
+
+DEFAULT_AUTHOR = "未知"
+ACCESS_FREE = "已完結，可免費看完整話數!"
+ACCESS_PAID = "已完結，需要追漫券"
+ACCESS_ONGOING = "連載中"
+ACCESS_ONGOING_PAID = "連載中，需要追漫券"
+PAYWALL_TEXT = "在APP可以閱讀更多話次"
+
+_LIST_UL_RE = re.compile(r'<ul\b[^>]*\bid\s*=\s*["\']?_listUl\b[^>]*>', re.I)
+_EPISODE_LI_RE = re.compile(r'<li\b[^>]*\bclass\s*=\s*["\'][^"\']*\b_episodeItem\b[^>]*>', re.I)
+_EPISODE_NO_RE = re.compile(r'\bdata-episode-no\s*=\s*["\']?(\d+)', re.I)
+# 不是頁面文字的部分：script / style 的內容、註解與標籤本身 (含 meta 等屬性值)
+_NON_TEXT_RE = re.compile(r'<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->|<[^>]*>', re.I | re.S)
+
+
+def _has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+_XPATH_EPISODE_NO = f'(//ul[@id="_listUl"]//li[{_has_class("_episodeItem")}])[1]/@data-episode-no'
+_XPATH_COVER = f'//*[{_has_class("detail_header")}]//*[{_has_class("thmb")}]//img'
+_XPATH_AUTHOR = f'(//*[{_has_class("author")}])[1]'
+
+
+def extract_episode_count(html):
+    """快速取得最新話次號碼；結構不如預期時才退回完整解析"""
+    ul = _LIST_UL_RE.search(html)
+    if ul:
+        li = _EPISODE_LI_RE.search(html, ul.end())
+        if not li:
+            return 0
+        match = _EPISODE_NO_RE.search(li.group(0))
+        return int(match.group(1)) if match else 0
+    return extract_detail(html)["episode_count"]
+
+
+def extract_detail(html, completed=True):
+    """單次解析內頁，回傳 episode_count / picture / author / access
+
+    completed: 作品是從完結區還是連載區爬到的，決定 access 的文字
+    """
+    if lxml is not None:
+        try:
+            return _extract_with_lxml(html, completed)
+        except Exception:
+            pass  # lxml 解析失敗時改用 BeautifulSoup
+    return _extract_with_bs4(html, completed)
+
+
+def access_note(html, completed=True):
+    """閱讀權限的文字 (已完結 / 連載中，是否需要追漫券)"""
+    # 先用子字串預掃描 (大多數頁面到這裡就結束)；命中時去掉 script、註解與標籤再確認一次，
+    # 避免提示文字只出現在 script、meta 或註解裡時被誤判成需要追漫券
+    paid = PAYWALL_TEXT in html and PAYWALL_TEXT in _NON_TEXT_RE.sub('', html)
+    if completed:
+        return ACCESS_PAID if paid else ACCESS_FREE
+    return ACCESS_ONGOING_PAID if paid else ACCESS_ONGOING
+
+
+def _extract_with_lxml(html, completed=True):
+    root = lxml.html.fromstring(html)
+
+    episode_no = root.xpath(_XPATH_EPISODE_NO)
+    episode_count = int(episode_no[0]) if episode_no else 0
+
+    cover = root.xpath(_XPATH_COVER) or root.xpath('//img')
+    picture = cover[0].get("src", "") if cover else ""
+
+    author_tag = root.xpath(_XPATH_AUTHOR)
+    author = DEFAULT_AUTHOR
+    if author_tag:
+        author = "".join(t.strip() for t in author_tag[0].itertext())
+
+    return {
+        "episode_count": episode_count,
+        "picture": picture,
+        "author": author,
+        "access": access_note(html, completed),
+    }
+
+
+def _extract_with_bs4(html, completed=True):
+    soup = BeautifulSoup(html, "html.parser")
+
+    episode_count = 0
+    episode_list = soup.find("ul", id="_listUl")
+    if episode_list:
+        latest_item = episode_list.find("li", class_="_episodeItem")
+        if latest_item and "data-episode-no" in latest_item.attrs:
+            try:
+                episode_count = int(latest_item["data-episode-no"])
+            except ValueError:
+                episode_count = 0
+
+    cover_tag = soup.select_one(".detail_header .thmb img") or soup.select_one("img")
+    picture = cover_tag.get("src", "") if cover_tag else ""
+
+    author_tag = soup.select_one(".author")
+    author = author_tag.get_text(strip=True) if author_tag else DEFAULT_AUTHOR
+
+    return {
+        "episode_count": episode_count,
+        "picture": picture,
+        "author": author,
+        "access": access_note(html, completed),
+    }
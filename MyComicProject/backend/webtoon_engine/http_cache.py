@@ -0,0 +1,95 @@
+"""API 回應的 HTTP 快取工具：ETag / If-None-Match 判斷、Accept-Encoding 協商與壓縮"""
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Brotli 是選用套件，沒有時只提供 gzip
+    brotli = None
+
+# 支援的壓縮方式 (沒有 Brotli 時只有 gzip)
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# 太小的內容壓縮不划算
+MIN_COMPRESS_SIZE = 1024
+
+
+def make_etag(*parts):
+    """由資料版本 (摘要)、查詢條件與壓縮方式組出強 ETag (不同壓縮的內容不能共用同一個強 ETag)"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode('utf-8')).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def if_none_match(header, etag):
+    """If-None-Match 是否命中目前的 ETag (支援多個值與 *)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in header.split(',')]
+    # 壓縮後的回應可能被代理伺服器改成弱 ETag，比對時忽略 W/ 前綴
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def negotiate(accept_encoding):
+    """依 Accept-Encoding 選出壓縮方式 (br 優先，其次 gzip)，都不接受時回傳 None"""
+    prefs = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            prefs[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if prefs.get(encoding, prefs.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding, cached=False):
+    """壓縮內容；cached=True 代表結果會被重複使用，值得用較高的壓縮等級"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=9 if cached else 5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9 if cached else 6, mtime=0)
+    return body
+
+
+class PrecompressedBody:
+    """同一份內容的原始 / gzip / br 版本，第一次需要時壓縮並留著重複使用
+
+    variants 是已經壓縮好的版本 (例如暖快照中 mmap 的區塊)，第一次用到時才複製成 bytes。
+    """
+
+    def __init__(self, raw, variants=None):
+        self._size = len(raw)
+        self._variants = {None: raw}
+        self._variants.update(variants or {})
+
+    @property
+    def raw(self):
+        return self._bytes(None)
+
+    def _bytes(self, encoding):
+        data = self._variants[encoding]
+        if not isinstance(data, bytes):
+            data = self._variants[encoding] = bytes(data)
+        return data
+
+    def get(self, encoding):
+        if self._size < MIN_COMPRESS_SIZE:
+            encoding = None
+        if encoding not in self._variants:
+            self._variants[encoding] = compress(self.raw, encoding, cached=True)
+        return encoding, self._bytes(encoding)
+
+    def compressed(self):
+        """所有支援的壓縮版本 {壓縮方式: 內容} (寫入暖快照用)；內容太小時不壓縮"""
+        if self._size < MIN_COMPRESS_SIZE:
+            return {}
+        return {encoding: self.get(encoding)[1] for encoding in ENCODINGS}
@@ -0,0 +1,93 @@
+"""共用 HTTP 連線層：連線池 + keep-alive、預設 headers、逾時與自動重試
+
+requests 在第一次建立 Session 時才匯入：只提供讀取 API 的程序 (冷啟動) 不必載入。
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+
+from . import metrics
+
+# 原本在各處複製貼上的 headers，統一放在這裡
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+    "Referer": "https://www.webtoons.com/"
+}
+
+# (連線逾時, 讀取逾時)，避免單一卡住的請求拖垮整個爬蟲
+DEFAULT_TIMEOUT = (
+    float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5)),
+    float(os.environ.get('HTTP_READ_TIMEOUT', 20)),
+)
+MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5))
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 16))
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_session():
+    """建立一個帶連線池與重試策略的 requests.Session"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,        # 0.5s, 1s, 2s ... 指數退避
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,      # 429 時尊重伺服器的 Retry-After
+        raise_on_status=False,                # 重試用完後回傳最後的回應，由呼叫端判斷
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """取得全程序共用的 Session (第一次呼叫時才建立)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def fetch(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """所有對外 GET 請求的統一入口 (順便記錄請求數、下載量、重試與 429)"""
+    host = urlsplit(url).hostname or ''
+    try:
+        resp = get_session().get(url, timeout=timeout, **kwargs)
+    except Exception:
+        metrics.HTTP_REQUESTS.inc(host=host, status='error')
+        raise
+    _record_response(host, resp, streamed=kwargs.get('stream', False))
+    return resp
+
+
+def _record_response(host, resp, streamed=False):
+    metrics.HTTP_REQUESTS.inc(host=host, status=resp.status_code)
+    metrics.HTTP_RESPONSE_SECONDS.observe(resp.elapsed.total_seconds(), host=host)
+    # 串流下載還沒讀內容，只能先用 Content-Length 估計
+    if streamed:
+        size = resp.headers.get('Content-Length', '')
+        size = int(size) if size.isdigit() else 0
+    else:
+        size = len(resp.content)
+    metrics.HTTP_BYTES.inc(size, host=host)
+    # urllib3 的 Retry 物件會記下每一次重試 (含狀態碼)
+    retries = getattr(resp.raw, 'retries', None)
+    history = getattr(retries, 'history', None) or ()
+    if history:
+        metrics.HTTP_RETRIES.inc(len(history), host=host)
+    rate_limited = sum(1 for attempt in history if attempt.status == 429) + (resp.status_code == 429)
+    if rate_limited:
+        metrics.HTTP_RATE_LIMITED.inc(rate_limited, host=host)
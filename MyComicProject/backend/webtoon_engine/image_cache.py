@@ -0,0 +1,239 @@
+"""圖片代理快取：硬碟儲存 + 容量上限 LRU 淘汰 + 同網址請求合併 + 縮圖
+
+- 每張圖以「網址 (+ 縮圖規格)」的雜湊當檔名，內容的 sha1 當 ETag
+- 同一個網址同時有多個請求時，只有第一個會真的向上游抓圖，其他的等它寫完直接讀檔
+- 上游回應以 chunk 方式寫入硬碟，不會整張圖放在記憶體
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from .http_client import fetch
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 是選用套件，沒有時 ?w= 直接回傳原圖
+    Image = None
+
+# 只代理這些網域 (含子網域) 的圖片，避免快取被任意網址塞爆
+# IMAGE_EXTRA_HOSTS: 額外允許的網域 (逗號分隔)，例如效能測試用的本機假伺服器 127.0.0.1
+ALLOWED_HOST_SUFFIXES = ('pstatic.net', 'webtoons.com') + tuple(
+    host.strip().lower() for host in os.environ.get('IMAGE_EXTRA_HOSTS', '').split(',') if host.strip())
+
+# 縮圖寬度只允許這幾種，避免 ?w= 產生無限多種快取版本
+THUMB_WIDTHS = (160, 240, 320, 480, 640)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UpstreamError(Exception):
+    """上游圖片伺服器回傳錯誤"""
+
+    def __init__(self, status):
+        super().__init__(f"上游回傳 HTTP {status}")
+        self.status = status
+
+
+class CachedImage:
+    def __init__(self, key, path, content_type, etag, size):
+        self.key = key
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+        self.size = size
+
+
+def is_allowed_image_url(url):
+    """只接受 http(s) 且網域在白名單中的網址"""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        return False
+    return any(host == suffix or host.endswith('.' + suffix) for suffix in ALLOWED_HOST_SUFFIXES)
+
+
+def thumbnail_width(width):
+    """把要求的寬度往上對齊到允許的縮圖寬度"""
+    for allowed in THUMB_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return THUMB_WIDTHS[-1]
+
+
+def cache_key(url, variant=''):
+    return hashlib.sha256(f"{url}\x1f{variant}".encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    def __init__(self, directory, max_bytes, fetcher=fetch):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> 檔案大小，越後面越近期使用
+        self._total = 0
+        self._inflight = {}            # key -> 正在抓取該 key 的鎖
+        self._scan()
+
+    # --- 索引與 LRU ---
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.bin', base + '.json'
+
+    def _scan(self):
+        """啟動時依檔案修改時間重建 LRU 順序 (命中時會更新 mtime)"""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.bin'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def _register(self, key, size):
+        with self._lock:
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                for path in self._paths(old_key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
+
+    # --- 讀寫 ---
+
+    def lookup(self, key):
+        """快取命中時回傳 CachedImage (並更新 LRU 順序)，否則回傳 None"""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if 'alias' in meta:
+                return self.lookup(meta['alias'])
+            os.utime(data_path)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return CachedImage(key, data_path, meta['content_type'], meta['etag'], meta['size'])
+
+    def contains(self, key):
+        return os.path.exists(self._paths(key)[1])
+
+    def store(self, key, chunks, content_type):
+        """把 chunk 串流寫入暫存檔，完成後原子性地放到快取位置"""
+        data_path, meta_path = self._paths(key)
+        directory = os.path.dirname(data_path)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha1()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        meta = {"content_type": content_type, "etag": digest.hexdigest(), "size": size}
+        # meta 檔最後才寫，lookup 看到 meta 就代表圖片已經完整
+        fd, tmp_meta = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+        self._register(key, size)
+        return CachedImage(key, data_path, content_type, meta['etag'], size)
+
+    def alias(self, key, target):
+        """讓 key 直接指向另一個快取項目 target (CachedImage)，之後 lookup(key) 回傳 target
+
+        只寫一個很小的 meta 檔，不算進容量也不參與 LRU；target 被淘汰後 lookup(key) 會是 None，重新建立即可。
+        """
+        meta_path = self._paths(key)[1]
+        directory = os.path.dirname(meta_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_meta = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"alias": target.key}, f)
+        os.replace(tmp_meta, meta_path)
+        return target
+
+    def get_or_create(self, key, create):
+        """請求合併：同一個 key 只會有一個執行緒呼叫 create()，回傳 (CachedImage, 是否命中)"""
+        hit = self.lookup(key)
+        if hit:
+            return hit, True
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                hit = self.lookup(key)
+                if hit:
+                    return hit, True  # 等待期間已經被其他請求抓好了
+                return create(), False
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    # --- 對外功能 ---
+
+    def get_original(self, url):
+        key = cache_key(url)
+        return self.get_or_create(key, lambda: self._download(url, key))
+
+    def get_thumbnail(self, url, width, fmt='webp'):
+        """縮圖 (寬度會對齊到 THUMB_WIDTHS)，沒裝 Pillow 時回傳原圖"""
+        original, hit = self.get_original(url)
+        if Image is None:
+            return original, hit
+        width = thumbnail_width(width)
+        key = cache_key(url, f"w{width}.{fmt}")
+        return self.get_or_create(key, lambda: self._make_thumbnail(original, key, width, fmt))
+
+    def _download(self, url, key):
+        resp = self.fetcher(url, stream=True)
+        try:
+            if resp.status_code != 200:
+                raise UpstreamError(resp.status_code)
+            content_type = resp.headers.get('Content-Type', 'application/octet-stream')
+            return self.store(key, resp.iter_content(CHUNK_SIZE), content_type)
+        finally:
+            resp.close()
+
+    def _make_thumbnail(self, original, key, width, fmt):
+        with Image.open(original.path) as im:
+            if im.width <= width:
+                # 原圖已經夠小，不需要另外存一份；記下這個結果，下次不必再開原圖判斷
+                return self.alias(key, original)
+            im.thumbnail((width, width * 10))
+            if fmt == 'jpeg' and im.mode not in ('RGB', 'L'):
+                im = im.convert('RGB')
+            buf = io.BytesIO()
+            im.save(buf, format=fmt.upper(), quality=80)
+        return self.store(key, [buf.getvalue()], f"image/{fmt}")
@@ -0,0 +1,59 @@
+"""增量爬取：列表頁指紋 + HTTP 驗證碼 (ETag / Last-Modified)，沒變的作品就不抓內頁"""
+import hashlib
+import os
+import time
+
+# 超過這個秒數沒檢查過的作品，即使指紋沒變也會重新抓內頁 (預設 7 天)
+STALE_TTL = float(os.environ.get('CRAWL_STALE_TTL', 7 * 24 * 3600))
+
+
+def list_fingerprint(title, genre, thumbnail):
+    """列表頁項目的指紋 (標題、類型、縮圖任一變動都會改變)"""
+    raw = "\x1f".join([title or "", genre or "", thumbnail or ""])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def needs_detail_fetch(old_data, entry, ttl=STALE_TTL, now=None, recheck=False):
+    """判斷這個列表項目是否需要 (有條件地) 重新抓內頁
+
+    recheck: 列表上這一段可能有位置沒變的更新 (例如依更新時間排序的第一頁)，有舊資料也一律送條件式 GET
+    """
+    if not old_data:
+        return True
+    meta = old_data.get('crawl_meta')
+    if not meta:
+        return True  # 舊資料還沒有指紋，先抓一次補上
+    if meta.get('fingerprint') != entry['fingerprint']:
+        return True
+    if recheck:
+        return True
+    # 列表位置和上次不同 (前面有作品更新、或它自己更新了)，送條件式 GET 確認；沒變時回 304 很便宜
+    # (不同列表的位置不能互相比較)
+    same_list = meta.get('target', entry.get('target')) == entry.get('target')
+    if same_list and entry['position'] != meta.get('position', entry['position']):
+        return True
+    now = time.time() if now is None else now
+    return now - meta.get('checked_at', 0) > ttl
+
+
+def conditional_headers(old_data):
+    """依上次記錄的驗證碼組出條件式 GET 的 headers"""
+    meta = (old_data or {}).get('crawl_meta') or {}
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+def build_crawl_meta(entry, response, now=None):
+    """存在紀錄旁邊的爬蟲中繼資料 (指紋、列表位置、驗證碼、檢查時間)"""
+    return {
+        "fingerprint": entry['fingerprint'],
+        "position": entry['position'],
+        "target": entry.get('target'),
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+        "checked_at": time.time() if now is None else now,
+    }
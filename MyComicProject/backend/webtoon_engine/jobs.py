@@ -0,0 +1,396 @@
+"""背景爬蟲工作：同一時間只跑一個工作、事件環狀緩衝區、進度檢查點與取消
+
+爬蟲在背景執行緒中執行，/start-crawl 只是訂閱者：瀏覽器斷線不會中止工作，
+多個分頁同時觀看也只會共用同一個爬蟲，不會對 Webtoon 多發請求。
+持有檔案鎖的程序會把事件同步寫進事件檔 (<lock_path>.events)，其他 gunicorn worker
+以 RemoteCrawlJob 讀取同一份進度，取消則透過取消檔 (<lock_path>.cancel) 通知。
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，只能保證單一程序內不重複執行
+    fcntl = None
+
+DONE_MESSAGE = "DONE"
+
+
+class CrawlCheckpoint:
+    """存在硬碟上的爬蟲進度，工作中斷 (取消、當機、重新部署) 後可以接續"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, **state):
+        state['updated_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.checkpoint_', suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _dump_line(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _read_cancel(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class CrawlJob:
+    """一次爬蟲工作：狀態 + 最近的事件 (環狀緩衝區)；有給 events_path 時事件也同步寫進事件檔"""
+
+    def __init__(self, params, checkpoint, resume_state=None, ring_size=2000, events_path=None,
+                 cancel_path=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.resume_state = resume_state
+        self.status = 'running'
+        self.started_at = time.time()
+        self.finished_at = None
+        self._checkpoint = checkpoint
+        self._events = deque(maxlen=ring_size)
+        self._next_seq = 1
+        self._cond = threading.Condition()
+        self._cancel = threading.Event()
+        self._cancel_path = cancel_path
+        self._log = None
+        if events_path:
+            # 每個工作換一個新檔 (新的 inode)，還在讀上一個工作的程序才分得出來
+            directory = os.path.dirname(os.path.abspath(events_path))
+            fd, tmp_path = tempfile.mkstemp(prefix='.events_', suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(_dump_line({"job": self.id, "params": params, "started_at": self.started_at}))
+            os.replace(tmp_path, events_path)
+            self._log = open(events_path, 'a', encoding='utf-8')
+
+    # --- 給爬蟲本身使用 ---
+
+    @property
+    def cancelled(self):
+        # 其他程序的取消要求寫在取消檔中 (內容是工作 id)
+        if not self._cancel.is_set() and self._cancel_path and _read_cancel(self._cancel_path) == self.id:
+            self._cancel.set()
+        return self._cancel.is_set()
+
+    def save_progress(self, **state):
+        """記錄目前進度 (例如已完成的頁數)，下次啟動時可從這裡繼續"""
+        self._checkpoint.save(job_id=self.id, params=self.params, **state)
+
+    # --- 給執行器與訂閱者使用 ---
+
+    def publish(self, message):
+        with self._cond:
+            self._events.append((self._next_seq, message))
+            if self._log:
+                self._log.write(_dump_line({"seq": self._next_seq, "message": message}))
+                self._log.flush()
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def finish(self, status):
+        with self._cond:
+            self.status = status
+            self.finished_at = time.time()
+            if self._log:
+                self._log.write(_dump_line({"status": status, "finished_at": self.finished_at}))
+                self._log.close()
+                self._log = None
+            self._cond.notify_all()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def cancel(self):
+        self._cancel.set()
+
+    def subscribe(self, after_seq=0, heartbeat=15):
+        """依序產出 (seq, message)；每 heartbeat 秒沒有新事件時產出 None (用來送 keep-alive)
+
+        訂閱者太慢、需要的事件已經被擠出環狀緩衝區時，從目前最舊的一筆繼續。
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._next_seq - 1 > after_seq or self.finished, heartbeat)
+                events = [event for event in self._events if event[0] > after_seq]
+                finished = self.finished
+            if not events:
+                if finished:
+                    return
+                yield None
+                continue
+            for event in events:
+                after_seq = event[0]
+                yield event
+
+    def info(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": self._next_seq - 1,
+        }
+
+
+class RemoteCrawlJob:
+    """其他程序 (另一個 gunicorn worker) 正在執行的工作：從事件檔讀取進度，介面與 CrawlJob 相同"""
+
+    def __init__(self, runner, header):
+        self.id = header['job']
+        self.params = header.get('params')
+        self.resume_state = None
+        self.status = 'running'
+        self.started_at = header.get('started_at')
+        self.finished_at = None
+        self._runner = runner
+        self._last_seq = 0
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def cancel(self):
+        with open(self._runner.cancel_path, 'w', encoding='utf-8') as f:
+            f.write(self.id)
+
+    def subscribe(self, after_seq=0, heartbeat=15, poll=0.5):
+        """依序產出 (seq, message)，每 heartbeat 秒沒有新事件時產出 None；持有鎖的程序結束後停止"""
+        reader = self._runner._read_events(self.id)
+        idle_since = time.monotonic()
+        while not self.finished:
+            got_event = False
+            for entry in next(reader):
+                if 'seq' in entry:
+                    self._last_seq = entry['seq']
+                    if entry['seq'] > after_seq:
+                        after_seq = entry['seq']
+                        got_event = True
+                        yield entry['seq'], entry['message']
+                elif 'status' in entry:
+                    self.status, self.finished_at = entry['status'], entry['finished_at']
+            if self.finished:
+                return
+            if got_event:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= heartbeat:
+                # 太久沒有事件：順便確認執行的程序還在 (當機時不會寫出結束狀態)
+                if not self._runner._lock_held_elsewhere():
+                    self.status, self.finished_at = 'failed', time.time()
+                    return
+                idle_since = time.monotonic()
+                yield None
+            time.sleep(poll)
+
+    def info(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": self._last_seq,
+            "remote": True,
+        }
+
+
+class CrawlJobRunner:
+    """確保同一時間只有一個爬蟲工作 (單一程序內用鎖，跨 gunicorn worker 用檔案鎖)"""
+
+    def __init__(self, crawl_func, checkpoint_path, lock_path, ring_size=2000):
+        # crawl_func(job) 是一個 generator，每 yield 一個字串就是一則進度訊息
+        self.crawl_func = crawl_func
+        self.checkpoint = CrawlCheckpoint(checkpoint_path)
+        self.lock_path = lock_path
+        self.events_path = lock_path + '.events'
+        self.cancel_path = lock_path + '.cancel'
+        self.ring_size = ring_size
+        self._lock = threading.Lock()
+        self._job = None
+
+    @property
+    def current(self):
+        """本程序執行中的工作；沒有時是其他程序執行中的工作 (RemoteCrawlJob)，再沒有則是本程序上一個工作"""
+        job = self._job
+        if job and not job.finished:
+            return job
+        return self._remote_job() or job
+
+    def start(self, params, restart=False):
+        """啟動新工作或加入執行中的工作 (也可能在其他程序)，回傳 (job, 是否新建)；無法加入時回傳 (None, False)"""
+        with self._lock:
+            if self._job and not self._job.finished:
+                return self._job, False
+            process_lock = self._acquire_process_lock()
+            if process_lock is False:
+                return self._remote_job(), False
+
+            resume_state = None if restart else self.checkpoint.load()
+            if resume_state:
+                params = resume_state.get('params', params)  # 接續時沿用上次的設定
+            try:
+                os.remove(self.cancel_path)
+            except OSError:
+                pass
+            events_path = self.events_path if process_lock is not None else None
+            job = CrawlJob(params, self.checkpoint, resume_state, self.ring_size, events_path, self.cancel_path)
+            self._job = job
+            threading.Thread(target=self._run, args=(job, process_lock), daemon=True,
+                             name=f"crawl-{job.id}").start()
+            return job, True
+
+    def cancel(self, job_id=None):
+        job = self.current
+        if job is None or job.finished or (job_id and job.id != job_id):
+            return None
+        job.cancel()
+        return job
+
+    def _remote_job(self):
+        """其他程序持有檔案鎖、事件檔還沒寫出結束狀態時，回傳讀取該工作的 RemoteCrawlJob"""
+        try:
+            with open(self.events_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                finished = any('status' in json.loads(line) for line in f if line.endswith('\n'))
+        except (OSError, ValueError):
+            return None
+        if finished or 'job' not in header or not self._lock_held_elsewhere():
+            return None
+        return RemoteCrawlJob(self, header)
+
+    def _read_events(self, job_id):
+        """事件檔的讀取器：每次 next() 回傳上次之後新增的完整行；檔案換成別的工作時回傳結束狀態"""
+        offset, inode = 0, None
+        while True:
+            try:
+                with open(self.events_path, 'rb') as f:
+                    if offset == 0:
+                        header = json.loads(f.readline())
+                        if header.get('job') != job_id:
+                            raise ValueError
+                        offset, inode = f.tell(), os.fstat(f.fileno()).st_ino
+                    elif os.fstat(f.fileno()).st_ino != inode:
+                        raise ValueError  # 已經換成下一個工作的事件檔
+                    f.seek(offset)
+                    data = f.read()
+                end = data.rfind(b'\n') + 1  # 寫到一半的最後一行留到下次再讀
+                offset += end
+                entries = [json.loads(line) for line in data[:end].splitlines()]
+            except (OSError, ValueError):
+                entries = [{"status": 'failed', "finished_at": time.time()}]
+            yield entries
+
+    def _lock_held_elsewhere(self):
+        """其他程序是否持有爬蟲的檔案鎖 (本程序正在爬時也算，呼叫端需先排除)"""
+        process_lock = self._acquire_process_lock()
+        if process_lock is False:
+            return True
+        self._release_process_lock(process_lock)
+        return False
+
+    def _run(self, job, process_lock):
+        status = 'done'
+        gen = self.crawl_func(job)
+        try:
+            for message in gen:
+                job.publish(message)
+                if job.cancelled:
+                    status = 'cancelled'
+                    break
+        except Exception as e:
+            status = 'failed'
+            job.publish(f"❌ 爬蟲發生未預期的錯誤: {e}")
+        finally:
+            gen.close()  # 讓爬蟲的 finally 區塊 (例如取消封面預載) 執行
+            if status == 'done':
+                self.checkpoint.clear()
+            elif status == 'cancelled':
+                job.publish("🛑 爬蟲已取消，下次啟動會從檢查點繼續")
+            # 結束狀態寫進事件檔之後才放掉檔案鎖 (之後其他程序才可能開始下一個工作、換掉事件檔)；
+            # 持有 _lock 讓被喚醒的訂閱者在鎖放掉之後才能啟動下一個工作
+            job.publish(DONE_MESSAGE)
+            with self._lock:
+                job.finish(status)
+                self._release_process_lock(process_lock)
+
+    def _acquire_process_lock(self):
+        """非阻塞地取得跨程序檔案鎖；取不到回傳 False，平台不支援時回傳 None"""
+        if fcntl is None:
+            return None
+        f = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        return f
+
+    def _release_process_lock(self, f):
+        if f:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+
+def sse_stream(runner, params, last_event_id='', restart=False, started_message=None):
+    """/start-crawl 的 SSE 串流 (後端與本地版共用)，回傳逐段產出 SSE 文字的 generator
+
+    沒有 Last-Event-ID 時啟動 (或加入進行中的) 工作；瀏覽器自動重連時會帶 Last-Event-ID
+    (格式 "<job_id>:<seq>")，只接回原本的工作並從下一則訊息繼續，不會另開新工作。
+    started_message: 新開工作時先送出的訊息
+    """
+    if last_event_id:
+        job_id, _, last_seq = last_event_id.partition(':')
+        job, created = runner.current, False
+        if job is None or job.id != job_id:
+            job = None
+        last_seq = int(last_seq) if last_seq.isdigit() else 0
+    else:
+        job, created = runner.start(params, restart=restart)
+        last_seq = 0
+
+    def stream():
+        if job is None:
+            if last_event_id:
+                yield f"data: {DONE_MESSAGE}\n\n"  # 原本的工作已不在，直接結束
+                return
+            yield "data: ⚠️ 另一個程序正在執行爬蟲，但讀不到它的進度，請稍後再試\n\n"
+            yield f"data: {DONE_MESSAGE}\n\n"
+            return
+        if created and started_message:
+            yield f"data: {started_message}\n\n"
+        elif not created and not last_seq:
+            yield f"data: 👀 已有爬蟲工作執行中 ({job.id})，顯示目前進度\n\n"
+        for event in job.subscribe(after_seq=last_seq):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            seq, message = event
+            yield f"id: {job.id}:{seq}\ndata: {message}\n\n"
+
+    return stream()
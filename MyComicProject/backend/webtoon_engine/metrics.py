@@ -0,0 +1,234 @@
+"""爬蟲量測：各階段耗時 (histogram) 與計數器，以 Prometheus 文字格式輸出
+
+- stage() / observe_stage()：列表抓取、內頁抓取、解析、比對、存檔、圖片代理各花多少時間
+- http_client.fetch 會記錄請求數、下載量、重試次數與 429
+- BOOT_SECONDS：後端冷啟動的匯入耗時與第一個請求的延遲
+- 每個程序各有一份 REGISTRY；多程序掃描時 worker 用 drain() 把增量送回主程序 merge()
+
+gunicorn 的每個 worker 也各有一份，/metrics 只會看到爬蟲所在 worker 的爬蟲數據。
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# 秒數的 histogram 區間 (最後還有一個 +Inf)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只會增加的計數器；labels 是標籤名稱，inc() 時以關鍵字參數給值"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, amount in values:
+            yield f'{self.name}_total{_format_labels(self.labels, key)} {_format_value(amount)}'
+
+
+class Histogram:
+    """分佈統計 (每個區間的累計次數 + 總和 + 次數)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # 標籤值 -> [各區間次數 (不累計), 總和, 次數]
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def _empty(self):
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = self._empty()
+            entry[0][slot] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, total, n) in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = self._empty()
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += n
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, [list(e[0]), e[1], e[2]]) for key, e in self._values.items())
+        for key, (counts, total, n) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [('le', _format_value(float(bound)))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labels, key)} {n}'
+
+
+class Gauge:
+    """可以任意設定的數值 (例如啟動耗時)；只屬於所在的程序，不會在 worker 之間合併"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def drain(self):
+        return {}
+
+    def merge(self, values):
+        pass
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def drain(self):
+        """取出並清空目前的數值 (可 pickle)，給 worker 程序送回主程序"""
+        return {name: metric.drain() for name, metric in self._metrics.items()}
+
+    def merge(self, snapshot):
+        for name, values in (snapshot or {}).items():
+            if name in self._metrics:
+                self._metrics[name].merge(values)
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'webtoon_stage_seconds', "各爬蟲階段的耗時 (list_fetch / detail_fetch / parse / diff / persist / image_proxy / browser_*)",
+    labels=('stage',)))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'webtoon_http_requests', "對外 HTTP 請求數 (status=error 代表連線失敗)", labels=('host', 'status')))
+HTTP_RESPONSE_SECONDS = REGISTRY.register(Histogram(
+    'webtoon_http_response_seconds', "送出請求到收到回應 headers 的時間 (含連線、TLS 與伺服器處理)",
+    labels=('host',)))
+HTTP_BYTES = REGISTRY.register(Counter(
+    'webtoon_http_bytes', "下載的回應內容位元組數", labels=('host',)))
+HTTP_RETRIES = REGISTRY.register(Counter(
+    'webtoon_http_retries', "連線層自動重試的次數", labels=('host',)))
+HTTP_RATE_LIMITED = REGISTRY.register(Counter(
+    'webtoon_http_429', "收到 HTTP 429 的次數 (含重試過程中的)", labels=('host',)))
+CRAWL_COMICS = REGISTRY.register(Counter(
+    'webtoon_crawl_comics', "爬蟲比對結果 (new / updated / skipped)", labels=('result',)))
+IMAGE_CACHE_REQUESTS = REGISTRY.register(Counter(
+    'webtoon_image_cache_requests', "圖片代理的快取命中 / 未命中", labels=('result',)))
+BOOT_SECONDS = REGISTRY.register(Gauge(
+    'webtoon_boot_seconds', "啟動耗時 (import = 匯入與初始化，first_request = 啟動到第一個回應，"
+    "first_request_handler = 第一個請求本身)", labels=('phase',)))
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def stage(name):
+    """量測一段程式的耗時；區塊中有 yield 時請改用 observe_stage，才不會把消費端的時間算進來"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
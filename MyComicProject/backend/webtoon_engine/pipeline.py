@@ -0,0 +1,346 @@
+"""共用的爬蟲流程：discover (列表頁) → fetch (內頁) → extract (解析) → diff (比對) → persist (寫入)
+
+後端 (MyComicProject/backend/app.py)、本地版 (crawler_app.py) 與命令列 (python -m webtoon_engine crawl)
+都用同一個 CrawlEngine，併發、條件式請求快取、增量模式、多程序與封面預載在每個入口都一樣有效。
+discover / fetch / extract / diff 在 scan.scan_page (多程序時是 sharding)；這裡負責串起目標、頁數、
+存檔、檢查點與預載，並以 generator 一則一則產出進度訊息。
+
+解析相關的模組 (scan / sharding 會載入 bs4、lxml) 與剖析工具在真的開始爬取時才匯入，
+網頁伺服器冷啟動時只需要 params_from_args 與 CrawlEngine 本身。
+"""
+import argparse
+import sys
+
+from . import metrics, settings
+from .catalogue import Catalogue
+from .changes import ChangeLog
+from .concurrency import HostRateLimiter
+from .http_client import fetch
+from .image_cache import ImageCache
+from .jobs import DONE_MESSAGE, CrawlJobRunner
+from .prefetch import CoverPrefetcher
+from .storage import BACKENDS, default_path, open_storage
+from .targets import TargetScheduler, load_targets
+
+
+def _flag(value):
+    return value not in ('0', 'false', '')
+
+
+def params_from_args(args, defaults):
+    """由 /start-crawl 的查詢參數 (Flask 的 request.args) 組出爬蟲參數，沒帶的沿用預設值"""
+    return {
+        # /start-crawl?concurrency=N 臨時覆寫併發數
+        "concurrency": args.get('concurrency', defaults['concurrency'], type=int),
+        # /start-crawl?incremental=1：只看列表頁指紋，沒變的作品不抓內頁
+        "incremental": _flag(args.get('incremental', '1' if defaults['incremental'] else '0')),
+        # /start-crawl?processes=N：把頁面分給 N 個程序平行掃描 (1 = 單一程序多執行緒)
+        "processes": args.get('processes', defaults['processes'], type=int),
+        # /start-crawl?rate=N：全域每秒請求上限，多程序時平均分給每個程序
+        "rate": args.get('rate', defaults['rate'], type=float),
+        # /start-crawl?pages=N：每個目標最多掃描 N 頁列表 (0 = 全部)
+        "pages": args.get('pages', defaults['pages'], type=int),
+        # /start-crawl?prefetch=0 可關閉封面預載
+        "prefetch": _flag(args.get('prefetch', '1' if defaults['prefetch'] else '0')),
+        # /start-crawl?targets=all 或 targets=zh-hant-completed,zh-hant-ongoing-monday
+        "targets": args.get('targets', defaults['targets']),
+        # /start-crawl?profile=1：剖析這一次爬蟲，結束時回報報告位置
+        "profile": _flag(args.get('profile', '1' if defaults['profile'] else '0')),
+    }
+
+
+def prefetch_progress_message(prefetcher):
+    p = prefetcher.progress()
+    return (f"🖼️ 封面預載：完成 {p['done']} / {p['queued']}，已在快取 {p['skipped']}，"
+            f"失敗 {p['failed']}，下載 {p['bytes'] / 1024:.0f} KB")
+
+
+class CrawlEngine:
+    """一個清單 (catalogue.Catalogue) + 一組爬取目標的爬蟲
+
+    run(job) 是交給 jobs.CrawlJobRunner 在背景執行的 generator；job 需要有 id、params、
+    resume_state 與 save_progress()。沒有圖片快取 (image_cache=None) 時不預載封面。
+    """
+
+    def __init__(self, catalogue, scheduler, image_cache=None, profile_dir=None, fetcher=fetch):
+        self.catalogue = catalogue
+        self.scheduler = scheduler
+        self.image_cache = image_cache
+        self.profile_dir = profile_dir
+        self.fetch = fetcher
+
+    # --- persist ---
+
+    def load_local_data(self):
+        """取得 {id: data} 的字典格式以便快速比對 (來自記憶體快取的拷貝，不重複讀檔)"""
+        return self.catalogue.records_by_id()
+
+    def save_local_data(self, data_dict, changed_ids=None):
+        """寫回儲存後端；有給 changed_ids 時只 upsert 這些紀錄，否則整份寫入"""
+        try:
+            with metrics.stage('persist'):
+                if changed_ids is None:
+                    self.catalogue.upsert(data_dict.values())
+                else:
+                    self.catalogue.upsert(data_dict[comic_id] for comic_id in changed_ids)
+        except Exception as e:
+            print(f"存檔失敗: {e}")
+
+    def flush_local_data(self, max_age=0):
+        """寫入累積中的紀錄 (只有整份重寫的 JSON 後端會累積)；回傳是否已全部寫入"""
+        try:
+            with metrics.stage('persist'):
+                return self.catalogue.flush(max_age)
+        except Exception as e:
+            print(f"存檔失敗: {e}")
+            return False
+
+    # --- 爬蟲本體 ---
+
+    def run(self, job):
+        """背景爬蟲工作本體，每 yield 一個字串就是一則進度訊息"""
+        prefetcher = None
+        if job.params.get('prefetch') and self.image_cache is not None:
+            prefetcher = CoverPrefetcher(self.image_cache, settings.PREFETCH_CONCURRENCY)
+        try:
+            if not job.params.get('profile'):
+                yield from self.crawl(job, prefetcher)
+                return
+            from .profiling import profile_run
+            with profile_run(f'crawl-{job.id}', self.profile_dir) as run:
+                yield from self.crawl(job, prefetcher)
+            yield f"🔬 效能剖析報告：{run.path}"
+        finally:
+            # 工作被取消時也要取消還沒開始的預載
+            if prefetcher: prefetcher.close(cancel=True)
+
+    def crawl(self, job, prefetcher=None):
+        incremental = job.params['incremental']
+        resume = job.resume_state or {}
+        mode_label = "增量模式" if incremental else "完整比對模式"
+        yield f"🚀 爬蟲啟動：比對本地 JSON ({mode_label})"
+
+        # 1. 載入本地資料庫
+        local_db = self.load_local_data()
+        yield f"📂 目前本地資料庫共有 {len(local_db)} 部漫畫"
+
+        # 2. 決定這次要爬哪些目標 (手動爬取預設是所有開啟的目標，排程只爬到期的)
+        selection = job.params.get('targets', 'all')
+        targets = self.scheduler.due() if selection == 'due' else self.scheduler.select(selection)
+        # 接續時從中斷的目標開始，排在它前面的目標上次已經爬完
+        names = [target.name for target in targets]
+        if resume.get('target') in names:
+            targets = targets[names.index(resume['target']):]
+        if not targets:
+            yield "😴 目前沒有到期的爬取目標 (可用 ?targets=all 全部重爬)"
+            return
+        yield f"🎯 本次爬取目標：{', '.join(t.name for t in targets)}"
+
+        # 從檢查點接續時，統計也一併接上
+        totals = {key: resume.get(f'total_{key}', 0) for key in ('new', 'updated', 'skipped')}
+        if resume:
+            yield (f"♻️ 從檢查點繼續：{resume.get('target')} 上次已完成第 {resume.get('page')} 頁 "
+                   f"(最後一部：{resume.get('last_title')})")
+
+        # 同一次爬取中，出現在多個目標的作品只抓一次內頁 (以 title_no 合併)
+        # JSON 後端整份重寫很貴：整個工作的寫入累積起來，最多每 CRAWL_FLUSH_SECONDS 秒寫一次
+        seen = set()
+        with self.catalogue.batch():
+            for target in targets:
+                start_page, position = 1, 0
+                if resume.get('target') == target.name:
+                    start_page, position = resume.get('page', 0) + 1, resume.get('position', 0)
+                finished = yield from self.crawl_target(job, target, local_db, seen, totals, prefetcher,
+                                                        start_page, position)
+                if finished:
+                    self.scheduler.mark_done(target)
+
+        # 等封面預載全部完成 (每秒回報一次進度)
+        if prefetcher:
+            while not prefetcher.wait(timeout=1.0):
+                yield prefetch_progress_message(prefetcher)
+            yield prefetch_progress_message(prefetcher)
+
+        # 暖快照：先把完整清單的回應 (含壓縮版本) 與排序索引寫進快照檔，下次冷啟動直接使用
+        if self.catalogue.warm():
+            yield "🔥 已更新暖快照 (下次啟動可直接回應完整清單)"
+
+        yield f"🎉 任務結束！新增: {totals['new']}，更新: {totals['updated']}，略過: {totals['skipped']}。"
+
+    def crawl_target(self, job, target, local_db, seen, totals, prefetcher, start_page=1, position=0):
+        """爬完一個目標的所有列表頁；每一頁都讀取成功地走完 (含提前結束) 時回傳 True"""
+        from .scan import list_page_html, list_page_info, scan_page
+        from .sharding import scan_pages_sharded
+
+        fetch = self.fetch
+        concurrency = job.params['concurrency']
+        incremental = job.params['incremental']
+        processes = job.params.get('processes', 1)
+        rate = job.params.get('rate', settings.CRAWL_RATE_LIMIT)
+        pages = job.params.get('pages') or 0
+        rate_limiter = HostRateLimiter(rate)
+
+        # discover：取得總頁數 (單頁列表就是 1 頁)
+        yield f"🎯 開始爬取 {target.name} ({'完結' if target.completed else '連載'}，{target.locale})"
+        first_url = target.page_url(1)
+        try:
+            max_page, page_size = 1, 0
+            if target.paged:
+                rate_limiter.acquire(first_url)
+                with metrics.stage('list_fetch'):
+                    html = list_page_html(fetch(first_url))
+                with metrics.stage('parse'):
+                    max_page, page_size = list_page_info(html, target.item_selector)
+            # 有設定頁數上限時只掃描前幾頁 (本地測試用)
+            last_page = min(max_page, pages) if pages > 0 else max_page
+            # 多程序只用在多頁的目標，單頁列表不值得啟動 worker 程序
+            processes = processes if last_page - start_page > 0 else 1
+            mode = f"{processes} 個程序 × 併發 {concurrency}" if processes > 1 else f"併發 {concurrency}"
+            limit = f"每秒最多 {rate:g} 個請求" if rate > 0 else "不限速"
+            scope = f"，掃描前 {last_page} 頁" if last_page < max_page else ""
+            yield f"📦 線上清單共 {max_page} 頁{scope}，開始掃描 ({mode}，{limit})..."
+        except Exception as e:
+            yield f"❌ 無法連接 Webtoon: {str(e)}"
+            return False
+
+        # 依更新時間排序的列表：有新的一話的作品不一定會換位置 (本來就在最前面)，
+        # 所以第一頁、以及前一頁有變動時的下一頁，一律送條件式 GET (沒變的回 304)；
+        # 沒有排序的連載列表 (各星期的連載) 則每一頁都要確認
+        recheck_until = last_page if target.recheck_all else start_page if target.sorted_by_update else 0
+
+        # 多程序模式：各頁交給 worker 程序抓取與解析，只回傳變動紀錄，這裡是唯一的寫入端
+        # (頁面是預先分派的，只有第一頁一律重新確認，其餘頁面靠列表位置判斷)
+        sharded = None
+        if processes > 1:
+            sharded = scan_pages_sharded(range(start_page, last_page + 1), local_db, fetch, processes,
+                                         rate, concurrency, incremental, page_size, target, seen,
+                                         recheck_until)
+
+        # fetch → extract → diff：逐頁掃描
+        failed_pages = []
+        try:
+            for page in range(start_page, last_page + 1):
+                yield f"📄 正在掃描第 {page} / {last_page} 頁..."
+                if sharded:
+                    messages, result = next(sharded)
+                    for message in messages:
+                        yield message
+                else:
+                    result = yield from scan_page(page, local_db, fetch, rate_limiter, concurrency,
+                                                  incremental, position, target, seen,
+                                                  recheck=page <= recheck_until)
+                if not result.ok:
+                    failed_pages.append(page)
+                    continue
+                if target.sorted_by_update and result.changes:
+                    recheck_until = page + 1
+
+                position = result.position
+                for key in ('new', 'updated', 'skipped'):
+                    totals[key] += getattr(result, key)
+                    metrics.CRAWL_COMICS.inc(getattr(result, key), result=key)
+
+                # persist：該頁面全部跑完後，如果有變動才寫入 (只寫變動的紀錄，同一批交易)
+                if result.dirty:
+                    local_db.update(result.dirty)
+                    self.save_local_data(local_db, result.dirty.keys())
+                saved = self.flush_local_data(max_age=settings.CRAWL_FLUSH_SECONDS)
+                if result.dirty:
+                    yield f"💾 第 {page} 頁資料已更新並存檔" if saved else f"📝 第 {page} 頁資料已更新，稍後一起存檔"
+
+                # 背景預載封面，第一次開 Dashboard 時就能直接從本地快取讀圖
+                if prefetcher:
+                    for picture in result.pictures:
+                        prefetcher.submit(picture)
+
+                # 記錄進度：工作中斷後會從這個目標的下一頁繼續 (只記錄已經寫入的頁面)
+                if saved:
+                    job.save_progress(target=target.name, page=page, max_page=max_page,
+                                      last_title=result.last_title, position=position,
+                                      total_new=totals['new'], total_updated=totals['updated'],
+                                      total_skipped=totals['skipped'])
+                yield f"🏁 第 {page} 頁完成"
+                if prefetcher and prefetcher.queued:
+                    yield prefetch_progress_message(prefetcher)
+
+                # sortOrder=UPDATE 依更新時間排序：整頁都沒變，後面的頁面也不會有變動
+                if incremental and target.sorted_by_update and result.entries and result.changes == 0:
+                    yield f"🛑 第 {page} 頁完全沒有變動，提前結束掃描"
+                    break
+        finally:
+            if sharded: sharded.close()
+        if failed_pages:
+            # 有列表頁讀取失敗 (404、429、5xx)：不算爬完，這個目標下次仍然到期
+            pages_text = ', '.join(map(str, failed_pages))
+            yield f"⚠️ {target.name} 有 {len(failed_pages)} 頁讀取失敗 (第 {pages_text} 頁)，下次會再爬一次"
+            return False
+        return True
+
+
+# --- 命令列：python -m webtoon_engine crawl (不需要網頁伺服器，可以放進 cron) ---
+
+def open_catalogue(backend=None, path=None):
+    """依設定 (環境變數) 開啟清單；與 Flask 後端共用同一份資料、變更紀錄與快照檔"""
+    backend = backend or settings.STORAGE_BACKEND
+    if path is None:
+        path = settings.STORAGE_PATH if backend == settings.STORAGE_BACKEND else default_path(backend, settings.BASE_DIR)
+    storage = open_storage(backend, path, legacy_json=settings.DATA_FILE)
+    return Catalogue(storage, ChangeLog(settings.CHANGE_LOG_FILE, settings.CHANGE_LOG_WINDOW), snapshot_path=settings.CATALOGUE_SNAPSHOT or None)
+
+
+def main(argv=None):
+    defaults = settings.default_crawl_params()
+    parser = argparse.ArgumentParser(prog='python -m webtoon_engine', description="Webtoon 爬蟲命令列")
+    commands = parser.add_subparsers(dest='command', required=True)
+    crawl = commands.add_parser('crawl', help="爬取一次並寫入儲存後端 (與網頁伺服器共用爬蟲鎖與檢查點)")
+    crawl.add_argument('--pages', type=int, default=defaults['pages'], help="每個目標最多掃描幾頁 (0 = 全部)")
+    crawl.add_argument('--concurrency', type=int, default=defaults['concurrency'], help="同時抓取內頁的數量")
+    crawl.add_argument('--incremental', action=argparse.BooleanOptionalAction, default=defaults['incremental'],
+                       help="只看列表頁指紋，沒變的作品不抓內頁")
+    crawl.add_argument('--processes', type=int, default=defaults['processes'], help="多程序分頁掃描的程序數")
+    crawl.add_argument('--rate', type=float, default=defaults['rate'], help="每秒請求上限 (0 = 不限速)")
+    crawl.add_argument('--targets', default=defaults['targets'], help="all (所有開啟的目標) / due (只爬到期的) / 逗號分隔的目標名稱")
+    crawl.add_argument('--prefetch', action=argparse.BooleanOptionalAction, default=defaults['prefetch'],
+                       help="背景預載新作品的封面")
+    crawl.add_argument('--profile', action='store_true', default=defaults['profile'], help="剖析這一次爬蟲")
+    crawl.add_argument('--restart', action='store_true', help="忽略上次中斷的檢查點，從第 1 頁開始")
+    crawl.add_argument('--backend', choices=sorted(BACKENDS), help="儲存後端 (預設 STORAGE_BACKEND)")
+    crawl.add_argument('--path', help="後端資料檔路徑 (預設 STORAGE_PATH)")
+    commands.add_parser('warm', help="不爬取，只依目前的資料寫出暖快照 (可放在部署的 build 步驟)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'warm':
+        catalogue = open_catalogue()
+        if not catalogue.snapshot_path:
+            print("⚠️ CATALOGUE_SNAPSHOT 是空的，沒有快照檔可寫")
+            return 1
+        written = catalogue.warm()
+        print(f"🔥 暖快照{'已寫入' if written else '已是最新'}：{catalogue.snapshot_path} "
+              f"({len(catalogue.current().records)} 部)")
+        return 0
+
+    params = {key: getattr(args, key) for key in defaults}
+    engine = CrawlEngine(open_catalogue(args.backend, args.path),
+                         TargetScheduler(load_targets(settings.CRAWL_TARGETS_FILE), settings.CRAWL_SCHEDULE_FILE),
+                         ImageCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES),
+                         settings.CRAWL_PROFILE_DIR)
+    runner = CrawlJobRunner(engine.run, settings.CRAWL_CHECKPOINT_FILE, settings.CRAWL_LOCK_FILE)
+    job, _ = runner.start(params, restart=args.restart)
+    if job is None:
+        print("⚠️ 另一個程序正在執行爬蟲，請稍後再試")
+        return 2
+    events = job.subscribe()
+    while True:
+        try:
+            for event in events:
+                if event is not None and event[1] != DONE_MESSAGE:
+                    print(event[1], flush=True)
+            break
+        except KeyboardInterrupt:
+            # Ctrl+C：取消工作 (留下檢查點)，繼續印到爬蟲真正停下來
+            runner.cancel(job.id)
+    return 0 if job.status == 'done' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
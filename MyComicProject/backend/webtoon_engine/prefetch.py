@@ -0,0 +1,80 @@
+"""封面預載：爬蟲新增/更新作品後，在背景把封面先抓進圖片快取"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .image_cache import cache_key, is_allowed_image_url
+
+
+class CoverPrefetcher:
+    """有上限的背景下載佇列 (同網址只抓一次、已在快取中的直接略過)"""
+
+    def __init__(self, image_cache, max_workers=4, thumb_widths=(320,), thumb_format='webp'):
+        self.image_cache = image_cache
+        self.thumb_widths = thumb_widths
+        self.thumb_format = thumb_format
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._cond = threading.Condition()
+        self._seen = set()
+        self.queued = 0
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def submit(self, url):
+        """排入一張封面；重複、不在白名單或已快取的網址會被略過"""
+        if not url or not is_allowed_image_url(url):
+            return False
+        with self._cond:
+            if url in self._seen:
+                return False
+            self._seen.add(url)
+            if self.image_cache.contains(cache_key(url)):
+                self.skipped += 1
+                return False
+            self.queued += 1
+        self._pool.submit(self._warm, url)
+        return True
+
+    def _warm(self, url):
+        downloaded = 0
+        ok = True
+        try:
+            image, hit = self.image_cache.get_original(url)
+            if not hit:
+                downloaded += image.size
+            # Dashboard 列表用的是縮圖，順便先做好
+            for width in self.thumb_widths:
+                self.image_cache.get_thumbnail(url, width, self.thumb_format)
+        except Exception:
+            ok = False
+        with self._cond:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+            self.bytes += downloaded
+            self._cond.notify_all()
+
+    @property
+    def pending(self):
+        return self.queued - self.done - self.failed
+
+    def wait(self, timeout=None):
+        """等待佇列清空；逾時回傳 False (可用來定期回報進度)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.pending == 0, timeout)
+
+    def progress(self):
+        with self._cond:
+            return {
+                "queued": self.queued,
+                "done": self.done,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "bytes": self.bytes,
+            }
+
+    def close(self, cancel=False):
+        """結束背景執行緒；cancel=True 時取消還沒開始的下載"""
+        self._pool.shutdown(wait=False, cancel_futures=cancel)
@@ -0,0 +1,71 @@
+"""選用的效能剖析：把一次爬蟲 (或一次話數計算) 的 cProfile / pyinstrument 報告存成檔案
+
+    with profile_run('crawl') as run:
+        ...
+    print(run.path)
+
+- cProfile：存成 .prof，可用 `python -m pstats` 或 snakeviz 開啟，另附一份依累計時間排序的 .txt
+- pyinstrument (選用套件)：存成 .html；沒安裝時自動退回 cProfile
+兩者都只剖析呼叫 profile_run 的那個執行緒，內頁抓取的 worker 執行緒會顯示成等待時間。
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+from . import settings
+
+try:
+    import pyinstrument
+except ImportError:  # pyinstrument 是選用套件
+    pyinstrument = None
+
+# CRAWL_PROFILER: cprofile (預設) / pyinstrument
+PROFILER = os.environ.get('CRAWL_PROFILER', 'cprofile')
+# 報告存放目錄與 settings 相同 (預設在資料目錄旁的 profiles/)，不會因為從哪裡啟動而散落各處
+PROFILE_DIR = settings.CRAWL_PROFILE_DIR
+
+
+class ProfileRun:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.path = None  # 結束後才有報告路徑
+
+
+@contextmanager
+def profile_run(name, directory=None, engine=None):
+    """剖析 with 區塊內的程式，結束 (含例外、generator 被關閉) 時寫出報告"""
+    engine = engine or PROFILER
+    if engine == 'pyinstrument' and pyinstrument is None:
+        print("ℹ️ 未安裝 pyinstrument，改用 cProfile")
+        engine = 'cprofile'
+    run = ProfileRun(name, engine)
+    directory = directory or PROFILE_DIR
+    base = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+    if engine == 'pyinstrument':
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield run
+    finally:
+        os.makedirs(directory, exist_ok=True)
+        if engine == 'pyinstrument':
+            profiler.stop()
+            run.path = base + '.html'
+            with open(run.path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            run.path = base + '.prof'
+            profiler.dump_stats(run.path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(60)
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(out.getvalue())
@@ -0,0 +1,142 @@
+"""漫畫清單的記憶體索引：依 id / 狀態 / 類型 / 標題 n-gram 快速篩選、排序與分頁
+
+索引直接由欄位式清單 (webtoon_engine.columnar) 的欄位建立，紀錄只在回應時才組成 dict。
+"""
+import threading
+from array import array
+from collections import defaultdict
+
+STATUSES = ('free_ongoing', 'free_completed', 'paid')
+# 排序鍵；時間欄位在欄位式清單中是整數秒 (缺少時為 -1)，排序結果與原本的字串排序相同
+SORT_KEYS = ('title', 'episode_count', 'last_updated', 'crawl_date')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# query() 接受的參數；/api/comics 只有帶了其中之一才回傳分頁格式
+QUERY_PARAMS = ('page', 'limit', 'q', 'status', 'genre', 'sort', 'order')
+
+
+def comic_status(comic):
+    """與前端 getComicStatus 相同的判斷規則"""
+    text = comic.get('access') or comic.get('episodes') or ''
+    if '需要追漫券' in text:
+        return 'paid'
+    if '可免費看完整話數' in text or ('已完結' in text and '追漫券' not in text):
+        return 'free_completed'
+    return 'free_ongoing'
+
+
+def _title_grams(text):
+    """標題的單字 + 雙字 n-gram (中文一個字就有意義，所以單字也要索引)"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class CatalogueIndex:
+    """整份清單的唯讀索引，資料有變動時整個重建
+
+    標題 n-gram 與排序名次在第一次查詢時才建立 (暖快照有存排序名次時直接使用)，
+    載入新版本時只需要建立 id / 狀態 / 類型的索引。
+    """
+
+    def __init__(self, records, ranks=None):
+        self.records = records  # columnar.CompactCatalogue
+        self.by_id = {}         # id -> 紀錄位置
+        self.by_status = {status: set() for status in STATUSES}
+        self.by_genre = defaultdict(set)
+        self._grams = None      # n-gram -> 紀錄位置
+        self._titles = None
+        # 各排序鍵的名次 (array 比 dict 省很多記憶體)，查詢時只需排序篩選後的結果
+        self._rank = dict(ranks or {})
+        self._lock = threading.Lock()
+
+        status_codes = records.column('status')
+        for pos, (comic_id, genre) in enumerate(zip(records.column('id'), records.decoded('genre'))):
+            self.by_id[comic_id] = pos
+            self.by_status[STATUSES[status_codes[pos]]].add(pos)
+            self.by_genre[genre].add(pos)
+
+    def _title_index(self):
+        """(小寫標題, n-gram 索引)，第一次用到時建立"""
+        if self._grams is None:
+            with self._lock:
+                if self._grams is None:
+                    titles = [title.lower() for title in self.records.column('title')]
+                    grams = defaultdict(set)
+                    for pos, title in enumerate(titles):
+                        for gram in _title_grams(title):
+                            grams[gram].add(pos)
+                    self._titles, self._grams = titles, grams
+        return self._titles, self._grams
+
+    def rank(self, key):
+        """排序鍵的名次 (第 pos 筆紀錄排第幾)"""
+        rank = self._rank.get(key)
+        if rank is None:
+            values = self._title_index()[0] if key == 'title' else self.records.column(key)
+            ordered = sorted(range(len(self.records)), key=values.__getitem__)
+            rank = array('I', [0]) * len(self.records)
+            for position, pos in enumerate(ordered):
+                rank[pos] = position
+            self._rank[key] = rank
+        return rank
+
+    def warm_blocks(self):
+        """寫入暖快照的排序名次 [(區塊名稱, bytes)]"""
+        return [(f'rank.{key}', bytes(self.rank(key))) for key in SORT_KEYS]
+
+    def get(self, comic_id):
+        """單一作品 (每次都是新組成的 dict)；找不到時回傳 None"""
+        pos = self.by_id.get(str(comic_id))
+        return None if pos is None else self.records.visible(pos)
+
+    def search_title(self, term):
+        """標題子字串搜尋：先用 n-gram 交集縮小範圍，再確認真的包含"""
+        term = term.strip().lower()
+        if not term:
+            return set(range(len(self.records)))
+        titles, index = self._title_index()
+        grams = [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+        postings = sorted((index.get(g, set()) for g in set(grams)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {pos for pos in candidates if term in titles[pos]}
+
+    def query(self, status=None, q=None, genre=None, sort=None, order='asc', page=1, limit=DEFAULT_LIMIT):
+        """篩選 + 排序 + 分頁，回傳可直接 jsonify 的 dict"""
+        selected = None
+        for subset in (
+            self.by_status[status] if status else None,
+            self.by_genre.get(genre, set()) if genre else None,
+            self.search_title(q) if q else None,
+        ):
+            if subset is not None:
+                selected = set(subset) if selected is None else selected & subset
+
+        if selected is None:
+            positions = range(len(self.records))
+        elif sort:
+            positions = selected
+        else:
+            positions = sorted(selected)  # 預設維持資料檔原本的順序
+
+        if sort:
+            rank = self.rank(sort)
+            positions = sorted(positions, key=rank.__getitem__, reverse=(order == 'desc'))
+
+        total = len(positions)
+        limit = max(1, min(limit, MAX_LIMIT))
+        page = max(1, page)
+        start = (page - 1) * limit
+        return {
+            "items": [self.records.visible(pos) for pos in positions[start:start + limit]],
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "pages": (total + limit - 1) // limit,
+        }
+
+    def stats(self):
+        """全體統計 (與 Dashboard 的四張篩選卡片對應)"""
+        summary = {"total": len(self.records)}
+        summary.update({status: len(self.by_status[status]) for status in STATUSES})
+        return summary
@@ -0,0 +1,253 @@
+"""單一列表頁的掃描：解析列表 → (增量模式下) 篩選 → 併發抓內頁 → 比對話數
+
+scan_page 是 generator：過程中 yield 進度訊息，最後 return 一個 PageResult。
+同一份邏輯同時給 app.py 的執行緒模式與 sharding 的多程序模式使用；
+列表網址與選擇器來自 targets.CrawlTarget (沒給時就是繁中完結區)。
+"""
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from . import metrics
+from .concurrency import ordered_map
+from .extract import access_note, extract_detail, extract_episode_count
+from .incremental import build_crawl_meta, conditional_headers, list_fingerprint, needs_detail_fetch
+from .targets import default_targets
+
+DEFAULT_TARGET = default_targets()[0]
+
+
+def get_title_no(hyperlink):
+    """從網址解析唯一的 title_no"""
+    match = re.search(r"title_no=(\d+)", hyperlink)
+    if match: return match.group(1)
+    match2 = re.search(r'/list\?title_no=(\d+)', hyperlink)
+    return match2.group(1) if match2 else None
+
+
+def list_page_info(html, item_selector=DEFAULT_TARGET.item_selector):
+    """從列表頁取得總頁數 (div.paginate) 與本頁作品數"""
+    soup = BeautifulSoup(html, "html.parser")
+    max_page = 1
+    for a in soup.select('div.paginate > a'):
+        try:
+            p = int(a.text.strip())
+            if p > max_page: max_page = p
+        except: continue
+    return max_page, len(soup.select(item_selector))
+
+
+def list_page_html(res):
+    """列表頁的 HTML；不是 200 (404、重試用完的 429 / 5xx) 時丟出例外，當作讀取失敗而不是空的列表"""
+    if res.status_code != 200:
+        raise RuntimeError(f"HTTP {res.status_code}")
+    return res.text
+
+
+class PageResult:
+    """一頁的掃描結果：變動的紀錄 (delta) 與統計，交給唯一的寫入端合併存檔"""
+
+    def __init__(self, page):
+        self.page = page
+        self.ok = True           # 列表頁本身讀取失敗時為 False
+        self.entries = 0         # 列表上的作品數
+        self.position = 0        # 掃描完後的下一個列表位置
+        self.last_title = None
+        self.ids = []            # 本頁列表上的 title_no
+        self.dirty = {}          # comic_id -> 需要寫回的完整紀錄 (含只更新爬蟲中繼資料的)
+        self.changes = 0         # 新增 + 更新的作品數，用來判斷是否提前結束
+        self.new = 0
+        self.updated = 0
+        self.skipped = 0
+        self.pictures = []       # 新增 / 更新作品的封面，給封面預載使用
+
+
+def scan_page(page, local_db, fetcher, rate_limiter, concurrency=8, incremental=False, position=0,
+              target=DEFAULT_TARGET, seen=None, recheck=False):
+    """掃描一個列表頁；local_db 是 {id: data}，有變動的紀錄會直接寫回 local_db 並記在 result.dirty
+
+    seen: 本次爬取中其他目標已經處理過的 title_no，同一部作品一次只抓一次內頁
+    recheck: 增量模式下這一頁的作品一律送條件式 GET (見 incremental.needs_detail_fetch)
+    """
+    result = PageResult(page)
+    result.position = position
+    url = target.page_url(page)
+
+    try:
+        rate_limiter.acquire(url)
+        with metrics.stage('list_fetch'):
+            html = list_page_html(fetcher(url))
+        with metrics.stage('parse'):
+            soup = BeautifulSoup(html, "html.parser")
+            comics = soup.select(target.item_selector)
+    except Exception as e:
+        yield f"❌ 讀取頁面失敗: {str(e)}"
+        result.ok = False
+        return result
+
+    def fetch_detail(entry):
+        """抓取內頁 (在 worker 執行緒中執行)，增量模式下帶上條件式 headers"""
+        rate_limiter.acquire(entry['hyperlink'])
+        with metrics.stage('detail_fetch'):
+            res_detail = fetcher(entry['hyperlink'], headers=entry.get('conditional_headers'))
+        res_detail.encoding = "utf-8"
+        return res_detail
+
+    # --- 先整理列表頁資訊 ---
+    entries = []
+    for comic_a in comics:
+        try:
+            hyperlink = comic_a['href']
+            title_no = get_title_no(hyperlink)
+            if not title_no: continue
+            title = comic_a.select_one(target.title_selector).text.strip()
+            genre = comic_a.select_one(target.genre_selector).text.strip()
+            thumb_tag = comic_a.select_one('img')
+            thumbnail = thumb_tag.get('src', '') if thumb_tag else ''
+            entries.append({
+                "comic_id": title_no,
+                "title": title,
+                "genre": genre,
+                "hyperlink": hyperlink,
+                "fingerprint": list_fingerprint(title, genre, thumbnail),
+                "position": result.position,
+                "target": target.name,
+            })
+            result.position += 1
+        except Exception as inner_e:
+            yield f"❌ 解析列表項目時發生錯誤: {str(inner_e)}"
+    result.entries = len(entries)
+    result.ids = [entry['comic_id'] for entry in entries]
+    if entries:
+        result.last_title = entries[-1]['title']
+
+    # --- 增量模式：列表指紋沒變、也還沒過期的作品，連內頁都不抓 ---
+    to_fetch = []
+    with metrics.stage('diff'):
+        for entry in entries:
+            if seen is not None:
+                if entry['comic_id'] in seen:
+                    result.skipped += 1  # 其他目標已經處理過
+                    continue
+                seen.add(entry['comic_id'])
+            old_data = local_db.get(entry['comic_id'])
+            if incremental:
+                if not needs_detail_fetch(old_data, entry, recheck=recheck):
+                    # 記下新的列表位置 (只比較同一個列表)，並和本頁其他變動一起寫回
+                    meta = old_data['crawl_meta']
+                    if meta.get('target') == entry['target'] and meta.get('position') != entry['position']:
+                        meta['position'] = entry['position']
+                        result.dirty[entry['comic_id']] = old_data
+                    result.skipped += 1
+                    continue
+                entry['conditional_headers'] = conditional_headers(old_data)
+            to_fetch.append(entry)
+
+    # --- 內頁併發抓取 (由限速器控制節奏)，但依列表順序回報結果 ---
+    for entry, res_detail, fetch_error in ordered_map(fetch_detail, to_fetch, concurrency):
+        title = entry['title']
+        genre = entry['genre']
+        hyperlink = entry['hyperlink']
+        comic_id = entry['comic_id']
+
+        if fetch_error is not None:
+            yield f"❌ 處理 {title} 時發生錯誤: {str(fetch_error)}"
+            continue
+
+        try:
+            old_data = local_db.get(comic_id)
+            crawl_meta = build_crawl_meta(entry, res_detail)
+
+            # 條件式 GET 回 304：內頁沒變，只更新檢查時間
+            if res_detail.status_code == 304 and old_data:
+                old_data['crawl_meta'] = crawl_meta
+                result.dirty[comic_id] = old_data
+                result.skipped += 1
+                continue
+
+            if res_detail.status_code >= 400:
+                yield f"❌ 處理 {title} 時發生錯誤: HTTP {res_detail.status_code}"
+                continue
+
+            detail_html = res_detail.text
+
+            # --- 關鍵：檢查是否需要更新 ---
+            # 取得目前線上最新話次 (整數)
+            with metrics.stage('parse'):
+                try:
+                    current_episode_count = extract_episode_count(detail_html)
+                except Exception:
+                    current_episode_count = 0
+                access = access_note(detail_html, target.completed)
+            current_episodes_str = f"共 {current_episode_count} 話"
+
+            # 比對邏輯 (訊息先記下來，量完耗時再 yield)
+            diff_started = time.perf_counter()
+            is_new = False
+            is_update = False
+            message = None
+
+            if old_data is None:
+                is_new = True
+                message = f"✅ 發現新漫畫：{title}"
+            else:
+                # 比對話次數量 (使用 .get 避免舊資料沒有該欄位報錯)
+                old_count = old_data.get('episode_count', 0)
+
+                if current_episode_count > old_count:
+                    is_update = True
+                    message = f"🔄 發現更新：{title} ({old_count} -> {current_episode_count})"
+                elif old_data.get('access') != access:
+                    # 連載 → 完結、或開始需要追漫券
+                    is_update = True
+                    message = f"🔄 狀態變更：{title} ({old_data.get('access')} -> {access})"
+                else:
+                    # 資料完全一樣，只記下指紋與驗證碼，下次增量爬取可直接略過
+                    old_data['crawl_meta'] = crawl_meta
+                    result.dirty[comic_id] = old_data
+                    result.skipped += 1
+            metrics.observe_stage('diff', time.perf_counter() - diff_started)
+            if message is None:
+                continue
+            yield message
+
+            # --- 如果是新資料或更新，才完整解析一次 (封面、作者、閱讀權限) ---
+            with metrics.stage('parse'):
+                detail = extract_detail(detail_html, target.completed)
+
+            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+
+            # 建立資料物件
+            doc = {
+                "id": comic_id,
+                "title": title,
+                "genre": genre,
+                "author": detail['author'],
+                "episodes": current_episodes_str,
+                "episode_count": current_episode_count, # 存入數字方便下次比對
+                "access": detail['access'],
+                "picture": detail['picture'],
+                "hyperlink": hyperlink,
+                "last_updated": current_time,
+                "crawl_date": current_time,
+                "crawl_meta": crawl_meta
+            }
+
+            # 如果是更新，保留原本的 crawl_date (初次爬取時間)
+            if is_update and old_data:
+                doc['crawl_date'] = old_data.get('crawl_date', current_time)
+
+            # 寫入記憶體中的字典
+            local_db[comic_id] = doc
+            result.dirty[comic_id] = doc
+            result.changes += 1
+            result.pictures.append(doc['picture'])
+
+            if is_new: result.new += 1
+            if is_update: result.updated += 1
+
+        except Exception as inner_e:
+            yield f"❌ 處理 {title} 時發生錯誤: {str(inner_e)}"
+
+    return result
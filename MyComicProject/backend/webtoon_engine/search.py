@@ -0,0 +1,298 @@
+"""標題 / 作者 / 類型的全文搜尋索引 (/api/search)
+
+- 文字先做 NFKC 正規化並轉小寫 (全形英數字、大小寫都視為相同)
+- 中日韓文字：索引單字與雙字 (bigram)，查詢時用雙字比對；少數雙字對不上 (打錯字) 仍可命中
+- 拉丁字母與數字：以單字為單位，最後輸入的字可以只打前綴，4 個字母以上容許一個錯字
+- 依欄位加權 (標題 > 作者 > 類型)，完全相同或開頭相同的標題再加分，回傳排序後的結果
+- 寫入時逐筆更新 (update / remove)，不必整份重建
+"""
+import bisect
+import heapq
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict, defaultdict
+
+# 欄位代碼與權重
+FIELDS = (('t', 3.0), ('a', 2.0), ('g', 1.0))
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# 查詢的比對單位有 3 個以上時，命中這個比例就算符合 (容許打錯字)
+MIN_MATCH_RATIO = 0.6
+# 前綴 / 錯字展開最多幾個詞，避免一兩個字母的查詢展開成整個詞彙表
+MAX_EXPANSIONS = 50
+FUZZY_MIN_LENGTH = 4
+# 最近查詢結果的快取筆數 (只有一個字的查詢可能命中數萬部作品，重複輸入時直接回傳)；索引有變動就清空
+RESULT_CACHE_SIZE = 256
+
+# 平假名、片假名、中日韓統一表意文字 (含擴充 A)、韓文音節、相容表意文字
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile(f'([{_CJK}]+)|([0-9a-z\u00c0-\u024f]+)')
+
+
+def normalize(text):
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def _terms(text):
+    """正規化後文字的索引詞，回傳 (中日韓的單字 + 雙字, 拉丁字母的單字)"""
+    grams, words = set(), set()
+    for cjk, latin in _TOKEN_RE.findall(text):
+        if cjk:
+            grams.update(cjk)
+            grams.update(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            words.add(latin)
+    return grams, words
+
+
+def _deletes(word):
+    """刪掉一個字母的所有變化 (錯字索引用)"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _contains(postings, docno):
+    pos = bisect.bisect_left(postings, docno)
+    return pos < len(postings) and postings[pos] == docno
+
+
+def _within_one_edit(a, b):
+    """a、b 是否最多差一個字母 (替換、插入、刪除或相鄰交換)"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2]
+                                          and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """可逐筆更新的倒排索引；查詢與更新可以在不同執行緒同時呼叫"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}                # 欄位代碼 + 詞 -> 排序過的文件編號 (array，比 set 省很多記憶體)
+        self._docs = {}                    # 文件編號 -> (id, 標題, 作者, 類型) (都已正規化)
+        self._doc_ids = {}                 # id -> 文件編號
+        self._free = []                    # 刪除後可重複使用的文件編號
+        self._words = defaultdict(int)     # 拉丁單字 -> 出現在幾個 (文件, 欄位)
+        self._vocab = []                   # 排序過的拉丁單字 (前綴查詢用)
+        self._delete_index = defaultdict(set)  # 刪掉一個字母的變化 -> 原本的單字 (錯字查詢用)
+        self._results = OrderedDict()          # (查詢, limit) -> 結果，越後面越近期使用
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    # --- 建立與更新 ---
+
+    def rebuild(self, entries):
+        """整份重建；entries 是 (id, title, author, genre) 的序列"""
+        with self._lock:
+            self._reset()
+            for entry in entries:
+                self._add(*entry)
+
+    def update(self, records):
+        """新增或更新紀錄 (dict)；標題、作者、類型都沒變的紀錄不會動到索引"""
+        with self._lock:
+            for record in records:
+                comic_id = str(record.get('id'))
+                fields = tuple(normalize(record.get(key) if isinstance(record.get(key), str) else '')
+                               for key in ('title', 'author', 'genre'))
+                docno = self._doc_ids.get(comic_id)
+                if docno is not None:
+                    if self._docs[docno][1:] == fields:
+                        continue
+                    self._remove(comic_id)
+                self._add(comic_id, *fields, normalized=True)
+                self._results.clear()
+
+    def remove(self, ids):
+        with self._lock:
+            for comic_id in ids:
+                self._remove(str(comic_id))
+            self._results.clear()
+
+    def _add(self, comic_id, title, author, genre, normalized=False):
+        if not normalized:
+            title, author, genre = normalize(title), normalize(author), normalize(genre)
+        docno = self._free.pop() if self._free else len(self._docs)
+        # 作者與類型大量重複，共用同一個字串物件
+        self._docs[docno] = (comic_id, title, sys.intern(author), sys.intern(genre))
+        self._doc_ids[comic_id] = docno
+        for (field, _), text in zip(FIELDS, (title, author, genre)):
+            grams, words = _terms(text)
+            for term in grams | words:
+                postings = self._postings.get(field + term)
+                if postings is None:
+                    self._postings[field + term] = array('I', [docno])
+                elif postings[-1] < docno:
+                    postings.append(docno)
+                else:
+                    bisect.insort(postings, docno)
+            for word in words:
+                self._add_word(word)
+
+    def _remove(self, comic_id):
+        docno = self._doc_ids.pop(comic_id, None)
+        if docno is None:
+            return
+        _, title, author, genre = self._docs.pop(docno)
+        for (field, _), text in zip(FIELDS, (title, author, genre)):
+            grams, words = _terms(text)
+            for term in grams | words:
+                key = field + term
+                postings = self._postings[key]
+                del postings[bisect.bisect_left(postings, docno)]
+                if not postings:
+                    del self._postings[key]
+            for word in words:
+                self._remove_word(word)
+        self._free.append(docno)
+
+    def _add_word(self, word):
+        self._words[word] += 1
+        if self._words[word] == 1:
+            bisect.insort(self._vocab, word)
+            if len(word) >= FUZZY_MIN_LENGTH - 1:
+                for variant in _deletes(word):
+                    self._delete_index[variant].add(word)
+
+    def _remove_word(self, word):
+        self._words[word] -= 1
+        if self._words[word] > 0:
+            return
+        del self._words[word]
+        pos = bisect.bisect_left(self._vocab, word)
+        if pos < len(self._vocab) and self._vocab[pos] == word:
+            del self._vocab[pos]
+        if len(word) >= FUZZY_MIN_LENGTH - 1:
+            for variant in _deletes(word):
+                words = self._delete_index.get(variant)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._delete_index[variant]
+
+    # --- 查詢 ---
+
+    def _prefixed(self, word):
+        """以 word 開頭的單字 (不含 word 本身)"""
+        start = bisect.bisect_right(self._vocab, word)
+        found = []
+        for candidate in self._vocab[start:start + MAX_EXPANSIONS]:
+            if not candidate.startswith(word):
+                break
+            found.append(candidate)
+        return found
+
+    def _fuzzy(self, word):
+        """與 word 差一個字母的單字"""
+        candidates = set(self._delete_index.get(word, ()))
+        for variant in _deletes(word):
+            candidates.update(self._delete_index.get(variant, ()))
+            if variant in self._words:
+                candidates.add(variant)
+        candidates.discard(word)
+        return [c for c in sorted(candidates) if _within_one_edit(word, c)][:MAX_EXPANSIONS]
+
+    def _units(self, text):
+        """查詢拆成比對單位，每個單位是 [(詞, 權重)]，命中其中任何一個就算命中這個單位"""
+        units = []
+        for cjk, latin in _TOKEN_RE.findall(text):
+            if cjk:
+                grams = [cjk] if len(cjk) == 1 else [cjk[i:i + 2] for i in range(len(cjk) - 1)]
+                units.extend([(gram, 1.0)] for gram in dict.fromkeys(grams))
+            else:
+                alternatives = [(latin, 1.0)]
+                alternatives += [(word, 0.8) for word in self._prefixed(latin)]
+                if len(latin) >= FUZZY_MIN_LENGTH:
+                    alternatives += [(word, 0.5) for word in self._fuzzy(latin)]
+                units.append(alternatives)
+        return units
+
+    def search(self, q, limit=DEFAULT_LIMIT):
+        """回傳 (符合的總數, [(id, 分數)])，分數高的在前"""
+        text = normalize(q).strip()
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            key = (text, limit)
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+            result = self._results[key] = self._search(text, limit)
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+            return result
+
+    def _search(self, text, limit):
+        """search() 的本體 (呼叫端需持有 _lock)"""
+        # 每個單位展開成 [(文件編號清單, 分數)]，依命中的文件數由少到多排列
+        units = []
+        for alternatives in self._units(text):
+            lists = []
+            for term, weight in alternatives:
+                for field, field_weight in FIELDS:
+                    postings = self._postings.get(field + term)
+                    if postings:
+                        lists.append((postings, weight * field_weight))
+            units.append(lists)
+        if not units:
+            return 0, []
+        units.sort(key=lambda lists: sum(len(postings) for postings, _ in lists))
+        need = len(units) if len(units) <= 2 else int(len(units) * MIN_MATCH_RATIO + 0.999)
+
+        # 至少命中 need 個單位的文件，一定出現在最少的 (單位數 - need + 1) 個單位之一：
+        # 只展開這幾個單位的清單，其餘單位只對候選文件做二分搜尋
+        seeds = len(units) - need + 1
+        scores = defaultdict(float)
+        hits = defaultdict(int)
+        for lists in units[:seeds]:
+            # 分數低的先寫入、高的後寫入覆蓋，得到每份文件在這個單位的最高分
+            best = {}
+            for postings, score in sorted(lists, key=lambda item: item[1]):
+                best.update(dict.fromkeys(postings, score))
+            if not scores:
+                scores.update(best)
+                hits.update(dict.fromkeys(best, 1))
+                continue
+            for docno, score in best.items():
+                scores[docno] += score
+                hits[docno] += 1
+        for lists in units[seeds:]:
+            for docno in scores:
+                best = max((score for postings, score in lists if _contains(postings, docno)), default=0)
+                if best:
+                    scores[docno] += best
+                    hits[docno] += 1
+
+        phrase = ' '.join(text.split())
+        matched = []
+        for docno, score in scores.items():
+            if hits[docno] < need:
+                continue
+            comic_id, title, author, _ = self._docs[docno]
+            # 整段查詢出現在標題 / 作者中的再加分 (越前面越高)
+            if title == phrase:
+                score += 6
+            elif title.startswith(phrase):
+                score += 4
+            elif phrase in title:
+                score += 2
+            if author == phrase:
+                score += 3
+            matched.append((score, -len(title), -docno, comic_id))
+        top = heapq.nlargest(limit, matched)
+        return len(matched), [(comic_id, round(score, 3)) for score, _, _, comic_id in top]
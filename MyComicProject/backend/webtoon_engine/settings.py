@@ -0,0 +1,83 @@
+"""所有入口 (Flask 後端、本地版、命令列) 共用的設定，全部可用環境變數調整
+
+預設的資料檔都放在 MyComicProject/backend 目錄下 (與 app.py 同一層)。
+"""
+import os
+
+from .storage import default_path
+
+# ==========================================
+# 🔴 核心修正：使用絕對路徑，確保一定找得到檔案
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join(BASE_DIR, 'comics_data.json')
+
+# --- 儲存後端 ---
+# STORAGE_BACKEND: json (預設，沿用 comics_data.json) / sqlite / jsonl
+# STORAGE_PATH: 後端資料檔路徑；sqlite / jsonl 第一次啟動時會自動從 comics_data.json 匯入
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+STORAGE_PATH = os.environ.get('STORAGE_PATH') or (
+    DATA_FILE if STORAGE_BACKEND == 'json' else default_path(STORAGE_BACKEND, BASE_DIR))
+
+# CHANGE_LOG_FILE: 變更紀錄 (每次寫入追加遞增序號)，提供 /api/comics/changes 增量同步與話數歷史
+CHANGE_LOG_FILE = os.environ.get('CHANGE_LOG_FILE', os.path.join(BASE_DIR, 'comics_changes.jsonl'))
+# CHANGE_LOG_WINDOW: 可以增量同步的最近變動筆數 (更舊的 since 會收到完整清單)；紀錄檔也依此定期壓縮
+CHANGE_LOG_WINDOW = int(os.environ.get('CHANGE_LOG_WINDOW', 10000))
+# CATALOGUE_SNAPSHOT: 欄位式清單的快照檔 (資料沒變時直接 mmap 載入，啟動較快)；設為空字串則不使用
+# 每次爬蟲結束 (或執行 python -m webtoon_engine warm) 時會連同完整回應與排序索引寫成暖快照
+CATALOGUE_SNAPSHOT = os.environ.get('CATALOGUE_SNAPSHOT', os.path.join(BASE_DIR, 'comics_snapshot.bin'))
+
+# --- 圖片代理快取設定 ---
+# IMAGE_CACHE_DIR: 圖片快取目錄；IMAGE_CACHE_MAX_MB: 容量上限，超過時淘汰最久沒用到的圖
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(BASE_DIR, '.image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(float(os.environ.get('IMAGE_CACHE_MAX_MB', 512)) * 1024 * 1024)
+
+# --- 爬蟲併發設定 ---
+# CRAWL_CONCURRENCY: 同時抓取內頁的 worker 數量 (1 = 逐一抓取)
+# CRAWL_RATE_LIMIT: 每個主機每秒最多幾個請求 (0 = 不限速)
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 8))
+CRAWL_RATE_LIMIT = float(os.environ.get('CRAWL_RATE_LIMIT', 8))
+# CRAWL_PROCESSES: 多程序分頁掃描的程序數 (1 = 不開程序，只用執行緒)；限速仍以 CRAWL_RATE_LIMIT 為全域上限
+CRAWL_PROCESSES = int(os.environ.get('CRAWL_PROCESSES', 1))
+# CRAWL_INCREMENTAL: 預設是否使用增量模式 (也可用 ?incremental=1 或 --incremental 指定)
+CRAWL_INCREMENTAL = os.environ.get('CRAWL_INCREMENTAL', '0') == '1'
+# CRAWL_PAGES: 每個目標最多掃描幾頁列表 (0 = 全部)
+CRAWL_PAGES = int(os.environ.get('CRAWL_PAGES', 0))
+# CRAWL_PREFETCH: 新增/更新作品後是否在背景預載封面；PREFETCH_CONCURRENCY: 預載同時下載數
+CRAWL_PREFETCH = os.environ.get('CRAWL_PREFETCH', '1') == '1'
+PREFETCH_CONCURRENCY = int(os.environ.get('PREFETCH_CONCURRENCY', 4))
+# CRAWL_CHECKPOINT_FILE: 爬蟲進度檢查點 (中斷後從下一頁繼續)；CRAWL_LOCK_FILE: 跨程序的單一執行鎖
+CRAWL_CHECKPOINT_FILE = os.environ.get('CRAWL_CHECKPOINT_FILE', os.path.join(BASE_DIR, 'crawl_checkpoint.json'))
+CRAWL_LOCK_FILE = os.environ.get('CRAWL_LOCK_FILE', os.path.join(BASE_DIR, '.crawl.lock'))
+# CRAWL_FLUSH_SECONDS: JSON 後端每次存檔都要整份重寫，爬蟲時累積多頁、最多每 N 秒寫一次 (0 = 每頁都寫)
+CRAWL_FLUSH_SECONDS = float(os.environ.get('CRAWL_FLUSH_SECONDS', 30))
+
+# --- 爬取目標與排程 ---
+# CRAWL_TARGETS_FILE: 自訂爬取目標 (JSON)；CRAWL_SCHEDULE_FILE: 各目標上次爬完的時間
+# CRAWL_TARGETS: 手動爬取 (/start-crawl、命令列) 預設爬哪些目標 (all = 所有開啟的目標 / due = 只爬到期的 / 逗號分隔的名稱)
+#                自動排程 (CRAWL_SCHEDULE_EVERY) 一律只爬到期的目標
+# CRAWL_SCHEDULE_EVERY: 每隔幾秒檢查一次是否有到期的目標並自動開始爬取 (0 = 不自動爬)
+CRAWL_TARGETS_FILE = os.environ.get('CRAWL_TARGETS_FILE', os.path.join(BASE_DIR, 'crawl_targets.json'))
+CRAWL_SCHEDULE_FILE = os.environ.get('CRAWL_SCHEDULE_FILE', os.path.join(BASE_DIR, 'crawl_schedule.json'))
+CRAWL_TARGETS = os.environ.get('CRAWL_TARGETS', 'all')
+CRAWL_SCHEDULE_EVERY = float(os.environ.get('CRAWL_SCHEDULE_EVERY', 0))
+
+# --- 效能剖析 ---
+# CRAWL_PROFILE: 預設是否剖析每次爬蟲 (也可用 ?profile=1 只剖析這一次)；報告存在 CRAWL_PROFILE_DIR
+# CRAWL_PROFILER: cprofile (預設) / pyinstrument
+CRAWL_PROFILE = os.environ.get('CRAWL_PROFILE', '0') == '1'
+CRAWL_PROFILE_DIR = os.environ.get('CRAWL_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+
+def default_crawl_params():
+    """爬蟲參數的預設值 (每次爬取可再個別覆寫)"""
+    return {
+        "concurrency": CRAWL_CONCURRENCY,
+        "incremental": CRAWL_INCREMENTAL,
+        "processes": CRAWL_PROCESSES,
+        "rate": CRAWL_RATE_LIMIT,
+        "pages": CRAWL_PAGES,
+        "prefetch": CRAWL_PREFETCH,
+        "targets": CRAWL_TARGETS,
+        "profile": CRAWL_PROFILE,
+    }
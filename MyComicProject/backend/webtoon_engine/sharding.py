@@ -0,0 +1,134 @@
+"""多程序分頁掃描：把列表頁分給多個 process，各自抓取 / 解析後回傳變動紀錄
+
+解析 HTML 是吃 CPU 的工作，執行緒會被 GIL 卡住；改用 process pool 才能用滿多核心。
+- 每個 worker 只回傳 PageResult (delta)，由呼叫端 (唯一的寫入端) 依頁序合併存檔
+- 全域限速 rate 平均分給每個 worker，總請求速率不會超過設定值
+- worker 的量測數據 (metrics) 隨每頁結果一起送回，合併進主程序的 /metrics
+- worker 只拿到比對需要的精簡欄位 (COMPACT_FIELDS)，不會把整份資料庫複製進每個程序
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from . import metrics
+from .concurrency import HostRateLimiter
+from .scan import DEFAULT_TARGET, PageResult, scan_page
+
+# CRAWL_MP_START: 建立 worker 的方式；預設 spawn (父程序有很多執行緒，fork 容易卡在鎖上)
+MP_START_METHOD = os.environ.get('CRAWL_MP_START', 'spawn')
+
+# scan_page 比對舊資料時會讀到的欄位 (新增 / 更新的作品由 worker 產生完整紀錄)
+COMPACT_FIELDS = ('id', 'crawl_meta', 'episode_count', 'access', 'crawl_date')
+
+# --- worker 程序內的狀態 (由 _init_worker 設定) ---
+_worker = {}
+
+
+def _init_worker(local_db, fetcher, rate, concurrency, incremental, target, seen, recheck_until):
+    _worker.update(
+        local_db=local_db,
+        fetcher=fetcher,
+        rate_limiter=HostRateLimiter(rate),
+        concurrency=concurrency,
+        incremental=incremental,
+        target=target,
+        seen=set(seen),
+        recheck_until=recheck_until,
+    )
+
+
+def _scan_in_worker(page, position, seen_since_start=()):
+    """在 worker 中掃描一頁，回傳 (訊息列表, PageResult, 本頁的量測數據)
+
+    seen_since_start: 開工後其他頁面已處理過的 title_no (由主程序在派工時帶入)
+    """
+    _worker['seen'].update(seen_since_start)
+    messages = []
+    gen = scan_page(page, _worker['local_db'], _worker['fetcher'], _worker['rate_limiter'],
+                    _worker['concurrency'], _worker['incremental'], position,
+                    _worker['target'], _worker['seen'], page <= _worker['recheck_until'])
+    while True:
+        try:
+            messages.append(next(gen))
+        except StopIteration as stop:
+            return messages, stop.value, metrics.REGISTRY.drain()
+
+
+def compact_view(local_db):
+    """只保留 COMPACT_FIELDS 的精簡資料庫，送進 worker 用"""
+    return {comic_id: {key: data[key] for key in COMPACT_FIELDS if key in data}
+            for comic_id, data in local_db.items()}
+
+
+def merge_dirty(local_db, dirty):
+    """把 worker 回傳的變動還原成完整紀錄：精簡紀錄 (只更新了爬蟲中繼資料) 補回 local_db 裡的其他欄位"""
+    merged = {}
+    for comic_id, data in dirty.items():
+        if comic_id in local_db and data.keys() <= set(COMPACT_FIELDS):
+            data = {**local_db[comic_id], **data}
+        merged[comic_id] = data
+    return merged
+
+
+def scan_pages_sharded(pages, local_db, fetcher, processes, rate, concurrency=8,
+                       incremental=False, page_size=0, target=DEFAULT_TARGET, seen=None, recheck_until=0):
+    """以 processes 個程序掃描 pages，依頁序產出 (訊息列表, PageResult)
+
+    seen: 本次爬取已處理過的 title_no (set)；各頁的 title_no 會加進去，並在之後派工時帶給 worker
+    recheck_until: 增量模式下第幾頁 (含) 以前的作品一律送條件式 GET
+
+    fetcher 必須是可以 pickle 的模組層級函式 (例如 http_client.fetch)。
+    各頁的列表位置以 (page - 1) * page_size 推算 (每頁作品數固定，只有最後一頁較少)。
+    worker 失敗 (例外、程序池損壞) 的頁面回傳 ok=False 的 PageResult，不會中斷整個爬蟲。
+    呼叫端提前關閉 generator (取消、提前結束) 時，還沒開始的頁面會被取消。
+    """
+    processes = max(1, processes)
+    seen = set() if seen is None else seen
+    seen_since_start = []
+    pool = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context(MP_START_METHOD),
+        initializer=_init_worker,
+        initargs=(compact_view(local_db), fetcher, rate / processes if rate > 0 else 0, concurrency,
+                  incremental, target, frozenset(seen), recheck_until),
+    )
+
+    def submit(page):
+        try:
+            future = pool.submit(_scan_in_worker, page, (page - 1) * page_size, tuple(seen_since_start))
+        except Exception as e:  # 程序池已損壞 (BrokenProcessPool) 時連送出都會失敗
+            future = Future()
+            future.set_exception(e)
+        return page, future
+
+    pending = deque()
+    pages = iter(pages)
+    try:
+        # 最多同時排 processes * 2 頁，提前結束時不會白抓太多頁
+        for page in pages:
+            pending.append(submit(page))
+            if len(pending) >= processes * 2:
+                break
+        while pending:
+            page, future = pending.popleft()
+            try:
+                messages, result, samples = future.result()
+            except Exception as e:
+                result = PageResult(page)
+                result.ok = False
+                messages = [f"❌ 第 {page} 頁掃描失敗: {e!r}"]
+            else:
+                metrics.REGISTRY.merge(samples)
+                result.dirty = merge_dirty(local_db, result.dirty)
+                new_ids = [comic_id for comic_id in result.ids if comic_id not in seen]
+                seen.update(new_ids)
+                seen_since_start.extend(new_ids)
+            yield messages, result
+            for page in pages:
+                pending.append(submit(page))
+                break
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
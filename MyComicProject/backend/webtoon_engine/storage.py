@@ -0,0 +1,366 @@
+"""資料儲存後端：load_local_data / save_local_data 背後的實作
+
+- JsonFileStorage：舊格式 comics_data.json，每次存檔整份重寫 (原子性寫入)
+- SqliteStorage：SQLite (WAL 模式)，逐筆 upsert，id / status / genre / episode_count 有索引
+- JsonlLogStorage：只追加的 JSONL 變更紀錄，重複紀錄過多時自動壓縮
+
+三者都提供 change_token()，讓清單快取用很低的成本判斷資料是否被 (其他程序) 改過。
+
+命令列 (在 backend 目錄下)：
+    python -m webtoon_engine.storage import comics_data.json --backend sqlite
+    python -m webtoon_engine.storage export comics_data.json --backend sqlite
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from .query import comic_status
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，只能靠單一寫入者
+    fcntl = None
+
+
+def _atomic_write_json(path, records):
+    """先寫暫存檔再 os.replace，讀取端不會看到寫一半的檔案"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.comics_', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(list(records), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _stat_token(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class Storage:
+    """儲存後端的共同介面"""
+
+    # 每次寫入都要整份重寫的後端：爬蟲時由 Catalogue.batch() 累積多頁再一起寫
+    rewrites_all = False
+
+    def load_all(self):
+        """依原本順序回傳所有紀錄 (list of dict)"""
+        raise NotImplementedError
+
+    def upsert_many(self, records):
+        """在同一個交易中新增或更新多筆紀錄 (以 id 為鍵)"""
+        raise NotImplementedError
+
+    def delete_many(self, ids):
+        """刪除多筆紀錄 (不存在的 id 直接略過)"""
+        raise NotImplementedError
+
+    def change_token(self):
+        """資料有任何變動時就會改變的值 (供快取判斷是否重新載入)"""
+        raise NotImplementedError
+
+    def is_empty(self):
+        """是否還沒有任何紀錄 (子類別可改成不必讀出整份資料的檢查)"""
+        return not self.load_all()
+
+    def import_json(self, path):
+        """從舊版 comics_data.json 匯入"""
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        records = json.loads(content) if content else []
+        self.upsert_many(records)
+        return len(records)
+
+    def export_json(self, path):
+        """匯出成舊版 comics_data.json 格式"""
+        records = self.load_all()
+        _atomic_write_json(path, records)
+        return len(records)
+
+
+class JsonFileStorage(Storage):
+    """舊格式：整份清單存在一個 JSON 檔"""
+
+    rewrites_all = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        if not os.path.exists(self.path):
+            print(f"❌ 找不到資料檔於 {self.path}")
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        return json.loads(content) if content else []
+
+    def upsert_many(self, records):
+        with self._lock:
+            by_id = {item['id']: item for item in (self.load_all() if os.path.exists(self.path) else [])}
+            for record in records:
+                by_id[record['id']] = record
+            _atomic_write_json(self.path, by_id.values())
+
+    def delete_many(self, ids):
+        ids = {str(comic_id) for comic_id in ids}
+        with self._lock:
+            records = self.load_all() if os.path.exists(self.path) else []
+            _atomic_write_json(self.path, [r for r in records if str(r['id']) not in ids])
+
+    def change_token(self):
+        return _stat_token(self.path)
+
+
+class SqliteStorage(Storage):
+    """SQLite 後端：每筆紀錄一列，完整內容存成 JSON，常用欄位另外建索引"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS comics (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            genre TEXT,
+            episode_count INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_comics_status ON comics(status);
+        CREATE INDEX IF NOT EXISTS idx_comics_genre ON comics(genre);
+        CREATE INDEX IF NOT EXISTS idx_comics_episode_count ON comics(episode_count);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()  # sqlite3 連線不能跨執行緒共用，每個執行緒各開一條
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')     # 讀寫互不阻塞，適合多個 gunicorn worker
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load_all(self):
+        rows = self._connect().execute('SELECT data FROM comics ORDER BY rowid')
+        return [json.loads(data) for (data,) in rows]
+
+    def upsert_many(self, records):
+        rows = [
+            (str(r['id']), comic_status(r), r.get('genre'), r.get('episode_count') or 0,
+             json.dumps(r, ensure_ascii=False, separators=(',', ':')))
+            for r in records
+        ]
+        if not rows:
+            return
+        conn = self._connect()
+        with conn:  # 同一個交易：全部成功或全部不寫
+            conn.executemany(
+                """INSERT INTO comics (id, status, genre, episode_count, data) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET status = excluded.status, genre = excluded.genre,
+                       episode_count = excluded.episode_count, data = excluded.data""",
+                rows,
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def delete_many(self, ids):
+        conn = self._connect()
+        with conn:
+            conn.executemany('DELETE FROM comics WHERE id = ?', [(str(comic_id),) for comic_id in ids])
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def change_token(self):
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM comics').fetchone()[0]
+
+    def is_empty(self):
+        return self._connect().execute('SELECT 1 FROM comics LIMIT 1').fetchone() is None
+
+
+class JsonlLogStorage(Storage):
+    """只追加的變更紀錄：每行一筆完整紀錄，同一個 id 以最後一行為準 (刪除時追加 {"id", "_deleted": true})"""
+
+    # 總行數超過「有效紀錄數 x COMPACT_RATIO」(且至少 COMPACT_MIN_LINES 行) 時壓縮
+    COMPACT_RATIO = 2.0
+    COMPACT_MIN_LINES = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._lines = None  # 目前檔案行數 (估計值，其他程序也可能追加)
+        self._ids = set()   # 有效紀錄的 id (與 _lines 同時載入)
+
+    def _file_lock(self):
+        return _FileLock(self.path + '.lock')
+
+    def _replay(self):
+        by_id = {}
+        lines = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 寫到一半就當機的最後一行，直接忽略
+                    lines += 1
+                    if record.get('_deleted'):
+                        by_id.pop(record['id'], None)
+                    else:
+                        by_id[record['id']] = record  # 覆寫時保留第一次出現的順序
+        return by_id, lines
+
+    def load_all(self):
+        by_id, lines = self._replay()
+        with self._lock:
+            self._lines, self._ids = lines, set(by_id)
+        return list(by_id.values())
+
+    def upsert_many(self, records):
+        self._append(list(records))
+
+    def delete_many(self, ids):
+        self._append([{"id": str(comic_id), "_deleted": True} for comic_id in ids])
+
+    def _append(self, records):
+        payload = ''.join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n' for r in records)
+        if not payload:
+            return
+        with self._lock, self._file_lock():
+            # 上次寫到一半當機留下的殘行要先換行，避免和新紀錄黏在一起
+            if self._ends_with_partial_line():
+                payload = '\n' + payload
+            # 一次 write 寫完整批，並 fsync 確保當機後不會遺失
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._lines is None:
+                by_id, self._lines = self._replay()
+                self._ids = set(by_id)
+            else:
+                self._lines += len(records)
+                for record in records:
+                    if record.get('_deleted'):
+                        self._ids.discard(record['id'])
+                    else:
+                        self._ids.add(record['id'])
+            if self._lines > max(self.COMPACT_MIN_LINES, len(self._ids) * self.COMPACT_RATIO):
+                self._compact()
+
+    def _ends_with_partial_line(self):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except OSError:
+            return False  # 檔案不存在或是空的
+
+    def _compact(self):
+        """把每個 id 只留最後一筆，原子性地換掉舊的紀錄檔 (呼叫端需持有鎖)"""
+        by_id, _ = self._replay()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.comics_log_', suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for record in by_id.values():
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._lines, self._ids = len(by_id), set(by_id)
+
+    def compact(self):
+        with self._lock, self._file_lock():
+            self._compact()
+
+    def change_token(self):
+        return _stat_token(self.path)
+
+    def is_empty(self):
+        # 只看檔案有沒有內容：寫入過 (即使之後全部刪除) 就不再視為空的，也不會被重新匯入
+        try:
+            return os.path.getsize(self.path) == 0
+        except OSError:
+            return True
+
+
+class _FileLock:
+    """跨程序的寫入鎖 (fcntl.flock)；沒有 fcntl 的平台則不鎖"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = open(self.path, 'a')
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+BACKENDS = {
+    'json': JsonFileStorage,
+    'sqlite': SqliteStorage,
+    'jsonl': JsonlLogStorage,
+}
+
+
+def default_path(backend, directory):
+    names = {'json': 'comics_data.json', 'sqlite': 'comics_data.db', 'jsonl': 'comics_log.jsonl'}
+    return os.path.join(directory, names[backend])
+
+
+def open_storage(backend, path, legacy_json=None):
+    """建立儲存後端；新的 sqlite / jsonl 後端是空的時，自動從舊版 JSON 匯入"""
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的儲存後端: {backend} (可用: {', '.join(BACKENDS)})")
+    storage = BACKENDS[backend](path)
+    if backend != 'json' and legacy_json and os.path.exists(legacy_json) and storage.is_empty():
+        count = storage.import_json(legacy_json)
+        print(f"📥 已從 {legacy_json} 匯入 {count} 筆資料到 {backend} 後端")
+    return storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匯入 / 匯出漫畫資料")
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('json_path', help="舊版 comics_data.json 的路徑")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='sqlite')
+    parser.add_argument('--path', help="後端資料檔路徑 (預設 comics_data.db / comics_log.jsonl)")
+    args = parser.parse_args()
+
+    path = args.path or default_path(args.backend, os.path.dirname(os.path.abspath(args.json_path)))
+    storage = BACKENDS[args.backend](path)
+    if args.action == 'import':
+        print(f"📥 匯入 {storage.import_json(args.json_path)} 筆資料到 {path}")
+    else:
+        print(f"📤 匯出 {storage.export_json(args.json_path)} 筆資料到 {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""宣告式的爬取目標 (完結區、各星期的連載、挑戰者、其他語系) 與排程
+
+每個目標有自己的列表網址、刷新間隔與優先順序；排程器只挑出到期的目標，
+連載作品在「更新日」會用較短的間隔刷新，穩定的完結區則一天一次就好。
+所有目標爬到的作品都以 title_no 合併進同一份清單。
+
+目標可以寫在 JSON 檔 (CRAWL_TARGETS_FILE) 中覆寫預設值，例如：
+    [{"name": "en-completed", "url": "https://www.webtoons.com/en/originals/complete?sortOrder=UPDATE&page={page}",
+      "locale": "en", "interval": 86400, "enabled": true}]
+"""
+import json
+import os
+import tempfile
+import time
+
+WEEKDAYS = ('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY')
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class CrawlTarget:
+    """一個列表來源；url 中的 {page} 會換成頁碼 (沒有 {page} 的就是單頁列表)"""
+
+    def __init__(self, name, url, locale='zh-hant', completed=True, interval=DAY,
+                 hot_interval=None, weekday=None, priority=0, sorted_by_update=False,
+                 item_selector='a.link._originals_title_a', title_selector='.title',
+                 genre_selector='.genre', enabled=True):
+        self.name = name
+        self.url = url
+        self.locale = locale
+        self.completed = completed              # 決定紀錄的 access 文字 (已完結 / 連載中)
+        self.interval = interval                # 平常的刷新間隔 (秒)
+        self.hot_interval = hot_interval        # 更新日 (weekday) 當天的刷新間隔
+        self.weekday = weekday                  # 連載的更新日，例如 'MONDAY'
+        self.priority = priority                # 同時到期時，數字大的先爬
+        self.sorted_by_update = sorted_by_update  # 列表依更新時間排序時，增量模式才能提前結束
+        self.item_selector = item_selector
+        self.title_selector = title_selector
+        self.genre_selector = genre_selector
+        self.enabled = enabled
+
+    @property
+    def recheck_all(self):
+        """連載中、又不依更新時間排序的列表：新的一話不會改變列表指紋或位置，
+        增量模式下每部作品都要送條件式 GET 確認 (沒更新的回 304)"""
+        return not self.completed and not self.sorted_by_update
+
+    @property
+    def paged(self):
+        return '{page}' in self.url
+
+    def page_url(self, page=1):
+        return self.url.format(page=page)
+
+    def is_hot(self, now=None):
+        """今天是不是這個目標的更新日"""
+        if not self.weekday:
+            return False
+        now = time.time() if now is None else now
+        return WEEKDAYS[time.localtime(now).tm_wday] == self.weekday
+
+    def interval_at(self, now=None):
+        if self.hot_interval and self.is_hot(now):
+            return self.hot_interval
+        return self.interval
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def default_targets():
+    """內建目標：繁中完結區 + 每個星期的連載、挑戰者與英文版
+
+    只有完結區預設開啟；其他目標的網址與選擇器還沒有對照線上網站確認過，
+    要用時在 CRAWL_TARGETS_FILE 中設定 "enabled": true。
+    """
+    targets = [
+        CrawlTarget('zh-hant-completed',
+                    'https://www.webtoons.com/zh-hant/originals/complete?sortOrder=UPDATE&page={page}',
+                    interval=DAY, priority=0, sorted_by_update=True),
+    ]
+    for weekday in WEEKDAYS:
+        targets.append(CrawlTarget(
+            f'zh-hant-ongoing-{weekday.lower()}',
+            f'https://www.webtoons.com/zh-hant/originals/{weekday.lower()}',
+            completed=False, weekday=weekday, interval=DAY, hot_interval=HOUR, priority=5, enabled=False))
+    targets.append(CrawlTarget(
+        'zh-hant-canvas',
+        'https://www.webtoons.com/zh-hant/canvas/list?genreTab=ALL&sortOrder=UPDATE&page={page}',
+        completed=False, interval=3 * DAY, priority=-5, sorted_by_update=True, enabled=False))
+    targets.append(CrawlTarget(
+        'en-completed',
+        'https://www.webtoons.com/en/originals/complete?sortOrder=UPDATE&page={page}',
+        locale='en', interval=DAY, priority=-1, sorted_by_update=True, enabled=False))
+    return targets
+
+
+def load_targets(path=None):
+    """讀取目標設定；JSON 檔中同名的目標會覆寫預設值，新名稱則新增目標"""
+    targets = {target.name: target for target in default_targets()}
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for spec in json.load(f):
+                base = targets[spec['name']].to_dict() if spec['name'] in targets else {}
+                base.update(spec)
+                targets[spec['name']] = CrawlTarget(**base)
+    return [target for target in targets.values() if target.enabled]
+
+
+class TargetScheduler:
+    """記錄每個目標上次爬完的時間，挑出到期的目標 (依優先順序)"""
+
+    def __init__(self, targets, state_path):
+        self.targets = list(targets)
+        self.state_path = state_path
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def next_run(self, target, state=None, now=None):
+        state = self._load_state() if state is None else state
+        last = state.get(target.name, {}).get('last_run', 0)
+        return last + target.interval_at(now)
+
+    def due(self, now=None):
+        """到期的目標，優先順序高的在前"""
+        now = time.time() if now is None else now
+        state = self._load_state()
+        due = [t for t in self.targets if self.next_run(t, state, now) <= now]
+        return sorted(due, key=lambda t: -t.priority)
+
+    def select(self, names):
+        """依名稱挑選目標 ('all' = 全部)"""
+        if names == 'all':
+            return sorted(self.targets, key=lambda t: -t.priority)
+        wanted = [name.strip() for name in names.split(',') if name.strip()]
+        by_name = {t.name: t for t in self.targets}
+        return [by_name[name] for name in wanted if name in by_name]
+
+    def mark_done(self, target, now=None):
+        state = self._load_state()
+        state[target.name] = {'last_run': time.time() if now is None else now}
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.schedule_', suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def status(self, now=None):
+        now = time.time() if now is None else now
+        state = self._load_state()
+        return [{
+            "name": t.name,
+            "locale": t.locale,
+            "completed": t.completed,
+            "priority": t.priority,
+            "hot": t.is_hot(now),
+            "interval": t.interval_at(now),
+            "last_run": state.get(t.name, {}).get('last_run'),
+            "next_run": self.next_run(t, state, now),
+        } for t in self.targets]
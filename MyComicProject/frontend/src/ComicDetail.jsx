@@ -17,9 +17,9 @@ const ComicDetail = () => {
   useEffect(() => {
     const fetchComic = async () => {
       try {
-        // ✅ 已修改：使用雲端網址
-        const res = await axios.get(`${BACKEND_URL}/api/comics`);
-        const foundComic = res.data.find(c => String(c.id) === String(id));
+        // ✅ 已修改：使用雲端網址，只抓這一部漫畫
+        const res = await axios.get(`${BACKEND_URL}/api/comics/${encodeURIComponent(id)}`);
+        const foundComic = res.data;
         setTimeout(() => {
           setComic(foundComic);
           setLoading(false);
@@ -5,13 +5,14 @@ import { Search, BookOpen, Gift, Lock, CheckCircle, Zap, LayoutGrid, Sparkles, T
 
 const Dashboard = () => {
   // 資料與篩選狀態
+  // comics 只存放目前這一頁 (篩選、搜尋、分頁都交給後端處理)
   const [comics, setComics] = useState([]);
-  const [filteredComics, setFilteredComics] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterType, setFilterType] = useState('all');
    
   // --- 分頁狀態 ---
   const [currentPage, setCurrentPage] = useState(1);
+  const [totalPages, setTotalPages] = useState(0);
   const itemsPerPage = 20; 
 
   // 統計數據
@@ -30,13 +31,19 @@ const Dashboard = () => {
   const BACKEND_URL = "https://你的後端網址.onrender.com"; 
 
   useEffect(() => {
-    fetchComics();
+    fetchStats();
   }, [BACKEND_URL]);
 
+  // 篩選條件改變時回到第一頁
   useEffect(() => {
-    applyFilters();
     setCurrentPage(1);
-  }, [comics, searchTerm, filterType]);
+  }, [searchTerm, filterType]);
+
+  useEffect(() => {
+    // 稍微延遲再查詢，避免搜尋框每打一個字就打一次 API
+    const timer = setTimeout(fetchComics, 250);
+    return () => clearTimeout(timer);
+  }, [BACKEND_URL, currentPage, searchTerm, filterType]);
 
   // === 核心判斷邏輯 ===
   const getComicStatus = (comic) => {
@@ -48,51 +55,45 @@ const Dashboard = () => {
 
   const fetchComics = async () => {
     try {
-      // ✅ 已修改：使用雲端網址
-      const res = await axios.get(`${BACKEND_URL}/api/comics`);
+      // ✅ 已修改：使用雲端網址，只向後端要目前這一頁
+      const params = { page: currentPage, limit: itemsPerPage };
+      if (searchTerm) params.q = searchTerm;
+      if (filterType !== 'all') params.status = filterType;
+
+      const res = await axios.get(`${BACKEND_URL}/api/comics`, { params });
       const data = res.data;
-      setComics(data);
-      
-      let s_ongoing = 0, s_free_comp = 0, s_paid = 0;
-      data.forEach(c => {
-        const status = getComicStatus(c);
-        if (status === 'free_ongoing') s_ongoing++;
-        if (status === 'free_completed') s_free_comp++;
-        if (status === 'paid') s_paid++;
-      });
-      
-      setStats({
-        total: data.length,
-        freeOngoing: s_ongoing,
-        freeCompleted: s_free_comp,
-        paid: s_paid
-      });
-      
+      setComics(data.items);
+      setTotalPages(data.pages);
     } catch (error) {
       console.error("無法連線到後端:", error);
     }
   };
 
-  const applyFilters = () => {
-    let result = comics;
-    if (searchTerm) result = result.filter(c => c.title.toLowerCase().includes(searchTerm.toLowerCase()));
-    if (filterType !== 'all') result = result.filter(c => getComicStatus(c) === filterType);
-    setFilteredComics(result);
+  // 統計數字由後端預先算好，不必下載整份清單來數
+  const fetchStats = async () => {
+    try {
+      const res = await axios.get(`${BACKEND_URL}/api/stats`);
+      setStats({
+        total: res.data.total,
+        freeOngoing: res.data.free_ongoing,
+        freeCompleted: res.data.free_completed,
+        paid: res.data.paid
+      });
+    } catch (error) {
+      console.error("無法取得統計資料:", error);
+    }
   };
 
-  // --- 分頁計算 ---
-  const indexOfLastItem = currentPage * itemsPerPage;
-  const indexOfFirstItem = indexOfLastItem - itemsPerPage;
-  const currentItems = filteredComics.slice(indexOfFirstItem, indexOfLastItem);
-  const totalPages = Math.ceil(filteredComics.length / itemsPerPage);
+  // --- 分頁：後端已經切好這一頁 ---
+  const currentItems = comics;
 
   const paginate = (pageNumber) => {
     setCurrentPage(pageNumber);
     window.scrollTo({ top: 0, behavior: 'smooth' });
   };
 
-  // ✅ 已修改：使用雲端網址
-  const getImg = (url) => `${BACKEND_URL}/api/proxy-image?url=${encodeURIComponent(url)}`;
+  // ✅ 已修改：使用雲端網址；列表只需要小縮圖 (後端會快取 WebP/JPEG 縮圖)
+  const getImg = (url) => `${BACKEND_URL}/api/proxy-image?url=${encodeURIComponent(url)}&w=320`;
 
   return (
     // 1. 全局背景：Webtoon 風格 (淺綠白漸層)
@@ -1,15 +1,35 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service # 新增
-from webdriver_manager.chrome import ChromeDriverManager # 新增
+# selenium / webdriver_manager 只在真的需要開瀏覽器時才匯入 (大部分作品走 HTTP 快速路徑就夠了)
 from bs4 import BeautifulSoup
-import time
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import argparse
+import queue
+import threading
 import os # 新增
+import sys
 
-def get_all_episodes_count(webtoon_url):
-    print("🚗 啟動爬蟲，正在設定 Chrome...")
-    
+# 共用爬蟲引擎放在 MyComicProject/backend/webtoon_engine (快速路徑與 app.py 用同一套解析)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MyComicProject', 'backend'))
+from webtoon_engine import metrics
+from webtoon_engine.concurrency import HostRateLimiter, ordered_map
+from webtoon_engine.extract import extract_episode_count
+from webtoon_engine.http_client import fetch
+
+# 這是我們在 render-build.sh 裡面安裝 Chrome 的位置
+RENDER_CHROME_PATH = "/opt/render/project/.render/chrome/opt/google/chrome/google-chrome"
+
+# SELENIUM_POOL_SIZE: 同時保持幾個暖機中的 Chrome (每個大約吃 200MB 記憶體)
+POOL_SIZE = int(os.environ.get('SELENIUM_POOL_SIZE', 2))
+# SELENIUM_WAIT: 等待話次列表出現的秒數上限 (取代原本固定的 time.sleep(2))
+WAIT_TIMEOUT = float(os.environ.get('SELENIUM_WAIT', 10))
+
+EPISODE_LIST = "ul#_listUl"
+EPISODE_ITEMS = "ul#_listUl li"
+NEXT_BUTTON = "a.pg_next"
+
+
+def _build_options():
+    from selenium.webdriver.chrome.options import Options
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--disable-gpu')
@@ -20,55 +40,263 @@ def get_all_episodes_count(webtoon_url):
     # ==========================================
     # 🔴 Render 專用設定 (關鍵修改)
     # ==========================================
-    # 這是我們在 render-build.sh 裡面安裝 Chrome 的位置
-    render_chrome_path = "/opt/render/project/.render/chrome/opt/google/chrome/google-chrome"
-    
     # 判斷檔案是否存在 (如果存在代表在 Render 上，不存在代表在你的電腦上)
-    if os.path.exists(render_chrome_path):
-        print(f"✅ 偵測到 Render 環境，使用自訂路徑: {render_chrome_path}")
-        options.binary_location = render_chrome_path
+    if os.path.exists(RENDER_CHROME_PATH):
+        options.binary_location = RENDER_CHROME_PATH
+    return options
+
+
+@lru_cache(maxsize=1)
+def _driver_path():
+    """webdriver-manager 只在第一次需要時安裝 / 查詢 Driver，之後直接沿用路徑"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def _new_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    if os.path.exists(RENDER_CHROME_PATH):
+        print(f"✅ 偵測到 Render 環境，使用自訂路徑: {RENDER_CHROME_PATH}")
     else:
         print("💻 偵測到本地環境，使用系統預設 Chrome")
+    print("🚗 啟動爬蟲，正在設定 Chrome...")
+    with metrics.stage('browser_start'):
+        return webdriver.Chrome(service=Service(_driver_path()), options=_build_options())
 
-    # 使用 webdriver-manager 自動安裝並啟動對應的 Driver
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    # ==========================================
 
-    try:
-        driver.get(webtoon_url)
-        time.sleep(2)  # 等待頁面初始加載
+class DriverPool:
+    """保持暖機的無頭 Chrome，跨作品重複使用，不用每部漫畫都冷啟動一次"""
 
-        total_episodes = 0
+    def __init__(self, size=POOL_SIZE):
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()  # 後進先出：優先用剛用過、狀態最熱的 driver
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._drivers = []
+        self._closed = False
 
-        while True:
-            # 解析頁面，統計本頁章節數
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            episode_items = soup.select("ul#_listUl li")
-            total_episodes += len(episode_items)
-            print(f"目前累計話數: {total_episodes}") # 加個 print 方便看進度
+    def acquire(self):
+        """取得一個 driver (沒有閒置的就開新的，已達上限時等待)"""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            driver = _new_driver()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
 
-            # 檢查是否有「下一頁」按鈕且可點
+    def release(self, driver, broken=False):
+        """歸還 driver；發生錯誤的 driver 直接關掉，下次會重開一個乾淨的"""
+        if broken or self._closed:
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+        self._slots.release()
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """關閉所有瀏覽器，避免記憶體洩漏"""
+        self._closed = True
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
             try:
-                next_btn = driver.find_element(By.CSS_SELECTOR, "a.pg_next")
-                # 注意：有些網站是用 class 判斷，有些是用屬性，這裡保持你原本的寫法
-                if "disabled" in next_btn.get_attribute("class"):
-                    break
-                else:
-                    next_btn.click()
-                    time.sleep(2)  # 等待新頁面載入
+                driver.quit()
             except Exception:
-                # 找不到下一頁按鈕，結束
-                break
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """全程序共用的 driver 池 (第一次用到 Selenium 時才建立)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+        return _default_pool
+
+
+def _page_url(webtoon_url, page):
+    parts = urlsplit(webtoon_url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != 'page']
+    query.append(('page', str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _count_items(soup):
+    return len(soup.select(EPISODE_ITEMS))
+
+
+def _page_numbers(soup):
+    numbers = []
+    for a in soup.select('div.paginate a'):
+        text = a.get_text(strip=True)
+        if text.isdigit():
+            numbers.append(int(text))
+    return numbers
+
+
+def count_episodes_fast(webtoon_url, rate_limiter=None):
+    """不開瀏覽器的快速路徑，取不到時回傳 0 (交給 Selenium 處理)
+
+    1. 列表第一筆的 data-episode-no 就是最新話次 (與 app.py 相同的判斷方式)
+    2. 沒有話次編號時，直接跳到分頁列上看得到的最後一頁 (&page=N) 計算：
+       (N - 1) * 每頁話數 + 最後一頁話數，不必一頁一頁點
+    """
+    def get_html(url):
+        if rate_limiter: rate_limiter.acquire(url)
+        with metrics.stage('detail_fetch'):
+            res = fetch(url)
+        res.raise_for_status()
+        res.encoding = "utf-8"
+        return res.text
+
+    html = get_html(webtoon_url)
+    with metrics.stage('parse'):
+        count = extract_episode_count(html)
+    if count:
+        return count
+
+    with metrics.stage('parse'):
+        soup = BeautifulSoup(html, "html.parser")
+        per_page = _count_items(soup)
+    if per_page == 0:
+        return 0  # 話次列表可能是 JS 才產生的
+    page, items = 1, per_page
+    while True:
+        pages = _page_numbers(soup)
+        last = max(pages) if pages else page
+        if last <= page:
+            # 分頁列一次只顯示幾頁：已經在看得到的最後一頁，還有「下一頁」就往下一組跳
+            if not soup.select_one(f'div.paginate {NEXT_BUTTON}'):
+                return (page - 1) * per_page + items
+            last = page + 1
+        page = last
+        html = get_html(_page_url(webtoon_url, page))
+        with metrics.stage('parse'):
+            soup = BeautifulSoup(html, "html.parser")
+            items = _count_items(soup)
+
+
+def count_episodes_with_driver(driver, webtoon_url, timeout=WAIT_TIMEOUT):
+    """用 Selenium 計算話數 (給只有 JS 才產生列表的頁面用)，以明確等待取代固定 sleep"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    wait = WebDriverWait(driver, timeout)
+    with metrics.stage('browser_fetch'):
+        driver.get(webtoon_url)
+        episode_list = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, EPISODE_LIST)))
+
+    # 有話次編號就不必翻頁
+    with metrics.stage('parse'):
+        count = extract_episode_count(driver.page_source)
+    if count:
+        return count
+
+    total_episodes = 0
+    while True:
+        # 解析頁面，統計本頁章節數
+        with metrics.stage('parse'):
+            soup = BeautifulSoup(driver.page_source, "html.parser")
+            total_episodes += _count_items(soup)
+        print(f"目前累計話數: {total_episodes}") # 加個 print 方便看進度
+
+        # 檢查是否有「下一頁」按鈕且可點
+        next_buttons = driver.find_elements(By.CSS_SELECTOR, NEXT_BUTTON)
+        if not next_buttons or "disabled" in (next_buttons[0].get_attribute("class") or ""):
+            break
+        with metrics.stage('browser_fetch'):
+            next_buttons[0].click()
+            # 等舊的列表被換掉、新的列表出現
+            wait.until(EC.staleness_of(episode_list))
+            episode_list = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, EPISODE_LIST)))
+    return total_episodes
+
+
+def count_episodes_selenium(webtoon_url, pool=None):
+    pool = pool or get_pool()
+    driver = pool.acquire()
+    broken = False
+    try:
+        return count_episodes_with_driver(driver, webtoon_url)
+    except Exception:
+        broken = True
+        raise
+    finally:
+        pool.release(driver, broken=broken)
+
+
+def get_all_episodes_count(webtoon_url, pool=None, rate_limiter=None):
+    """先走快速路徑，取不到才用瀏覽器；發生錯誤時回傳 0"""
+    try:
+        count = count_episodes_fast(webtoon_url, rate_limiter)
+        if count:
+            return count
+    except Exception as e:
+        print(f"⚠️ 快速路徑失敗，改用瀏覽器: {e}")
+    try:
+        return count_episodes_selenium(webtoon_url, pool)
     except Exception as e:
         print(f"❌ 發生錯誤: {e}")
-    finally:
-        # 確保無論如何都會關閉瀏覽器，避免記憶體洩漏
-        driver.quit()
+        return 0
+
+
+def get_episode_counts(urls, max_workers=8, pool=None, rate_limit=8.0):
+    """批次計算多部漫畫的話數，回傳 {url: 話數}
+
+    快速路徑用 max_workers 個執行緒並行；需要瀏覽器的作品由 driver 池分配，
+    同時開啟的 Chrome 數量不會超過池的大小。
+    """
+    rate_limiter = HostRateLimiter(rate_limit)
+    counts = {}
+    for url, count, error in ordered_map(
+            lambda u: get_all_episodes_count(u, pool, rate_limiter), urls, max_workers):
+        counts[url] = 0 if error else count
+    return counts
 
-    return total_episodes
 
 if __name__ == "__main__":
-    url = "https://www.webtoons.com/zh-hant/fantasy/peaceful-camping-life-in-another-world/list?title_no=6681"
-    count = get_all_episodes_count(url)
-    print(f"該漫畫總共有 {count} 話")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="計算一部漫畫的總話數")
+    parser.add_argument('url', nargs='?',
+                        default="https://www.webtoons.com/zh-hant/fantasy/peaceful-camping-life-in-another-world/list?title_no=6681")
+    parser.add_argument('--profile', action='store_true', help="剖析這次執行並存下報告 (CRAWL_PROFILER 選擇引擎)")
+    parser.add_argument('--metrics', action='store_true', help="結束時印出 Prometheus 格式的量測數據")
+    args = parser.parse_args()
+    try:
+        if args.profile:
+            from webtoon_engine.profiling import profile_run
+            with profile_run('selenium-count') as run:
+                count = get_all_episodes_count(args.url)
+            print(f"🔬 效能剖析報告：{run.path}")
+        else:
+            count = get_all_episodes_count(args.url)
+        print(f"該漫畫總共有 {count} 話")
+        if args.metrics:
+            print(metrics.REGISTRY.render())
+    finally:
+        if _default_pool: _default_pool.close()